@@ -0,0 +1,75 @@
+"""Wall-clock time of the multi-agent workflow: serial chain vs. dependency DAG.
+
+The serial graph runs the eight nodes of utils.ma_agentic_helper one after another,
+as before; the DAG graph runs the Boomi integrator, tester and migrator concurrently
+after the generator. The LLM is replaced by one that sleeps for a fixed latency, and
+retrieval and the similar-flow lookup return constants, so the difference is the
+time saved by the fan-out.
+
+    python -m benchmarks.agent_dag --llm-ms 500 --runs 3
+"""
+import os
+import json
+import time
+import argparse
+import numpy as np
+from typing import Any, Dict
+from collections import Counter
+from langgraph.graph import StateGraph, END
+from langchain_core.messages import AIMessage
+
+# The helper creates its Gemini client at import time; no request is ever sent here
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+# Every timed run must call the (stand-in) LLM, not the output memo
+os.environ.setdefault("MEMO_ENABLED", "false")
+
+import utils.ma_agentic_helper as helper
+
+NODES = ["supervisor", "analyzer", "designer", "generator", "boomi_integrator", "tester", "migrator", "howto_writer"]
+
+class SleepingLLM:
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000
+
+    def invoke(self, prompt):
+        time.sleep(self.latency)
+        return AIMessage(content="### output.md\nok")
+
+def serial_graph():
+    """The pre-DAG order: every agent waits for the one before it."""
+    workflow = StateGraph(helper.TransformationState)
+    for node in NODES:
+        workflow.add_node(node, getattr(helper, f"{node}_agent"))
+    for current, following in zip(NODES, NODES[1:]):
+        workflow.add_edge(current, following)
+    workflow.add_edge(NODES[-1], END)
+    workflow.set_entry_point(NODES[0])
+    return workflow.compile()
+
+def time_runs(graph, runs: int) -> Dict[str, Any]:
+    durations, calls = [], Counter()
+    for _ in range(runs):
+        state = {"inputs": {f"tab{i}": "Microservice Name: Order" for i in range(1, 8)}, "outputs": {}, "context": "", "plan": {}, "similar_flows": []}
+        start = time.perf_counter()
+        for update in graph.stream(state, stream_mode="updates"):
+            calls.update(update.keys())
+        durations.append(time.perf_counter() - start)
+    return {
+        "mean_seconds": round(float(np.mean(durations)), 3),
+        "min_seconds": round(float(np.min(durations)), 3),
+        "calls_per_run": {node: count // runs for node, count in calls.items()}
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare serial and DAG wall-clock time of the multi-agent workflow.")
+    parser.add_argument("--llm-ms", type=float, default=500, help="Simulated latency of one LLM call")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    helper.llm = SleepingLLM(args.llm_ms)
+    helper.retrieve_context = lambda query, agent=None: "context"
+    helper.find_similar_flows = lambda content: []
+
+    report = {"llm_ms": args.llm_ms, "serial": time_runs(serial_graph(), args.runs), "dag": time_runs(helper.workflow.compile(), args.runs)}
+    report["speedup"] = round(report["serial"]["mean_seconds"] / report["dag"]["mean_seconds"], 2)
+    print(json.dumps(report, indent=2))
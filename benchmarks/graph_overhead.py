@@ -0,0 +1,88 @@
+"""Per-call orchestration overhead of run_agentic_workflow for single-tab requests.
+
+Compares the original linear graph (all seven nodes visited, six returning early)
+with the routed graph (entry routed to the one requested node). The LLM and the RAG
+lookup are replaced by constant responses so only LangGraph dispatch, state copying
+and, for the RAP helper, the workflow image are measured.
+
+    python -m benchmarks.graph_overhead --calls 200
+"""
+import os
+import json
+import time
+import argparse
+import importlib
+import numpy as np
+from typing import Any, Dict
+from langgraph.graph import StateGraph, END
+from langchain_core.messages import AIMessage
+
+# The helpers create their Gemini client at import time; no request is ever sent here
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+# Every timed run must call the (stand-in) LLM, not the output memo
+os.environ.setdefault("MEMO_ENABLED", "false")
+os.environ.setdefault("AZURE_OPENAI_API_KEY", "benchmark")
+
+TAB_INPUTS = {
+    "tab1": "Files:\nflow.xml (xml):\n<flow/>\nPreferences: Granularity=Balanced",
+    "tab2": "Requirements: order service",
+    "tab3": "Microservice Name: Order\nTab 2 Architecture: none",
+    "tab4": "Microservice Name: Order",
+    "tab5": "Service Name: Order",
+    "tab6": "Microservice Name: Order",
+    "tab7": "Guide for Order"
+}
+
+class ConstantLLM:
+    def invoke(self, prompt):
+        return AIMessage(content="### output.md\nok")
+
+def linear_graph(helper):
+    """The pre-routing graph: every node in sequence, gated by current_tab."""
+    workflow = StateGraph(helper.TransformationState)
+    nodes = list(helper.TAB_NODES.values())
+    for node in nodes:
+        workflow.add_node(node, getattr(helper, f"{node}_node"))
+    for current, following in zip(nodes, nodes[1:]):
+        workflow.add_edge(current, following)
+    workflow.add_edge(nodes[-1], END)
+    workflow.set_entry_point(nodes[0])
+    return workflow.compile()
+
+def time_calls(graph, initial_state: Dict[str, Any], calls: int) -> Dict[str, float]:
+    latencies = []
+    for i in range(calls):
+        tab = f"tab{i % 7 + 1}"
+        state = dict(initial_state, inputs=dict(TAB_INPUTS), outputs={}, current_tab=tab)
+        start = time.perf_counter()
+        graph.invoke(state)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {"p50_ms": round(float(np.percentile(latencies, 50)), 3), "p95_ms": round(float(np.percentile(latencies, 95)), 3)}
+
+def measure(module_name: str, calls: int) -> Dict[str, Any]:
+    helper = importlib.import_module(module_name)
+    helper.llm = ConstantLLM()
+    if hasattr(helper, "retrieve_context"):
+        helper.retrieve_context = lambda query, agent=None: "context"
+    initial_state = {"context": ""} if "context" in helper.TransformationState.__annotations__ else {}
+
+    # Compiled without the run checkpointer so only routing differs between the two
+    report = {"linear": time_calls(linear_graph(helper), initial_state, calls), "routed": time_calls(helper.workflow.compile(), initial_state, calls)}
+    if hasattr(helper, "generate_graph_image"):
+        try:
+            start = time.perf_counter()
+            helper.generate_graph_image("tab4")
+            first = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            helper.generate_graph_image("tab4")
+            report["graph_image_ms"] = {"first_render": round(first, 3), "cached": round((time.perf_counter() - start) * 1000, 3)}
+        except Exception as e:
+            report["graph_image_ms"] = f"not measured: {e.__class__.__name__}"
+    report["saved_p50_ms"] = round(report["linear"]["p50_ms"] - report["routed"]["p50_ms"], 3)
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure single-tab graph overhead before and after entry routing.")
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps({name: measure(name, args.calls) for name in ["utils.agentic_helper", "utils.rap_agentic_helper"]}, indent=2))
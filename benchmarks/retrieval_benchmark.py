@@ -0,0 +1,172 @@
+"""Offline retrieval benchmark over the bundled webMethods developer guide.
+
+Builds a fresh index for a corpus in a temporary directory (so build time is
+measured), runs the labelled queries in benchmarks/retrieval_queries.json and
+writes a JSON report with recall@k, hit rate@k, MRR, query latency percentiles,
+index build time and resident memory, plus the latency and page diversity of MMR.
+
+    python -m benchmarks.retrieval_benchmark --corpus docs --output bench.json
+    python -m benchmarks.retrieval_benchmark --index-type hnsw --no-hybrid
+"""
+import os
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+import numpy as np
+from typing import Any, Dict, List
+import utils.retrieval_service as retrieval_service
+from utils.index_helper import docs_at, load_meta
+
+QUERIES_PATH = os.path.join(os.path.dirname(__file__), "retrieval_queries.json")
+
+def is_relevant(doc, label: Dict[str, Any]) -> bool:
+    text = doc.page_content.lower()
+    section = str(doc.metadata.get("section_path", "")).lower()
+    return any(term.lower() in text for term in label.get("contains", [])) or \
+        any(term.lower() in section for term in label.get("sections", []))
+
+def rss_mb() -> float:
+    """Current resident set size (Linux), falling back to the peak."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def distinct_pages(docs) -> int:
+    return len({(doc.metadata.get("source"), doc.metadata.get("page")) for doc in docs})
+
+def mmr_comparison(service, corpus: str, queries: List[Dict[str, Any]], repeats: int, k: int = 3) -> Dict[str, Any]:
+    """Latency and page diversity of the top k with and without MMR diversification."""
+    report = {"k": k, "fetch_k": retrieval_service.MMR_FETCH_K, "lambda": retrieval_service.MMR_LAMBDA}
+    for label, diversify in [("plain", False), ("mmr", True)]:
+        latencies, pages = [], []
+        for item in queries:
+            for _ in range(repeats):
+                start = time.perf_counter()
+                docs = service.search(item["query"], corpus=corpus, k=k, diversify=diversify)
+                latencies.append((time.perf_counter() - start) * 1000)
+            pages.append(distinct_pages(docs))
+        report[label] = {
+            "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+            f"distinct_pages@{k}": round(float(np.mean(pages)), 3)
+        }
+    report["p50_overhead_ms"] = round(report["mmr"]["p50_ms"] - report["plain"]["p50_ms"], 3)
+    return report
+
+def run_benchmark(corpus: str, ks: List[int], queries: List[Dict[str, Any]], repeats: int = 3) -> Dict[str, Any]:
+    service = retrieval_service.RetrievalService()
+    memory_before = rss_mb()
+    with tempfile.TemporaryDirectory() as index_dir:
+        retrieval_service.VECTORSTORE_PATHS[corpus] = index_dir
+        start = time.perf_counter()
+        index = service.get_corpus(corpus)
+        build_seconds = time.perf_counter() - start
+        if index is None:
+            raise SystemExit(f"No PDFs found for corpus '{corpus}'")
+        memory_after_build = rss_mb()
+
+        all_docs = docs_at(index.vectorstore, range(index.vectorstore.index.ntotal))
+        max_k = max(ks)
+        service.search("warm up", corpus=corpus, k=max_k)
+
+        latencies, per_query = [], []
+        for item in queries:
+            for _ in range(repeats):
+                start = time.perf_counter()
+                results = service.search(item["query"], corpus=corpus, k=max_k)
+                latencies.append((time.perf_counter() - start) * 1000)
+            labelled = "contains" in item or "sections" in item
+            total_relevant = sum(is_relevant(doc, item) for doc in all_docs) if labelled else 0
+            flags = [is_relevant(doc, item) for doc in results] if labelled else []
+            per_query.append({
+                "query": item["query"],
+                "type": item.get("type", ""),
+                "total_relevant": total_relevant,
+                "first_relevant_rank": next((rank + 1 for rank, flag in enumerate(flags) if flag), None),
+                "relevant_at": {k: sum(flags[:k]) for k in ks}
+            })
+        mmr = mmr_comparison(service, corpus, queries, repeats)
+        meta = load_meta(index.path)
+
+    scored = [q for q in per_query if q["total_relevant"] > 0]
+    metrics = {"labelled_queries": len(scored)}
+    for k in ks:
+        metrics[f"recall@{k}"] = round(float(np.mean([q["relevant_at"][k] / q["total_relevant"] for q in scored])), 4) if scored else None
+        metrics[f"hit_rate@{k}"] = round(float(np.mean([q["relevant_at"][k] > 0 for q in scored])), 4) if scored else None
+    metrics["mrr"] = round(float(np.mean([1 / q["first_relevant_rank"] if q["first_relevant_rank"] else 0 for q in scored])), 4) if scored else None
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "config": {
+            "corpus": corpus,
+            "chunking": retrieval_service.CHUNKING_STRATEGY,
+            "index_type": meta.get("index_type", retrieval_service.VECTORSTORE_INDEX_TYPE),
+            "hybrid": retrieval_service.RETRIEVAL_HYBRID,
+            "rerank": retrieval_service.RETRIEVAL_RERANK,
+            "mmr": retrieval_service.RETRIEVAL_MMR,
+            "embedding_model": retrieval_service.EMBEDDING_MODEL,
+            "embedding_backend": meta.get("embedding_backend", "torch")
+        },
+        "index": {
+            "chunks": index.vectorstore.index.ntotal,
+            "build_seconds": round(build_seconds, 3),
+            "embed_seconds": meta.get("embed_seconds"),
+            "rss_mb_before_build": round(memory_before, 1),
+            "rss_mb_after_build": round(memory_after_build, 1),
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        },
+        "latency_ms": {
+            "p50": round(float(np.percentile(latencies, 50)), 3),
+            "p95": round(float(np.percentile(latencies, 95)), 3),
+            "mean": round(float(np.mean(latencies)), 3)
+        },
+        "metrics": metrics,
+        "mmr": mmr,
+        "queries": per_query
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark retrieval quality and speed on a local PDF corpus.")
+    parser.add_argument("--corpus", default="docs")
+    parser.add_argument("--k", default="1,3,5,10", help="Comma-separated cutoffs")
+    parser.add_argument("--queries", default=QUERIES_PATH)
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per query")
+    parser.add_argument("--index-type", choices=["flat", "hnsw", "ivfpq", "compact"])
+    parser.add_argument("--chunking", choices=["structured", "recursive"])
+    parser.add_argument("--no-hybrid", action="store_true")
+    parser.add_argument("--rerank", action="store_true")
+    parser.add_argument("--mmr", action="store_true", help="Diversify results with MMR for the main run")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    if args.index_type:
+        retrieval_service.VECTORSTORE_INDEX_TYPE = args.index_type
+    if args.chunking:
+        retrieval_service.CHUNKING_STRATEGY = args.chunking
+    if args.no_hybrid:
+        retrieval_service.RETRIEVAL_HYBRID = False
+    if args.rerank:
+        retrieval_service.RETRIEVAL_RERANK = True
+    if args.mmr:
+        retrieval_service.RETRIEVAL_MMR = True
+
+    with open(args.queries) as f:
+        queries = json.load(f)["queries"]
+    report = run_benchmark(args.corpus, [int(k) for k in args.k.split(",")], queries, args.repeats)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,76 @@
+"""Wall-clock time of the generator for an architecture with several services.
+
+Runs utils.ma_agentic_helper.generator_agent on a design naming --services services,
+once with one sub-run at a time and once with --concurrency sub-runs in flight. The
+LLM sleeps for a fixed latency and retrieval returns a constant, so the difference is
+the time saved by generating the services concurrently.
+
+    python -m benchmarks.service_fanout --services 6 --concurrency 4 --llm-ms 500
+"""
+import os
+import json
+import time
+import argparse
+from langchain_core.messages import AIMessage
+
+# The helper creates its Gemini client at import time; no request is ever sent here
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+# Every timed run must call the (stand-in) LLM, not the output memo
+os.environ.setdefault("MEMO_ENABLED", "false")
+
+import utils.ma_agentic_helper as helper
+import utils.service_fanout as service_fanout
+from utils.artifact_store import load_artifact, store_artifact
+
+class SleepingLLM:
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        time.sleep(self.latency)
+        return AIMessage(content="### pom.xml\n<project/>\n### src/main/resources/application.yml\nserver.port: 8080")
+
+def architecture(services: int) -> str:
+    breakdown = "\n".join(f"### {i}. Service{i} Service\n- **Responsibilities**: part {i}" for i in range(1, services + 1))
+    return f"### architecture.md\n## Overview\nSplit by domain.\n## Microservices Breakdown\n{breakdown}\n## Communication Patterns\nREST"
+
+def time_generator(services: int, concurrency: int) -> dict:
+    service_fanout.GENERATOR_CONCURRENCY = concurrency
+    state = {
+        "inputs": {"tab3": store_artifact("")},
+        "outputs": {"tab2": store_artifact(architecture(services))},
+        "context": store_artifact(""),
+        "plan": {},
+        "similar_flows": []
+    }
+    calls = helper.llm.calls
+    start = time.perf_counter()
+    output = load_artifact(helper.generator_agent(state)["outputs"]["tab3"])
+    return {
+        "seconds": round(time.perf_counter() - start, 3),
+        "llm_calls": helper.llm.calls - calls,
+        "modules": output.count("<module>")
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare sequential and concurrent per-service code generation.")
+    parser.add_argument("--services", type=int, default=6)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm-ms", type=float, default=500, help="Simulated latency of one LLM call")
+    args = parser.parse_args()
+
+    service_fanout.GENERATOR_MAX_SERVICES = max(args.services, service_fanout.GENERATOR_MAX_SERVICES)
+    helper.llm = SleepingLLM(args.llm_ms)
+    helper.retrieve_context = lambda query, agent=None: "context"
+
+    report = {
+        "llm_ms": args.llm_ms,
+        "services": args.services,
+        "sequential": time_generator(args.services, 1),
+        "concurrent": time_generator(args.services, args.concurrency)
+    }
+    report["concurrency"] = args.concurrency
+    report["speedup"] = round(report["sequential"]["seconds"] / report["concurrent"]["seconds"], 2)
+    print(json.dumps(report, indent=2))
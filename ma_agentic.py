@@ -1,10 +1,13 @@
 import streamlit as st
-from utils.ma_agentic_helper import run_agentic_workflow, llm, vector_store, graph
-from langchain.prompts import PromptTemplate
+from utils.ma_agentic_helper import graph, GRAPH_NAME, generate_plan, run_state
+from utils.checkpoint_helper import RUN_FAILED, new_run_id, pending_nodes, resumable_runs
+from utils.job_queue import submit_job, job_result_ui
+from utils.context_helper import retrieval_run
+from utils.flow_index_helper import record_migration
+from utils.artifact_store import is_artifact, load_artifact, load_artifacts, store_artifact
 from dotenv import load_dotenv
 import os
 import zipfile
-from typing import Dict
 import logging
 import time
 
@@ -30,51 +33,15 @@ if "workflow_outputs" not in st.session_state:
     st.session_state.workflow_outputs = {}
 if "workflow_state" not in st.session_state:
     st.session_state.workflow_state = {}
+if "last_flow" not in st.session_state:
+    st.session_state.last_flow = {}
+if "run_id" not in st.session_state:
+    st.session_state.run_id = None
+if "job_id" not in st.session_state:
+    st.session_state.job_id = None
 
-def generate_plan(prompt: str) -> Dict[str, str]:
-    """Generate a plan based on the user's natural language prompt with RAG."""
-    context = vector_store.similarity_search("webMethods transformation to microservices", k=3) if vector_store else []
-    context_text = "\n".join([doc.page_content for doc in context]) if context else "No documentation available."
-    plan_prompt = PromptTemplate.from_template(
-        "Using the following webMethods documentation context:\n{context}\n"
-        "Given the user prompt: '{prompt}', generate a plan to transform webMethods integration services into cloud-native microservices using Spring Boot. "
-        "Map the plan to the following agents: Analyzer (tab1), Designer (tab2), Generator (tab3), BoomiIntegrator (tab4), Tester (tab5), Migrator (tab6), HowToWriter (tab7). "
-        "For each agent, provide a brief description of what it will do. Output as a valid JSON string and NOTHING ELSE:\n"
-        "{{\n"
-        "  \"tab1\": \"description for Analyzer\",\n"
-        "  \"tab2\": \"description for Designer\",\n"
-        "  \"tab3\": \"description for Generator\",\n"
-        "  \"tab4\": \"description for BoomiIntegrator\",\n"
-        "  \"tab5\": \"description for Tester\",\n"
-        "  \"tab6\": \"description for Migrator\",\n"
-        "  \"tab7\": \"description for HowToWriter\"\n"
-        "}}"
-    ).format(prompt=prompt, context=context_text)
-    response = llm.invoke(plan_prompt).content
-    logger.debug(f"LLM response for plan: {response}")
-    
-    try:
-        import json
-        return json.loads(response)
-    except Exception as e:
-        logger.error(f"Failed to parse JSON: {e}. Raw response: {response}")
-        if "tab1" in response:
-            try:
-                start = response.find("{")
-                end = response.rfind("}") + 1
-                if start != -1 and end != -1:
-                    json_str = response[start:end]
-                    return json.loads(json_str)
-            except:
-                pass
-        return {}
-
-def execute_full_workflow(inputs: dict, uploaded_files: list):
-    """Execute the multi-agent LangGraph workflow with RAG and UI updates."""
-    tabs = ["tab1", "tab2", "tab3", "tab4", "tab5", "tab6", "tab7"]
-    agents = ["analyzer", "designer", "generator", "boomi_integrator", "tester", "migrator", "howto_writer"]
-    outputs = {}
-    
+def execute_full_workflow(inputs: dict, uploaded_files: list, plan: dict):
+    """Start a background run of every agent, each executed once, following the given plan."""
     if uploaded_files:
         flow_contents = []
         for flow_file in uploaded_files:
@@ -82,45 +49,75 @@ def execute_full_workflow(inputs: dict, uploaded_files: list):
             file_type = "xml" if flow_file.name.endswith(".xml") else "html"
             flow_contents.append(f"{file_type.upper()} Content:\n{content}")
         inputs["tab1"] = "\n---\n".join(flow_contents)
-    
-    progress_bar = st.progress(0)
-    status_placeholder = st.empty()
-    state_placeholder = st.empty()
-
-    # Execute supervisor first
-    status_placeholder.write("Supervisor Agent planning the transformation...")
-    time.sleep(1)
-    initial_state = {"inputs": inputs, "outputs": {}, "current_agent": "supervisor", "context": "", "plan": {}, "task_queue": []}
-    result = graph.invoke(initial_state)
-    plan = result["plan"]
-    outputs.update(result["outputs"])
-    st.session_state.workflow_state = result
-
-    for i, agent in enumerate(agents):
-        tab = tabs[i]
-        st.session_state.progress[tab] = "In Progress"
-        status_placeholder.write(f"{agent.capitalize()} Agent executing {tab.capitalize()}...")
-        progress_bar.progress((i + 1) / len(agents))
-        
-        time.sleep(1)  # Simulated delay for visibility
-        
-        tab_outputs = run_agentic_workflow(inputs, tab)
-        outputs.update(tab_outputs)
-        inputs[tab] = ""  # Clear input for this tab after processing
-        st.session_state.progress[tab] = "Completed"
-        st.session_state.workflow_outputs[tab] = tab_outputs.get(tab, "No output generated")
-        
-        # Update state display
-        state_placeholder.json({
-            "inputs": inputs,
-            "outputs": st.session_state.workflow_outputs,
-            "current_agent": agent,
-            "rag_context": tab_outputs.get("context", "No context available"),
-            "plan": plan
-        })
-    
-    status_placeholder.write("Multi-Agent Workflow completed successfully!")
-    return outputs
+    # The session, job payload and run state keep artifact references, not the flow text
+    inputs = {tab: store_artifact(value) for tab, value in inputs.items()}
+    if uploaded_files:
+        st.session_state.last_flow = {"content": inputs["tab1"], "name": ", ".join(f.name for f in uploaded_files)}
+    else:
+        st.session_state.last_flow = {}
+
+    # Each run is checkpointed under its run id and executed by a background worker
+    # (utils/job_queue.py), so reruns and refreshes of this page do not interrupt it
+    run_id = new_run_id()
+    submit_run(run_id, {"run_id": run_id, "inputs": inputs, "plan": plan})
+
+def resume_workflow(run_id: str):
+    """Continue an interrupted run after its last completed agent."""
+    st.session_state.last_flow = run_flow(run_id)
+    submit_run(run_id, {"run_id": run_id})
+
+def run_flow(run_id: str) -> dict:
+    """Flow uploaded for a run, read from its own checkpointed inputs.
+
+    Empty when the run was started from a prompt only, so its results cannot be
+    accepted into the flow library under another flow's content.
+    """
+    flow = run_state(run_id).get("inputs", {}).get("tab1")
+    # execute_full_workflow passes uploaded files as "XML Content:\n..." / "HTML Content:\n..."
+    if not is_artifact(flow) or not load_artifact(flow).startswith(("XML Content:\n", "HTML Content:\n")):
+        return {}
+    # File names are not part of the run state
+    return {"content": flow, "name": f"run {run_id[:8]}"}
+
+def submit_run(run_id: str, payload: dict):
+    st.session_state.run_id = run_id
+    st.session_state.job_id = submit_job("ma_agentic", payload)
+    st.session_state.workflow_outputs = dict(run_state(run_id).get("outputs", {}))
+    st.session_state.progress = {f"tab{i}": "In Progress" for i in range(1, 8)}
+
+def show_progress(run_id: str):
+    """Agents completed so far, read from the run's checkpoint."""
+    tabs = ["tab1", "tab2", "tab3", "tab4", "tab5", "tab6", "tab7"]
+    state = run_state(run_id)
+    outputs = state.get("outputs", {})
+    st.progress(len(outputs) / len(tabs))
+    st.write(f"Completed: {', '.join(tab_to_agent(tab) for tab in tabs if tab in outputs) or 'Supervisor planning...'}")
+    # Update state display; the state holds artifact references (hash, size, summary)
+    st.json({
+        "inputs": state.get("inputs", {}),
+        "outputs": outputs,
+        "rag_context": state.get("context", "No context available"),
+        "plan": state.get("plan", {})
+    }, expanded=False)
+
+def show_run():
+    """Status of the current run's job while it runs, then its results."""
+    if not st.session_state.job_id:
+        return
+    st.subheader("Multi-Agent Execution")
+    st.markdown("Watch the agents collaborate, each enhancing the process with RAG and state sharing:")
+    run_id = st.session_state.run_id
+    result = job_result_ui(st.session_state.job_id, lambda: show_progress(run_id))
+    if result is None:
+        return
+    st.session_state.workflow_outputs = result["outputs"]
+    st.session_state.workflow_state = {"plan": run_state(run_id).get("plan", {}), "outputs": result["outputs"]}
+    st.session_state.progress = {tab: "Completed" if tab in result["outputs"] else "Not Started" for tab in st.session_state.progress}
+    st.caption(
+        f"Agent executions this run: {result['agent_calls']} in {result['seconds']:.1f}s, "
+        f"{result['memo_hits']} reused from earlier runs with unchanged inputs. RAG context: {result['rag_stats']}"
+    )
+    show_results()
 
 
 def main():
@@ -147,47 +144,75 @@ def main():
         A --> D[Designer<br>(Tab 2)]
         D --> G[Generator<br>(Tab 3)]
         G --> B[Boomi Integrator<br>(Tab 4)]
-        B --> T[Tester<br>(Tab 5)]
-        T --> M[Migrator<br>(Tab 6)]
-        M --> H[HowTo Writer<br>(Tab 7)]
+        G --> T[Tester<br>(Tab 5)]
+        G --> M[Migrator<br>(Tab 6)]
+        B --> H[HowTo Writer<br>(Tab 7)]
+        T --> H
+        M --> H
     """
     st.markdown(workflow_steps)
     if st.button("Transform"):
         if prompt:
-            with st.spinner("Supervisor Agent generating plan with RAG..."):
-                inputs = {f"tab{i+1}": "" for i in range(7)}
-                inputs["tab1"] = prompt  # Pass prompt to supervisor via tab1
-                plan = generate_plan(prompt)
-                if not plan:
-                    st.error("Failed to generate a valid plan. Please try again.")
-                    st.write("Raw LLM response (for debugging):")
-                    if os.path.exists("debug.log"):
-                        with open("debug.log", "r") as f:
-                            st.text(f.read())
-                    else:
-                        st.text("Debug log not available yet.")
-                    return
-
-
-                st.subheader("Transformation Plan (RAG-Enhanced)")
-                st.markdown("The Supervisor Agent crafted this plan, assigning tasks to specialized agents:")
-                st.json(plan)
-
-            st.subheader("Multi-Agent Execution")
-            st.markdown("Watch the agents collaborate, each enhancing the process with RAG and state sharing:")
-            outputs = execute_full_workflow(inputs, uploaded_files)
-
-            st.subheader("Transformation Results")
-            st.markdown("Here’s the collective output from our multi-agent team:")
-            for tab, output in st.session_state.workflow_outputs.items():
-                with st.expander(f"{tab.upper()} Output (Agent: {tab_to_agent(tab)})", expanded=False):
-                    files_dict = parse_ai_response_to_files(output)
-                    for file_path, content in files_dict.items():
-                        st.subheader(file_path)
-                        st.markdown(content)
-
-            # Generate a combined ZIP of all outputs
-            create_combined_zip(st.session_state.workflow_outputs)
+            # One retrieval run per transformation: agents share deduplicated, budgeted RAG context
+            with retrieval_run() as run:
+                transform(prompt, uploaded_files)
+                st.caption(f"RAG context for planning: {run.stats}")
+
+    # Runs that stopped part way (e.g. an LLM error) continue from their last completed agent
+    interrupted = [run for run in resumable_runs(GRAPH_NAME) if run["status"] == RUN_FAILED and pending_nodes(graph, run["run_id"])]
+    if interrupted:
+        options = {f"{run['run_id'][:8]} - {run['error']} {time.strftime('%Y-%m-%d %H:%M', time.localtime(run['updated_at']))}": run["run_id"] for run in interrupted}
+        choice = st.selectbox("Interrupted runs", list(options), key="resume_run_id")
+        if st.button("Resume Run"):
+            resume_workflow(options[choice])
+
+    show_run()
+
+    # Accepted results seed the flow library: similar flows later start from them
+    if st.session_state.last_flow and st.session_state.workflow_outputs:
+        if st.button("Accept Results into Flow Library"):
+            flow_id = record_migration(load_artifact(st.session_state.last_flow["content"]), load_artifacts(st.session_state.workflow_outputs), st.session_state.last_flow["name"])
+            st.success(f"Recorded migration of {st.session_state.last_flow['name']} ({flow_id}).")
+
+def transform(prompt: str, uploaded_files: list):
+    """Plan with the supervisor and start a background run of all agents."""
+    with st.spinner("Supervisor Agent generating plan with RAG..."):
+        inputs = {f"tab{i+1}": "" for i in range(7)}
+        inputs["tab1"] = prompt  # Pass prompt to supervisor via tab1
+        plan = generate_plan(prompt)
+        if not plan:
+            st.error("Failed to generate a valid plan. Please try again.")
+            st.write("Raw LLM response (for debugging):")
+            if os.path.exists("debug.log"):
+                with open("debug.log", "r") as f:
+                    st.text(f.read())
+            else:
+                st.text("Debug log not available yet.")
+            return
+
+
+        st.subheader("Transformation Plan (RAG-Enhanced)")
+        st.markdown("The Supervisor Agent crafted this plan, assigning tasks to specialized agents:")
+        st.json(plan)
+
+    # The plan shown above goes into the run state, so the graph's supervisor does not plan again
+    execute_full_workflow(inputs, uploaded_files, plan)
+
+def show_results():
+    """Render the outputs of the current run and offer them as one ZIP."""
+    st.subheader("Transformation Results")
+    st.markdown("Here’s the collective output from our multi-agent team:")
+    # Outputs are artifact references until rendered
+    outputs = load_artifacts(st.session_state.workflow_outputs)
+    for tab, output in outputs.items():
+        with st.expander(f"{tab.upper()} Output (Agent: {tab_to_agent(tab)})", expanded=False):
+            files_dict = parse_ai_response_to_files(output)
+            for file_path, content in files_dict.items():
+                st.subheader(file_path)
+                st.markdown(content)
+
+    # Generate a combined ZIP of all outputs
+    create_combined_zip(outputs)
 
 
 def tab_to_agent(tab: str) -> str:
@@ -0,0 +1,236 @@
+"""Headless batch migration of webMethods flow files through the multi-agent pipeline.
+
+Walks a directory or ZIP of flow files (.xml/.html), runs the same agents as
+ma_agentic.py for each flow (or each directory of flows with --group-by directory)
+in a worker pool, and writes the generated files under the output directory:
+
+    <output>/<flow>/<tab>/<file path from the agent response>
+
+Identical flows are migrated once, under the name of the first. A manifest.jsonl in
+the output directory records every finished flow. Running the command again skips
+them, and flows whose run was interrupted resume from their last completed agent
+(runs are checkpointed, see utils/checkpoint_helper.py).
+
+    python migrate_cli.py samples --output outputs/batch --workers 4 --llm-concurrency 4
+"""
+import os
+import re
+import json
+import time
+import logging
+import zipfile
+import argparse
+import threading
+import numpy as np
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import utils.ma_agentic_helper as helper
+from utils.checkpoint_helper import pending_nodes
+from utils.context_helper import retrieval_run
+from utils.flow_index_helper import flow_id
+from utils.memo_helper import get_node_memo
+
+logger = logging.getLogger(__name__)
+
+FLOW_EXTENSIONS = (".xml", ".html")
+MANIFEST_FILE = "manifest.jsonl"
+TAB_NAMES = {
+    "tab1": "analysis",
+    "tab2": "design",
+    "tab3": "code",
+    "tab4": "boomi_apim",
+    "tab5": "tests",
+    "tab6": "migration",
+    "tab7": "howto"
+}
+
+class BoundedLLM:
+    """Chat model wrapper allowing at most `limit` concurrent calls across all workers."""
+
+    def __init__(self, llm, limit: int):
+        self.llm = llm
+        self.semaphore = threading.Semaphore(limit)
+        self.calls = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt):
+        with self.semaphore:
+            start = time.perf_counter()
+            response = self.llm.invoke(prompt)
+            elapsed = time.perf_counter() - start
+        with self._lock:
+            self.calls += 1
+            self.seconds += elapsed
+        return response
+
+    def __getattr__(self, name):
+        # model, temperature, ... as on the wrapped model (used in memo keys)
+        return getattr(self.llm, name)
+
+def flow_content(name: str, content: str) -> str:
+    """A flow as ma_agentic.py passes uploaded files to the analyzer."""
+    file_type = "xml" if name.endswith(".xml") else "html"
+    return f"{file_type.upper()} Content:\n{content}"
+
+def collect_flows(source: str, group_by: str = "flow") -> List[Tuple[str, str]]:
+    """(name, analyzer input) per flow file, or per directory of flow files, sorted by name."""
+    files = []
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as zf:
+            for member in zf.namelist():
+                if member.lower().endswith(FLOW_EXTENSIONS):
+                    files.append((member, zf.read(member).decode("utf-8", errors="replace")))
+    else:
+        for root, _, names in os.walk(source):
+            for name in names:
+                if name.lower().endswith(FLOW_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    with open(path, "r", encoding="utf-8", errors="replace") as f:
+                        files.append((os.path.relpath(path, source), f.read()))
+    files.sort()
+
+    if group_by == "flow":
+        return [(os.path.splitext(name)[0], flow_content(name, content)) for name, content in files]
+    groups: Dict[str, List[str]] = {}
+    for name, content in files:
+        groups.setdefault(os.path.dirname(name) or ".", []).append(flow_content(name, content))
+    return [(group, "\n---\n".join(contents)) for group, contents in sorted(groups.items())]
+
+def parse_ai_response_to_files(response: str) -> Dict[str, str]:
+    """Split an agent response into {file path: content} on its `### path` headings."""
+    files_dict = {}
+    current_file = None
+    current_content = []
+    for line in response.splitlines():
+        if line.startswith("### "):
+            if current_file and current_content:
+                files_dict[current_file] = "\n".join(current_content).strip()
+            current_file = line[4:].strip().strip("`")
+            current_content = []
+        elif current_file:
+            current_content.append(line)
+    if current_file and current_content:
+        files_dict[current_file] = "\n".join(current_content).strip()
+    return files_dict
+
+def safe_path(path: str) -> str:
+    """Relative path that stays inside the output directory."""
+    parts = [re.sub(r"[^\w.\-]", "_", part) for part in re.split(r"[\\/]+", path) if part not in ("", ".", "..")]
+    return os.path.join(*parts) if parts else "output.md"
+
+def write_artifacts(output_dir: str, name: str, outputs: Dict[str, str]) -> int:
+    """Write each tab's files under <output_dir>/<name>/<tab>/; returns the number of files."""
+    count = 0
+    for tab, response in outputs.items():
+        tab_dir = os.path.join(output_dir, safe_path(name), TAB_NAMES.get(tab, tab))
+        files = parse_ai_response_to_files(response) or {f"{tab}.md": response}
+        for file_path, content in files.items():
+            path = os.path.join(tab_dir, safe_path(file_path))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+            count += 1
+    return count
+
+def load_manifest(output_dir: str) -> Dict[str, Dict[str, Any]]:
+    """Finished flows by flow id from an earlier run of the same batch."""
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return {record["flow_id"]: record for record in records if record["status"] == "completed"}
+
+def migrate_flow(name: str, content: str, output_dir: str) -> Dict[str, Any]:
+    """Run the agent pipeline for one flow (or group) and write its artifacts."""
+    record_id = flow_id(content)
+    # The run id is derived from the flow so a rerun finds an interrupted run's checkpoint
+    run_id = f"batch-{record_id}"
+    start = time.perf_counter()
+    try:
+        with retrieval_run():
+            if pending_nodes(helper.graph, run_id):
+                updates = helper.resume_agentic_workflow(run_id)
+            else:
+                inputs = {f"tab{i}": "" for i in range(1, 8)}
+                inputs["tab1"] = content
+                updates = helper.stream_agentic_workflow(inputs, run_id)
+            for _ in updates:
+                pass
+        outputs = helper.run_outputs(run_id)
+        files = write_artifacts(output_dir, name, outputs)
+        return {"flow_id": record_id, "name": name, "status": "completed", "run_id": run_id, "files": files, "seconds": round(time.perf_counter() - start, 3)}
+    except Exception as e:
+        logger.error(f"Migration of {name} failed: {e}")
+        return {"flow_id": record_id, "name": name, "status": "failed", "run_id": run_id, "error": f"{e.__class__.__name__}: {e}", "seconds": round(time.perf_counter() - start, 3)}
+
+def run_batch(source: str, output_dir: str, workers: int, llm_concurrency: int, group_by: str = "flow", force: bool = False) -> Dict[str, Any]:
+    flows = collect_flows(source, group_by)
+    os.makedirs(output_dir, exist_ok=True)
+    done = {} if force else load_manifest(output_dir)
+    # Identical flows share a run id (and checkpoint thread), so each is migrated once
+    unique: Dict[str, Tuple[str, str]] = {}
+    for name, content in flows:
+        unique.setdefault(flow_id(content), (name, content))
+    pending = [(name, content) for record_id, (name, content) in unique.items() if record_id not in done]
+
+    bounded = BoundedLLM(helper.llm, llm_concurrency)
+    helper.llm = bounded
+    memo_hits = get_node_memo().stats["hits"]
+    statuses = Counter()
+    latencies = []
+    manifest_lock = threading.Lock()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool, open(os.path.join(output_dir, MANIFEST_FILE), "a", encoding="utf-8") as manifest:
+        futures = {pool.submit(migrate_flow, name, content, output_dir): name for name, content in pending}
+        for i, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            statuses[record["status"]] += 1
+            latencies.append(record["seconds"])
+            with manifest_lock:
+                manifest.write(json.dumps(record) + "\n")
+                manifest.flush()
+            print(f"[{i}/{len(pending)}] {record['status']:9} {record['name']} ({record['seconds']:.1f}s)", flush=True)
+    wall_seconds = time.perf_counter() - start
+
+    return {
+        "source": source,
+        "output": output_dir,
+        "flows": len(flows),
+        "duplicates": len(flows) - len(unique),
+        "skipped": len(unique) - len(pending),
+        "completed": statuses["completed"],
+        "failed": statuses["failed"],
+        "workers": workers,
+        "llm_concurrency": llm_concurrency,
+        "wall_seconds": round(wall_seconds, 3),
+        "flows_per_minute": round(len(pending) / wall_seconds * 60, 2) if pending and wall_seconds else None,
+        "latency_seconds": {
+            "p50": round(float(np.percentile(latencies, 50)), 3),
+            "p95": round(float(np.percentile(latencies, 95)), 3),
+            "max": round(float(np.max(latencies)), 3)
+        } if latencies else None,
+        "llm_calls": bounded.calls,
+        "llm_seconds": round(bounded.seconds, 3),
+        "memoized_outputs_reused": get_node_memo().stats["hits"] - memo_hits
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate a directory or ZIP of webMethods flows without the UI.")
+    parser.add_argument("source", help="Directory or ZIP file of .xml/.html flow files")
+    parser.add_argument("--output", default=os.path.join("outputs", "batch"))
+    parser.add_argument("--workers", type=int, default=4, help="Flows migrated concurrently")
+    parser.add_argument("--llm-concurrency", type=int, default=4, help="LLM calls in flight across all workers")
+    parser.add_argument("--group-by", choices=["flow", "directory"], default="flow", help="One pipeline run per flow file or per directory of flows")
+    parser.add_argument("--force", action="store_true", help="Migrate flows already recorded in the manifest again")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    summary = run_batch(args.source, args.output, args.workers, args.llm_concurrency, args.group_by, args.force)
+    print(json.dumps(summary, indent=2))
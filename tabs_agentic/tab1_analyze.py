@@ -1,5 +1,5 @@
 import streamlit as st
-from utils.agentic_helper import run_agentic_workflow
+from utils.job_queue import submit_job, job_result_ui
 from utils.file_helper import create_zip_download
 import os
 import zipfile
@@ -17,17 +17,20 @@ def analyze_webmethods():
             inputs = {
                 "tab1": f"Files:\n{'---'.join(flow_contents)}\nPreferences: Granularity={granularity}, Focus Areas={', '.join(focus_area)}"
             }
-            outputs = run_agentic_workflow(inputs, "tab1")
-            
-            files_dict = parse_ai_response_to_files(outputs.get("tab1", "No output generated"))
-            st.session_state.progress["tab1"] = "Completed"
-            st.markdown("### Generated Microservices Suggestions")
-            for file_path, content in files_dict.items():
-                st.subheader(file_path)
-                st.markdown(content)
-            create_project_zip(files_dict)
+            # Run the agentic workflow as a background job; its result survives reruns
+            st.session_state.setdefault("jobs", {})["tab1"] = submit_job("agentic_tab", {"inputs": inputs, "current_tab": "tab1"})
         else:
             st.warning("Please upload at least one flow file.")
+
+    outputs = job_result_ui(st.session_state.get("jobs", {}).get("tab1"))
+    if outputs is not None:
+        files_dict = parse_ai_response_to_files(outputs.get("tab1", "No output generated"))
+        st.session_state.progress["tab1"] = "Completed"
+        st.markdown("### Generated Microservices Suggestions")
+        for file_path, content in files_dict.items():
+            st.subheader(file_path)
+            st.markdown(content)
+        create_project_zip(files_dict)
     st.text(f"Progress: {st.session_state.progress['tab1']}")
 
 def parse_ai_response_to_files(response):
@@ -1,5 +1,5 @@
 import streamlit as st
-from utils.agentic_helper import run_agentic_workflow
+from utils.job_queue import submit_job, job_result_ui
 from utils.file_helper import create_zip_download
 import os
 import zipfile
@@ -47,9 +47,11 @@ def design_architecture():
             "tab2": input_data
         }
         
-        # Run the agentic workflow
-        outputs = run_agentic_workflow(inputs, "tab2")
-        
+        # Run the agentic workflow as a background job; its result survives reruns
+        st.session_state.setdefault("jobs", {})["tab2"] = submit_job("agentic_tab", {"inputs": inputs, "current_tab": "tab2"})
+
+    outputs = job_result_ui(st.session_state.get("jobs", {}).get("tab2"))
+    if outputs is not None:
         # Parse and display response
         files_dict = parse_ai_response_to_files(outputs.get("tab2", "No output generated"))
         
@@ -1,5 +1,5 @@
 import streamlit as st
-from utils.agentic_helper import run_agentic_workflow
+from utils.job_queue import submit_job, job_result_ui
 from utils.file_helper import create_zip_download
 import os
 import zipfile
@@ -34,9 +34,14 @@ def generate_microservices():
             "tab3": input_data
         }
         
-        # Run the agentic workflow
-        outputs = run_agentic_workflow(inputs, "tab3")
-        
+        # Run the agentic workflow as a background job; its result survives reruns
+        st.session_state.setdefault("jobs", {})["tab3"] = submit_job("agentic_tab", {"inputs": inputs, "current_tab": "tab3"})
+        # The text input may change while the job runs; the ZIP uses the submitted name
+        st.session_state.tab3_job_service_name = service_name
+
+    job_id = st.session_state.get("jobs", {}).get("tab3")
+    outputs = job_result_ui(job_id)
+    if outputs is not None:
         # Parse and display response
         files_dict = parse_ai_response_to_files(outputs.get("tab3", "No output generated"))
         
@@ -46,8 +51,18 @@ def generate_microservices():
             st.subheader(file_path)
             st.code(content, language="java" if file_path.endswith(".java") else "xml" if file_path.endswith(".xml") else "yaml")
         
-        # Create ZIP with project structure
-        create_project_zip(service_name, files_dict)
+        # Create ZIP with project structure once per finished job, not on every rerun
+        job_service_name = st.session_state.get("tab3_job_service_name", service_name)
+        if st.session_state.get("tab3_zip_job") != job_id or not os.path.exists(st.session_state.tab3_zip_path):
+            st.session_state.tab3_zip_path = create_project_zip(job_service_name, files_dict)
+            st.session_state.tab3_zip_job = job_id
+        with open(st.session_state.tab3_zip_path, "rb") as f:
+            st.download_button(
+                label=f"Download {job_service_name} Project ZIP",
+                data=f,
+                file_name=f"{job_service_name}_project.zip",
+                mime="application/zip"
+            )
     
     st.text(f"Progress: {st.session_state.progress['tab3']}")
 
@@ -72,7 +87,7 @@ def parse_ai_response_to_files(response):
     return files_dict
 
 def create_project_zip(service_name, files_dict):
-    """Create a ZIP file with a Maven project structure."""
+    """Create a ZIP file with a Maven project structure and return its path."""
     output_dir = "outputs"
     os.makedirs(output_dir, exist_ok=True)
     zip_path = f"{output_dir}/{service_name}_project.zip"
@@ -87,14 +102,7 @@ def create_project_zip(service_name, files_dict):
                 f.write(content)
             zipf.write(temp_path, full_path)
             os.remove(temp_path)
-    
-    with open(zip_path, "rb") as f:
-        st.download_button(
-            label=f"Download {service_name} Project ZIP",
-            data=f,
-            file_name=f"{service_name}_project.zip",
-            mime="application/zip"
-        )
+    return zip_path
 
 # Ensure this runs only when imported as a module
 if __name__ == "__main__":
@@ -1,5 +1,5 @@
 import streamlit as st
-from utils.agentic_helper import run_agentic_workflow
+from utils.job_queue import submit_job, job_result_ui
 from utils.file_helper import create_zip_download
 import os
 import zipfile
@@ -40,9 +40,11 @@ def generate_unit_tests():
             "tab5": input_data
         }
         
-        # Run the agentic workflow
-        outputs = run_agentic_workflow(inputs, "tab5")
-        
+        # Run the agentic workflow as a background job; its result survives reruns
+        st.session_state.setdefault("jobs", {})["tab5"] = submit_job("agentic_tab", {"inputs": inputs, "current_tab": "tab5"})
+
+    outputs = job_result_ui(st.session_state.get("jobs", {}).get("tab5"))
+    if outputs is not None:
         # Parse and display response
         files_dict = parse_ai_response_to_files(outputs.get("tab5", "No output generated"))
         
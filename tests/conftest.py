@@ -0,0 +1,37 @@
+import os
+import re
+import sys
+import tempfile
+import zlib
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+# Tests import the app modules as `utils.*`, like the Streamlit apps run from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Helpers that create an LLM client at import time need a key; no request is sent
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+# Helpers open their SQLite files and artifact store at import time; keep them out of the tree
+_storage = tempfile.mkdtemp(prefix="migration-tests-")
+for name, file_name in [("CHECKPOINT_DB_PATH", "checkpoints.sqlite"), ("MEMO_DB_PATH", "node_memo.sqlite"), ("JOB_DB_PATH", "jobs.sqlite"), ("ARTIFACT_ROOT", "artifacts")]:
+    os.environ.setdefault(name, os.path.join(_storage, file_name))
+
+class FakeEmbeddings(Embeddings):
+    """Normalized bag-of-words vectors over hashed tokens: texts sharing words are close."""
+
+    def __init__(self, dim: int = 64):
+        self.dim = dim
+
+    def embed_query(self, text: str):
+        vector = np.zeros(self.dim, dtype="float32")
+        for word in re.findall(r"\w+", text.lower()):
+            vector[zlib.crc32(word.encode("utf-8")) % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+@pytest.fixture
+def fake_embeddings():
+    return FakeEmbeddings()
@@ -0,0 +1,44 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import utils.artifact_store as artifact_store
+from utils.artifact_store import is_artifact, load_artifact, load_artifacts, store_artifact
+
+@pytest.fixture(autouse=True)
+def artifact_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifact_store, "ARTIFACT_ROOT", str(tmp_path))
+    artifact_store._read.cache_clear()
+    return tmp_path
+
+def test_store_and_load_round_trip():
+    ref = store_artifact("### pom.xml\n<project/>")
+    assert is_artifact(ref)
+    assert ref["bytes"] == len("### pom.xml\n<project/>")
+    assert ref["summary"] == "### pom.xml <project/>"
+    assert load_artifact(ref) == "### pom.xml\n<project/>"
+
+def test_same_text_is_stored_once(artifact_root):
+    first, second = store_artifact("same"), store_artifact("same")
+    assert first == second
+    assert sum(len(files) for _, _, files in os.walk(artifact_root)) == 1
+
+def test_plain_strings_pass_through():
+    assert load_artifact("legacy text") == "legacy text"
+    assert load_artifact(None) == ""
+    assert load_artifacts({"tab1": store_artifact("a"), "tab2": "b"}) == {"tab1": "a", "tab2": "b"}
+
+def test_concurrent_writes_of_the_same_text(artifact_root):
+    text = "parallel agents " * 1000
+    with ThreadPoolExecutor(16) as pool:
+        refs = list(pool.map(lambda _: store_artifact(text), range(200)))
+    assert len({ref["artifact"] for ref in refs}) == 1
+    assert load_artifact(refs[0]) == text
+    assert not [name for _, _, files in os.walk(artifact_root) for name in files if name.endswith(".tmp")]
+
+def test_gc_removes_old_artifacts():
+    ref = store_artifact("old")
+    path = artifact_store.artifact_path(ref["artifact"])
+    os.utime(path, (0, 0))
+    store_artifact("new")
+    assert artifact_store.gc_artifacts(max_age_hours=1) == 1
+    assert not os.path.exists(path)
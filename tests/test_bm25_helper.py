@@ -0,0 +1,57 @@
+import numpy as np
+from langchain_core.documents import Document
+from utils.bm25_helper import BM25Index, build_sparse_index, hybrid_search, rrf_fuse, tokenize
+from utils.index_helper import build_vectorstore
+
+TEXTS = [
+    "Use pub.db:query to run a SQL statement against a JDBC adapter connection.",
+    "The flow service maps the input document to the output document.",
+    "pub.flow:throwExceptionForRetry signals a transient error to the caller.",
+    "Web service descriptors expose flow services over SOAP.",
+]
+
+def test_tokenize_keeps_identifiers_and_their_parts():
+    tokens = tokenize("Call pub.db:query now")
+    assert "pub.db:query" in tokens
+    assert {"pub", "db", "query"} <= set(tokens)
+
+def test_search_ranks_exact_identifier_first():
+    index = BM25Index.build(TEXTS)
+    results = index.search("pub.db:query", k=2)
+    assert results[0][0] == 0
+    assert results[0][1] > 0
+
+def test_search_returns_only_matching_documents():
+    index = BM25Index.build(TEXTS)
+    assert index.search("nonexistent", k=3) == []
+    assert [doc for doc, _ in index.search("flow", k=10)] and all(doc in (1, 2, 3) for doc, _ in index.search("flow", k=10))
+
+def test_search_respects_allowed_positions():
+    index = BM25Index.build(TEXTS)
+    results = index.search("flow service", k=4, allowed=np.array([3]))
+    assert [doc for doc, _ in results] == [3]
+
+def test_save_and_load_round_trip(tmp_path):
+    index = BM25Index.build(TEXTS)
+    index.save(str(tmp_path))
+    assert BM25Index.exists(str(tmp_path))
+    loaded = BM25Index.load(str(tmp_path))
+    assert loaded.search("transient error", k=2) == index.search("transient error", k=2)
+
+def test_rrf_fuse_rewards_documents_ranked_by_both():
+    fused = rrf_fuse([[1, 2, 3], [3, 1, 4]])
+    ids = [doc for doc, _ in fused]
+    assert ids[0] == 1  # ranks 1 and 2
+    assert ids[1] == 3  # ranks 3 and 1
+    assert set(ids) == {1, 2, 3, 4}
+    assert fused[0][1] == 1 / 61 + 1 / 62
+
+def test_rrf_fuse_single_ranking_keeps_order():
+    assert [doc for doc, _ in rrf_fuse([[5, 2, 9]])] == [5, 2, 9]
+
+def test_hybrid_search_finds_identifier_the_dense_ranking_misses(fake_embeddings):
+    vectorstore, _ = build_vectorstore([Document(page_content=text) for text in TEXTS], fake_embeddings)
+    sparse_index = build_sparse_index(vectorstore)
+    # A dense ranking that puts the identifier chunk last; BM25 lifts it back up
+    positions = hybrid_search("pub.db:query", vectorstore, sparse_index, k=2, dense=[1, 3, 2, 0])
+    assert 0 in positions
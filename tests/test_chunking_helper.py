@@ -0,0 +1,31 @@
+from langchain_core.documents import Document
+from utils.chunking_helper import drop_near_duplicates, minhash_signature
+
+PARAGRAPH = (
+    "The pub.client:soapClient service sends a SOAP message to a web service endpoint and "
+    "returns the response document. Configure the endpoint alias, the transport headers and "
+    "the timeout before invoking the service from a flow step in Designer."
+)
+
+def test_minhash_signature_is_deterministic():
+    assert (minhash_signature(PARAGRAPH) == minhash_signature(PARAGRAPH)).all()
+
+def test_drop_near_duplicates_removes_repeated_chunks():
+    chunks = [
+        Document(page_content=PARAGRAPH, metadata={"page": 1}),
+        Document(page_content=PARAGRAPH + " ", metadata={"page": 7}),
+        Document(page_content=PARAGRAPH.replace("Designer", "Designer."), metadata={"page": 9}),
+    ]
+    kept, dropped = drop_near_duplicates(chunks)
+    assert dropped == 2
+    assert kept[0].metadata["page"] == 1  # the first occurrence is kept
+
+def test_drop_near_duplicates_keeps_distinct_chunks():
+    chunks = [
+        Document(page_content=PARAGRAPH),
+        Document(page_content="WS-Security policies attach username tokens and signatures to outbound messages for the provider."),
+        Document(page_content="MTOM streaming sends large binary attachments without base64 encoding them inside the envelope."),
+    ]
+    kept, dropped = drop_near_duplicates(chunks)
+    assert dropped == 0
+    assert kept == chunks
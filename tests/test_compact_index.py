@@ -0,0 +1,57 @@
+import numpy as np
+from utils.compact_index import CompactIndex
+
+def random_vectors(n, d=32, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, d)).astype("float32")
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def exact_top_k(vectors, query, k):
+    distances = ((vectors - query) ** 2).sum(axis=1)
+    return np.argsort(distances)[:k].tolist()
+
+def test_search_small_index_is_exact():
+    # Fewer vectors than the rescoring pool: every vector is rescored in float16
+    vectors = random_vectors(50)
+    index = CompactIndex(32)
+    index.add(vectors)
+    query = vectors[7] + 0.01
+    distances, positions = index.search(query[None, :], k=5)
+    assert positions[0].tolist() == exact_top_k(vectors, query, 5)
+    assert np.all(np.diff(distances[0]) >= 0)
+
+def test_search_finds_itself_in_large_index():
+    vectors = random_vectors(2000)
+    index = CompactIndex(32)
+    index.add(vectors)
+    _, positions = index.search(vectors[[3, 1500]], k=1)
+    assert positions[:, 0].tolist() == [3, 1500]
+
+def test_search_restricted_to_allowed_positions():
+    vectors = random_vectors(300)
+    index = CompactIndex(32)
+    index.add(vectors)
+    allowed = np.arange(100, 200)
+    _, positions = index.search(vectors[[5]], k=10, allowed=allowed)
+    assert set(positions[0].tolist()) <= set(allowed.tolist())
+    assert positions[0].tolist() == (100 + np.array(exact_top_k(vectors[100:200], vectors[5], 10))).tolist()
+
+def test_search_pads_when_fewer_than_k():
+    vectors = random_vectors(3)
+    index = CompactIndex(32)
+    index.add(vectors)
+    distances, positions = index.search(vectors[:1], k=5)
+    assert positions[0, 3:].tolist() == [-1, -1]
+    assert np.isinf(distances[0, 3:]).all()
+    _, empty = CompactIndex(32).search(vectors[:1], k=2)
+    assert empty.tolist() == [[-1, -1]]
+
+def test_save_and_load(tmp_path):
+    vectors = random_vectors(40)
+    index = CompactIndex(32)
+    index.add(vectors)
+    index.save(str(tmp_path))
+    assert CompactIndex.exists(str(tmp_path))
+    loaded = CompactIndex.load(str(tmp_path))
+    assert loaded.ntotal == 40
+    assert loaded.search(vectors[:2], k=3)[1].tolist() == index.search(vectors[:2], k=3)[1].tolist()
@@ -0,0 +1,47 @@
+from langchain_core.documents import Document
+from utils.context_helper import RetrievalRun, current_run, estimate_tokens, retrieval_run
+
+def chunk(text: str, tokens: int = 10) -> Document:
+    return Document(page_content=text.ljust(tokens * 4, "."))
+
+CHUNKS = {
+    "handlers": [chunk("handlers"), chunk("soap headers"), chunk("ws-security")],
+    "security": [chunk("ws-security"), chunk("ws-policy"), chunk("soap headers")],
+}
+
+def search_for(calls):
+    def search(query, k):
+        calls.append(query)
+        return CHUNKS[query][:k]
+    return search
+
+def test_chunks_sent_to_one_agent_are_skipped_for_the_next():
+    run = RetrievalRun(token_budget=100)
+    first = run.retrieve("handlers", search_for([]))
+    second = run.retrieve("security", search_for([]))
+    assert first.split("\n") == [doc.page_content for doc in CHUNKS["handlers"]]
+    assert second == chunk("ws-policy").page_content
+    assert run.stats["duplicates_skipped"] == 2
+    assert run.stats["chunks_sent"] == 4
+
+def test_context_is_packed_into_the_token_budget():
+    run = RetrievalRun(token_budget=25)
+    context = run.retrieve("handlers", search_for([]))
+    assert context.split("\n") == [chunk("handlers").page_content, chunk("soap headers").page_content]
+    assert run.stats["tokens_sent"] == 20
+    assert estimate_tokens(run.retrieve("security", search_for([]), token_budget=5)) == 10  # the best chunk is kept
+
+def test_repeated_query_is_cached_unless_searched_differently():
+    calls = []
+    run = RetrievalRun(token_budget=100)
+    first = run.retrieve("handlers", search_for(calls))
+    assert run.retrieve("handlers", search_for(calls)) == first
+    run.retrieve("handlers", search_for(calls), metadata_filter={"section_path": "Handlers"})
+    assert calls == ["handlers", "handlers"]
+    assert run.stats["cached_queries"] == 1
+
+def test_retrieval_run_scope():
+    assert current_run() is None
+    with retrieval_run() as run:
+        assert current_run() is run
+    assert current_run() is None
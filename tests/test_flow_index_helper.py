@@ -0,0 +1,40 @@
+import os
+from utils.flow_index_helper import FLOW_LOCK_FILE, FlowIndex, flow_id, flow_signature
+
+ORDER_FLOW = '<FLOW><INVOKE SERVICE="pub.db:query"/><MAP><FIELD NAME="orderId"/></MAP></FLOW>'
+INVOICE_FLOW = '<FLOW><INVOKE SERVICE="pub.client:http"/><BRANCH><FIELD NAME="invoiceNo"/></BRANCH></FLOW>'
+
+def test_flow_id_ignores_whitespace():
+    assert flow_id(ORDER_FLOW) == flow_id(ORDER_FLOW.replace(" SERVICE", "   SERVICE").replace(" NAME", "\n\tNAME") + "\n")
+
+def test_flow_signature_leads_with_services_and_steps():
+    signature = flow_signature(ORDER_FLOW)
+    assert signature.startswith("services: pub.db:query\nsteps: ")
+    assert "fields: orderId" in signature
+
+def test_search_returns_accepted_outputs(tmp_path, fake_embeddings):
+    index = FlowIndex(str(tmp_path), fake_embeddings)
+    assert index.search(ORDER_FLOW) == []
+    index.add(ORDER_FLOW, {"tab1": "order analysis"}, "order")
+    index.add(INVOICE_FLOW, {"tab1": "invoice analysis"}, "invoice")
+    matches = index.search(ORDER_FLOW, k=1, min_score=0.99)
+    assert [(m["name"], m["outputs"]) for m in matches] == [("order", {"tab1": "order analysis"})]
+
+def test_recording_again_replaces_outputs(tmp_path, fake_embeddings):
+    index = FlowIndex(str(tmp_path), fake_embeddings)
+    index.add(ORDER_FLOW, {"tab1": "v1"}, "order")
+    index.add(ORDER_FLOW, {"tab1": "v2"})
+    assert index.index.ntotal == 1
+    assert index.records[0]["outputs"] == {"tab1": "v2"}
+    assert index.records[0]["name"] == "order"
+
+def test_instances_see_and_keep_each_others_flows(tmp_path, fake_embeddings):
+    # Two instances stand in for the Streamlit process and a job worker
+    app, worker = FlowIndex(str(tmp_path), fake_embeddings), FlowIndex(str(tmp_path), fake_embeddings)
+    app.add(ORDER_FLOW, {"tab1": "order analysis"}, "order")
+    assert [m["name"] for m in worker.search(ORDER_FLOW, min_score=0.99)] == ["order"]
+    worker.add(INVOICE_FLOW, {"tab1": "invoice analysis"}, "invoice")
+    app.search(INVOICE_FLOW)
+    assert [r["name"] for r in app.records] == ["order", "invoice"]
+    assert FlowIndex(str(tmp_path), fake_embeddings).index.ntotal == 2
+    assert not os.path.exists(os.path.join(str(tmp_path), FLOW_LOCK_FILE))
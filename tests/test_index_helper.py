@@ -0,0 +1,91 @@
+import os
+import numpy as np
+from langchain_core.documents import Document
+from utils.index_helper import (
+    BUILDING_SUFFIX, VERSIONS_DIR, begin_version, build_vectorstore, current_index_path, filter_positions, gc_versions,
+    matches_filter, mmr_select, publish_version, read_current_version, save_index
+)
+
+def test_matches_filter_substring_terms():
+    metadata = {"section_path": "Web Services > Handlers > SOAP Headers", "page": 120}
+    assert matches_filter(metadata, {"section_path": "handlers"})
+    assert matches_filter(metadata, {"section_path": ["MTOM", "SOAP Headers"]})
+    assert not matches_filter(metadata, {"section_path": ["MTOM", "WS-Security"]})
+
+def test_matches_filter_numeric_range_and_missing_key():
+    metadata = {"page": 120}
+    assert matches_filter(metadata, {"page": {"min": 100, "max": 150}})
+    assert matches_filter(metadata, {"page": {"min": 120}})
+    assert not matches_filter(metadata, {"page": {"max": 119}})
+    assert not matches_filter(metadata, {"section_path": "Handlers"})
+
+def test_matches_filter_requires_every_key():
+    metadata = {"section_path": "Handlers", "page": 10}
+    assert not matches_filter(metadata, {"section_path": "Handlers", "page": {"min": 11}})
+    assert matches_filter(metadata, {})
+
+def test_filter_positions(fake_embeddings):
+    docs = [Document(page_content=f"chunk {i}", metadata={"page": i}) for i in range(10)]
+    vectorstore, _ = build_vectorstore(docs, fake_embeddings)
+    assert filter_positions(vectorstore, {"page": {"min": 7}}).tolist() == [7, 8, 9]
+
+def test_mmr_select_starts_with_most_relevant_and_skips_near_copies():
+    query = np.array([1.0, 0.0, 0.0])
+    candidates = np.array([
+        [1.0, 0.0, 0.0],    # most relevant
+        [0.99, 0.01, 0.0],  # near copy of the first
+        [0.7, 0.7, 0.0],    # relevant and different
+    ])
+    selected = mmr_select(query, candidates, k=2, lambda_mult=0.3)
+    assert selected == [0, 2]
+
+def test_mmr_select_pure_relevance_and_bounds():
+    query = np.array([1.0, 0.0])
+    candidates = np.array([[0.5, 0.5], [1.0, 0.0], [0.9, 0.1]])
+    assert mmr_select(query, candidates, k=3, lambda_mult=1.0) == [1, 2, 0]
+    assert len(mmr_select(query, candidates, k=10)) == 3
+    assert mmr_select(query, np.zeros((0, 2)), k=3) == []
+
+def publish(path, fake_embeddings, version):
+    """Publish a one-chunk index under a given version name (names sort by build time)."""
+    vectorstore, meta = build_vectorstore([Document(page_content="chunk")], fake_embeddings)
+    building_path = os.path.join(path, VERSIONS_DIR, version + BUILDING_SUFFIX)
+    save_index(vectorstore, building_path, version=version, **meta)
+    return publish_version(path, version, building_path)
+
+def test_publish_version_moves_current_pointer(tmp_path, fake_embeddings):
+    path = str(tmp_path)
+    assert current_index_path(path) is None
+    first_path = publish(path, fake_embeddings, "20260101000000-aaaaaa")
+    assert read_current_version(path) == "20260101000000-aaaaaa"
+    assert current_index_path(path) == first_path
+    second_path = publish(path, fake_embeddings, "20260101000001-bbbbbb")
+    assert read_current_version(path) == "20260101000001-bbbbbb"
+    assert current_index_path(path) == second_path
+    assert os.path.isdir(first_path)
+
+def test_gc_versions_keeps_current_and_newest(tmp_path, fake_embeddings):
+    path = str(tmp_path)
+    versions = [f"2026010100000{i}-abcdef" for i in range(4)]
+    for version in versions:
+        publish(path, fake_embeddings, version)
+    assert sorted(gc_versions(path, keep=2)) == versions[:2]
+    assert sorted(os.listdir(os.path.join(path, VERSIONS_DIR))) == versions[2:]
+
+def test_gc_versions_never_removes_current(tmp_path, fake_embeddings):
+    path = str(tmp_path)
+    for version in ["20260101000000-aaaaaa", "20260101000001-bbbbbb"]:
+        publish(path, fake_embeddings, version)
+    # Roll back: the older version is current again
+    with open(os.path.join(path, "CURRENT"), "w") as f:
+        f.write("20260101000000-aaaaaa")
+    assert gc_versions(path, keep=0) == ["20260101000001-bbbbbb"]
+    assert current_index_path(path) == os.path.join(path, VERSIONS_DIR, "20260101000000-aaaaaa")
+
+def test_gc_versions_leaves_recent_builds(tmp_path, fake_embeddings):
+    path = str(tmp_path)
+    publish(path, fake_embeddings, "20260101000000-aaaaaa")
+    _, building_path = begin_version(path)
+    gc_versions(path, keep=0)
+    assert os.path.isdir(building_path)
+    assert current_index_path(path) is not None
@@ -0,0 +1,60 @@
+import time
+import pytest
+import utils.job_queue as job_queue
+from utils.job_queue import JOB_COMPLETED, JOB_FAILED, JOB_RUNNING, claim_next_job, cleanup_jobs, finish_job, get_job, job_db, submit_job
+
+@pytest.fixture(autouse=True)
+def temp_job_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_DB_PATH", str(tmp_path / "jobs.sqlite"))
+    monkeypatch.setattr(job_queue, "JOB_AUTOSTART_WORKERS", False)
+
+def stop_worker(pid):
+    """Age a worker's heartbeat past the stale cutoff, as if its process died."""
+    with job_db() as conn:
+        conn.execute("UPDATE workers SET heartbeat = ? WHERE pid = ?", (time.time() - job_queue.JOB_STALE_SECONDS - 1, pid))
+
+def test_claim_and_complete():
+    job_id = submit_job("ma_agentic", {"run_id": "r1"})
+    job = claim_next_job(pid=101)
+    assert job == {"id": job_id, "kind": "ma_agentic", "payload": {"run_id": "r1"}}
+    assert get_job(job_id)["status"] == JOB_RUNNING
+    assert claim_next_job(pid=102) is None
+    finish_job(job_id, result={"outputs": {}})
+    job = get_job(job_id)
+    assert (job["status"], job["result"], job["attempts"]) == (JOB_COMPLETED, {"outputs": {}}, 1)
+
+def test_claimed_job_is_not_stale_before_first_heartbeat():
+    first = submit_job("ma_agentic", {"run_id": "r1"})
+    claim_next_job(pid=101)
+    second = submit_job("ma_agentic", {"run_id": "r2"})
+    assert claim_next_job(pid=102)["id"] == second
+    assert get_job(first)["worker_pid"] == 101
+
+def test_stale_job_is_requeued():
+    job_id = submit_job("ma_agentic", {"run_id": "r1"})
+    claim_next_job(pid=101)
+    stop_worker(101)
+    assert claim_next_job(pid=102)["id"] == job_id
+    job = get_job(job_id)
+    assert (job["status"], job["worker_pid"], job["attempts"]) == (JOB_RUNNING, 102, 2)
+
+def test_exhausted_job_fails_and_is_cleaned_up(monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_MAX_ATTEMPTS", 1)
+    job_id = submit_job("ma_agentic", {"run_id": "r1"})
+    claim_next_job(pid=101)
+    stop_worker(101)
+    assert claim_next_job(pid=102) is None
+    job = get_job(job_id)
+    assert (job["status"], job["error"]) == (JOB_FAILED, "worker stopped")
+    assert job["finished_at"] is not None
+    assert cleanup_jobs(max_age_hours=-1) == 1
+    assert get_job(job_id) is None
+
+def test_cleanup_keeps_unfinished_and_recent_jobs():
+    running = submit_job("ma_agentic", {"run_id": "r1"})
+    claim_next_job(pid=101)
+    done = submit_job("ma_agentic", {"run_id": "r2"})
+    finish_job(done, result={})
+    assert cleanup_jobs() == 0
+    assert cleanup_jobs(max_age_hours=-1) == 1
+    assert get_job(running) is not None and get_job(done) is None
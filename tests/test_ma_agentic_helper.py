@@ -0,0 +1,94 @@
+import pytest
+from langchain_core.messages import AIMessage
+import utils.memo_helper as memo_helper
+import utils.ma_agentic_helper as helper
+from utils.checkpoint_helper import RUN_FAILED, new_run_id, pending_nodes, resumable_runs
+
+PLAN = {f"tab{i}": f"step {i}" for i in range(1, 8)}
+INPUTS = {f"tab{i}": f"input {i}" for i in range(1, 8)}
+
+@pytest.fixture
+def agents(monkeypatch):
+    """Record agent executions instead of calling the LLM; agents in `failing` raise once."""
+    calls, failing = [], set()
+
+    def invoke(agent, prompt, state, inputs):
+        calls.append(agent)
+        if agent in failing:
+            failing.discard(agent)
+            raise RuntimeError(f"{agent} failed")
+        return f"### {agent}.md\noutput of {agent}"
+
+    monkeypatch.setattr(helper, "invoke_memoized", invoke)
+    monkeypatch.setattr(helper, "retrieve_context", lambda query, agent=None: "context")
+    monkeypatch.setattr(helper, "find_similar_flows", lambda content: [])
+    monkeypatch.setattr(memo_helper, "MEMO_ENABLED", False)
+    return calls, failing
+
+def test_resume_runs_only_the_failed_node_and_later_ones(agents):
+    calls, failing = agents
+    failing.add("designer")
+    run_id = new_run_id()
+    with pytest.raises(RuntimeError):
+        for _ in helper.stream_agentic_workflow(INPUTS, run_id, PLAN):
+            pass
+    assert calls == ["analyzer", "designer"]
+    assert pending_nodes(helper.graph, run_id) == ["designer"]
+    assert run_id in [run["run_id"] for run in resumable_runs(helper.GRAPH_NAME) if run["status"] == RUN_FAILED]
+
+    calls.clear()
+    for _ in helper.resume_agentic_workflow(run_id):
+        pass
+    assert calls[:2] == ["designer", "generator"]
+    assert sorted(calls[2:5]) == ["boomi_integrator", "migrator", "tester"]
+    assert calls[5:] == ["howto_writer"]
+    assert sorted(helper.run_outputs(run_id)) == [f"tab{i}" for i in range(1, 8)]
+    assert run_id not in [run["run_id"] for run in resumable_runs(helper.GRAPH_NAME)]
+
+def test_resume_after_a_parallel_agent_failed(agents):
+    calls, failing = agents
+    failing.add("migrator")
+    run_id = new_run_id()
+    with pytest.raises(RuntimeError):
+        for _ in helper.stream_agentic_workflow(INPUTS, run_id, PLAN):
+            pass
+    calls.clear()
+    for _ in helper.resume_agentic_workflow(run_id):
+        pass
+    # Agents that finished before the failure keep their checkpointed writes; only
+    # agents of the failed step that were still running are executed again
+    assert set(calls[:-1]) <= set(helper.PARALLEL_AGENTS) and "migrator" in calls
+    assert calls[-1] == "howto_writer"
+
+def test_requeued_job_of_a_finished_run_returns_its_outputs(agents):
+    calls, _ = agents
+    run_id = new_run_id()
+    first = helper.run_workflow_job(run_id, INPUTS, PLAN)
+    calls.clear()
+    again = helper.run_workflow_job(run_id, INPUTS, PLAN)
+    assert calls == []
+    assert again["agent_calls"] == {}
+    assert again["outputs"] == first["outputs"]
+
+def test_plan_is_cached_until_prompt_or_context_changes(tmp_path, monkeypatch):
+    responses = []
+
+    class PlanningLLM:
+        model, temperature = "fake", 0.0
+
+        def invoke(self, prompt):
+            responses.append(prompt)
+            return AIMessage(content='Plan: {"tab1": "analyze %d"}' % len(responses))
+
+    context = ["orders docs"]
+    monkeypatch.setattr(helper, "llm", PlanningLLM())
+    monkeypatch.setattr(helper, "retrieve_context", lambda query, agent=None: context[0])
+    monkeypatch.setattr(helper, "MEMO_ENABLED", True)
+    monkeypatch.setattr(memo_helper, "_node_memo", memo_helper.NodeMemo(str(tmp_path / "memo.sqlite")))
+
+    assert helper.generate_plan("migrate orders") == {"tab1": "analyze 1"}
+    assert helper.generate_plan("migrate orders") == {"tab1": "analyze 1"}
+    assert helper.generate_plan("migrate invoices") == {"tab1": "analyze 2"}
+    context[0] = "updated docs"
+    assert helper.generate_plan("migrate orders") == {"tab1": "analyze 3"}
+    assert len(responses) == 3
@@ -0,0 +1,44 @@
+import pytest
+import utils.memo_helper as memo_helper
+from utils.memo_helper import NodeMemo, memo_key, memoized
+
+KEY_ARGS = dict(node="tester", template_version="1", model="gemini@0.3", inputs="spec")
+
+def test_memo_key_changes_with_upstream_output():
+    key = memo_key(**KEY_ARGS, upstream={"tab3": "code v1"})
+    assert memo_key(**KEY_ARGS, upstream={"tab3": "code v1"}) == key
+    assert memo_key(**KEY_ARGS, upstream={"tab3": "code v2"}) != key
+
+def test_memo_key_changes_with_inputs_template_and_model():
+    key = memo_key(**KEY_ARGS, upstream={})
+    assert memo_key(**{**KEY_ARGS, "inputs": "other"}, upstream={}) != key
+    assert memo_key(**{**KEY_ARGS, "template_version": "2"}, upstream={}) != key
+    assert memo_key(**{**KEY_ARGS, "model": "gemini@0.7"}, upstream={}) != key
+    assert memo_key(**{**KEY_ARGS, "node": "migrator"}, upstream={}) != key
+
+@pytest.fixture
+def node_memo(tmp_path, monkeypatch):
+    memo = NodeMemo(str(tmp_path / "memo.sqlite"))
+    monkeypatch.setattr(memo_helper, "_node_memo", memo)
+    monkeypatch.setattr(memo_helper, "MEMO_ENABLED", True)
+    return memo
+
+def test_memoized_reuses_output_until_upstream_changes(node_memo):
+    calls = []
+
+    def generate():
+        calls.append(1)
+        return f"tests {len(calls)}"
+
+    assert memoized(**KEY_ARGS, upstream={"tab3": "code v1"}, generate=generate) == "tests 1"
+    assert memoized(**KEY_ARGS, upstream={"tab3": "code v1"}, generate=generate) == "tests 1"
+    assert memoized(**KEY_ARGS, upstream={"tab3": "code v2"}, generate=generate) == "tests 2"
+    assert len(calls) == 2
+    assert node_memo.stats == {"misses": 2, "hits": 1}
+
+def test_clear_one_node(node_memo):
+    node_memo.put("a", "tester", "x")
+    node_memo.put("b", "migrator", "y")
+    assert node_memo.clear("tester") == 1
+    assert node_memo.get("a") is None
+    assert node_memo.get("b") == "y"
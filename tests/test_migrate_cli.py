@@ -0,0 +1,105 @@
+import os
+import json
+import threading
+import pytest
+from langchain_core.messages import AIMessage
+import utils.memo_helper as memo_helper
+import utils.ma_agentic_helper as helper
+from migrate_cli import BoundedLLM, run_batch
+
+class FakeLLM:
+    """Chat model stand-in: a plan for planning prompts, one file for agent prompts."""
+
+    model = "fake"
+    temperature = 0.0
+
+    def __init__(self, fail_once_on: str = None):
+        self.prompts = []
+        self.fail_once_on = fail_once_on
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt):
+        with self._lock:
+            self.prompts.append(prompt)
+            if self.fail_once_on and self.fail_once_on in prompt:
+                self.fail_once_on = None
+                raise RuntimeError("LLM unavailable")
+        if "generate a plan" in prompt:
+            return AIMessage(content=json.dumps({f"tab{i}": f"step {i}" for i in range(1, 8)}))
+        return AIMessage(content="### output.md\ngenerated")
+
+@pytest.fixture
+def llm(monkeypatch):
+    monkeypatch.setattr(helper, "retrieve_context", lambda query, agent=None: "context")
+    monkeypatch.setattr(helper, "find_similar_flows", lambda content: [])
+    monkeypatch.setattr(helper, "MEMO_ENABLED", False)
+    monkeypatch.setattr(memo_helper, "MEMO_ENABLED", False)
+
+    def install(fake):
+        monkeypatch.setattr(helper, "llm", fake)  # run_batch wraps helper.llm; restored after the test
+        return fake
+    return install
+
+def write_flows(directory, flows):
+    for name, content in flows.items():
+        path = os.path.join(directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+    return str(directory)
+
+def test_identical_flows_are_migrated_once(tmp_path, llm):
+    fake = llm(FakeLLM())
+    source = write_flows(tmp_path / "flows", {
+        "orders.xml": "<FLOW>orders identical</FLOW>",
+        "orders_copy.xml": "<FLOW>orders identical</FLOW>",
+        "invoices.xml": "<FLOW>invoices once</FLOW>",
+    })
+    summary = run_batch(source, str(tmp_path / "out"), workers=2, llm_concurrency=2)
+    assert (summary["flows"], summary["duplicates"], summary["completed"], summary["failed"]) == (3, 1, 2, 0)
+    assert sorted(os.listdir(tmp_path / "out")) == ["invoices", "manifest.jsonl", "orders"]
+    assert len(fake.prompts) == 2 * 8  # planning and seven agents per flow
+
+def test_rerun_skips_completed_flows_and_resumes_interrupted_ones(tmp_path, llm):
+    # One worker migrates billing first; its designer call fails once
+    fake = llm(FakeLLM(fail_once_on="Design a microservices architecture"))
+    source = write_flows(tmp_path / "flows", {
+        "billing.xml": "<FLOW>billing resumed</FLOW>",
+        "shipping.xml": "<FLOW>shipping skipped</FLOW>",
+    })
+    output = str(tmp_path / "out")
+    first = run_batch(source, output, workers=1, llm_concurrency=1)
+    assert (first["completed"], first["failed"]) == (1, 1)
+
+    fake.prompts.clear()
+    second = run_batch(source, output, workers=2, llm_concurrency=2)
+    assert (second["skipped"], second["completed"], second["failed"]) == (1, 1, 0)
+    # Billing resumes at the designer: the planner and analyzer are not called again
+    assert len(fake.prompts) == 6
+    assert "Design a microservices architecture" in fake.prompts[0]
+    assert os.path.exists(os.path.join(output, "billing", "howto", "output.md"))
+
+def test_bounded_llm_caps_concurrent_calls():
+    lock, running, peak = threading.Lock(), [0], [0]
+
+    class SlowLLM:
+        model = "slow"
+
+        def invoke(self, prompt):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            threading.Event().wait(0.02)
+            with lock:
+                running[0] -= 1
+            return prompt
+
+    bounded = BoundedLLM(SlowLLM(), limit=2)
+    threads = [threading.Thread(target=bounded.invoke, args=(f"p{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == 2
+    assert bounded.calls == 8
+    assert bounded.model == "slow"
@@ -0,0 +1,64 @@
+import socket
+import threading
+import urllib.error
+from http.server import ThreadingHTTPServer
+import pytest
+from langchain_core.documents import Document
+from utils.retrieval_daemon import MicroBatcher, RetrievalClient, make_handler
+
+class FakeService:
+    """search_batch that echoes each query and records the batches it received."""
+
+    def __init__(self):
+        self.batches = []
+
+    def search_batch(self, queries, corpus="docs", k=3, metadata_filter=None, diversify=None):
+        self.batches.append((list(queries), metadata_filter))
+        if "fail" in queries:
+            raise RuntimeError("search failed")
+        return [[Document(page_content=f"{query} in {corpus}", metadata={"k": k})] for query in queries]
+
+def test_concurrent_queries_share_one_batch():
+    service = FakeService()
+    batcher = MicroBatcher(service, max_size=8, max_wait_ms=200)
+    futures = [batcher.submit(f"q{i}", "docs", 3) for i in range(5)]
+    assert [future.result(timeout=5)[0].page_content for future in futures] == [f"q{i} in docs" for i in range(5)]
+    assert service.batches == [([f"q{i}" for i in range(5)], None)]
+
+def test_batches_are_split_by_filter_and_errors_reach_every_caller():
+    service = FakeService()
+    batcher = MicroBatcher(service, max_size=8, max_wait_ms=200)
+    filtered = batcher.submit("q1", "docs", 3, {"section_path": "MTOM"})
+    failing = [batcher.submit("fail", "docs", 3), batcher.submit("q2", "docs", 3)]
+    assert filtered.result(timeout=5)[0].page_content == "q1 in docs"
+    for future in failing:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=5)
+    assert sorted(len(queries) for queries, _ in service.batches) == [1, 2]
+
+def closed_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def test_client_falls_back_to_in_process_search_when_daemon_is_down():
+    client = RetrievalClient(f"http://127.0.0.1:{closed_port()}")
+    client._local = FakeService()
+    assert client.retrieve_context("MTOM", k=2) == "MTOM in docs"
+    assert client._local.batches == [(["MTOM"], None)]
+
+def test_client_searches_through_the_daemon_and_raises_its_errors():
+    service = FakeService()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(MicroBatcher(service)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = RetrievalClient(f"http://127.0.0.1:{server.server_address[1]}")
+        docs = client.search("MTOM", k=2, metadata_filter={"page": {"min": 1}})
+        assert [(doc.page_content, doc.metadata) for doc in docs] == [("MTOM in docs", {"k": 2})]
+        assert service.batches == [(["MTOM"], {"page": {"min": 1}})]
+        with pytest.raises(urllib.error.HTTPError):
+            client.search("fail")
+        assert client._local is None
+    finally:
+        server.shutdown()
+        server.server_close()
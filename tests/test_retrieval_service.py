@@ -0,0 +1,30 @@
+import time
+import pytest
+from langchain_core.documents import Document
+from utils.index_helper import build_vectorstore
+from utils.retrieval_service import AGENT_RETRIEVAL_FILTERS, CorpusIndex, RetrievalService
+
+@pytest.fixture
+def service(fake_embeddings):
+    docs = [
+        Document(page_content="SOAP headers are added by a handler", metadata={"section_path": "Handlers > SOAP Headers", "page": 10}),
+        Document(page_content="MTOM streams large attachments", metadata={"section_path": "MTOM", "page": 20}),
+        Document(page_content="WS-Security signs SOAP messages", metadata={"section_path": "WS-Security", "page": 30}),
+    ]
+    vectorstore, _ = build_vectorstore(docs, fake_embeddings)
+    service = RetrievalService()
+    service._corpora["docs"] = CorpusIndex("docs", "unused", vectorstore, None, "v1")
+    service._checked["docs"] = time.monotonic()
+    return service
+
+def test_filter_restricts_search(service):
+    docs = service.search("SOAP", k=3, metadata_filter={"section_path": "WS-Security"})
+    assert [doc.metadata["page"] for doc in docs] == [30]
+
+def test_explicit_filter_matching_nothing_finds_nothing(service):
+    assert service.search("SOAP", k=3, metadata_filter={"section_path": "Callback Services"}) == []
+    assert service.retrieve_context("SOAP", metadata_filter={"page": {"min": 100}}) == "No documentation available."
+
+def test_agent_filter_matching_nothing_searches_everything(service):
+    docs = service.search("SOAP", k=3, metadata_filter=AGENT_RETRIEVAL_FILTERS["designer"])
+    assert len(docs) == 3
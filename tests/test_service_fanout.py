@@ -0,0 +1,94 @@
+import threading
+from utils.service_fanout import extract_services, fan_out, generate_services, merge_modules, prefix_paths
+
+ARCHITECTURE = """### architecture.md
+## Overview
+Orders and billing are split; a Service Mesh handles traffic.
+## Microservices Breakdown
+### 1. Order Service
+- **Responsibilities**: order lifecycle
+- **Endpoints**: GET /orders, POST /orders
+### 2. Customer Management Service
+- **Responsibilities**: customers
+### 3. NotificationService
+## Communication Patterns
+- **Service Discovery**: Eureka
+"""
+
+def test_extract_services_from_breakdown_headings():
+    services = extract_services(ARCHITECTURE)
+    assert [s["name"] for s in services] == ["Order Service", "Customer Management Service", "NotificationService"]
+    assert services[1] == {
+        "name": "Customer Management Service",
+        "module": "customer-management-service",
+        "package": "customermanagement",
+        "class_name": "CustomerManagement"
+    }
+    assert services[2]["module"] == "notification-service"
+
+def test_extract_services_from_bold_list_items():
+    architecture = (
+        "**Microservices Breakdown**\n"
+        "1. **Inventory Service**: stock levels\n"
+        "   - **Data Entities**: Item\n"
+        "2. **API Gateway Service** (edge)\n"
+        "**Deployment Considerations**\n"
+        "- **Config Service** is not part of the breakdown\n"
+    )
+    assert [s["name"] for s in extract_services(architecture)] == ["Inventory Service", "API Gateway Service"]
+
+def test_extract_services_without_breakdown_section():
+    architecture = "# Architecture\n- **Service Mesh**: Istio\n### Service Discovery\n- **Order Service**: orders\n"
+    assert extract_services(architecture) == []
+    assert extract_services("") == []
+
+def test_extract_services_deduplicates_and_limits():
+    breakdown = "\n".join(f"- **Part{i} Service**: part" for i in range(10))
+    architecture = f"## Microservices Breakdown\n- **Order Service**\n- **OrderService**\n{breakdown}\n"
+    services = extract_services(architecture, limit=3)
+    assert [s["module"] for s in services] == ["order-service", "part-0-service", "part-1-service"]
+
+def test_prefix_paths_moves_only_file_headings():
+    response = "\n".join([
+        "### pom.xml",
+        "<project/>",
+        "### `src/main/java/com/example/order/OrderController.java`",
+        "### order-service/README.md",
+        "### Overview",
+        "### 2.1 Setup",
+    ])
+    assert prefix_paths(response, "order-service").splitlines() == [
+        "### order-service/pom.xml",
+        "<project/>",
+        "### order-service/src/main/java/com/example/order/OrderController.java",
+        "### order-service/README.md",
+        "### Overview",
+        "### 2.1 Setup",
+    ]
+
+def test_merge_modules_lists_every_module():
+    services = extract_services(ARCHITECTURE)
+    merged = merge_modules(services, ["### pom.xml\na", "### pom.xml\nb", "### pom.xml\nc"])
+    assert merged.startswith("### pom.xml\n<project")
+    for service in services:
+        assert f"<module>{service['module']}</module>" in merged
+        assert f"### {service['module']}/pom.xml" in merged
+
+def test_fan_out_keeps_order_and_bounds_concurrency():
+    services = [{"name": f"S{i}"} for i in range(6)]
+    lock, running, peak = threading.Lock(), [0], [0]
+
+    def generate(service):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        threading.Event().wait(0.05)
+        with lock:
+            running[0] -= 1
+        return service["name"]
+
+    assert fan_out(services, generate, concurrency=2) == [f"S{i}" for i in range(6)]
+    assert peak[0] <= 2
+
+def test_generate_services_falls_back_without_services():
+    assert generate_services("# A monolith", lambda service: "x") is None
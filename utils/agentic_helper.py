@@ -7,6 +7,9 @@ import os
 from bs4 import BeautifulSoup
 from typing import TypedDict, Annotated, Dict, Any
 from dotenv import load_dotenv
+from utils.memo_helper import memoized, model_id
+from utils.checkpoint_helper import get_checkpointer, new_run_id, run_config, run_graph
+from utils.service_fanout import generate_services
 
 load_dotenv()
 
@@ -48,6 +51,20 @@ tools = [
     Tool(name="parse_file", func=parse_file, description="Parse XML or HTML content.")
 ]
 
+# Each tab runs one node on a fresh state, so there are no upstream outputs in the
+# state: whatever a node builds on (e.g. an uploaded Tab 2 architecture) arrives in
+# its tab input, and the memo key is that input with the node's template and model.
+# Bump a node's version when its prompt template changes
+TEMPLATE_VERSIONS = {node: "1" for node in ["analyze", "design", "generate", "boomi", "tests", "migrate", "howto"]}
+
+def invoke_memoized(node: str, prompt: str, state: TransformationState, tab: str, service: str = None) -> str:
+    """LLM response for a node, reused while its tab input is unchanged.
+
+    service keys the output of one service's sub-run separately from the others.
+    """
+    inputs = state["inputs"][tab] if service is None else [state["inputs"][tab], service]
+    return memoized(node, TEMPLATE_VERSIONS[node], model_id(llm), inputs, {}, lambda: llm.invoke(prompt).content)
+
 # Node functions
 def analyze_node(state: TransformationState) -> TransformationState:
     if state["current_tab"] != "tab1":
@@ -57,7 +74,7 @@ def analyze_node(state: TransformationState) -> TransformationState:
         "- Summary\n- Suggested Microservices (Name, Responsibilities, Endpoints, Data Entities)\n- Dependencies\n- Insights\n- Diagram (Mermaid)\n"
         "Output as `### microservices_suggestion.md`."
     ).format(inputs=state["inputs"]["tab1"])
-    response = llm.invoke(prompt).content
+    response = invoke_memoized("analyze", prompt, state, "tab1")
     state["outputs"]["tab1"] = response
     return state
 
@@ -70,28 +87,47 @@ def design_node(state: TransformationState) -> TransformationState:
         "Output as `### architecture.md`.\n"
         "If Tab 1 output is available, use it to inform the design."
     ).format(inputs=state["inputs"]["tab2"] + (f"\nTab 1 Output:\n{state['outputs']['tab1']}" if "tab1" in state["outputs"] else ""))
-    response = llm.invoke(prompt).content
+    response = invoke_memoized("design", prompt, state, "tab2")
     state["outputs"]["tab2"] = response
     return state
 
 def generate_node(state: TransformationState) -> TransformationState:
+    """One project per service of the architecture (Tab 2 output or upload), generated
+    concurrently and merged into a multi-module output; else the named microservice."""
     if state["current_tab"] != "tab3":
         return state
-    prompt = PromptTemplate.from_template(
-        "Generate a Spring Boot microservice project based on: {inputs}. Include:\n"
-        "- `pom.xml`: Maven configuration with Spring Boot dependencies.\n"
-        "- `src/main/java/com/example/{service_name}/controller/{ServiceName}Controller.java`: REST controller with 2 endpoints (GET, POST).\n"
-        "- `src/main/java/com/example/{service_name}/service/{ServiceName}Service.java`: Service layer.\n"
-        "- `src/main/java/com/example/{service_name}/entity/{ServiceName}Entity.java`: Entity class with JPA.\n"
-        "- `src/main/resources/application.yml`: Configuration file.\n"
-        "Output each file prefixed with its path (e.g., `### pom.xml`).\n"
-        "If Tab 2 output is available, use it to inform the design."
-    ).format(
-        inputs=state["inputs"]["tab3"],
-        service_name=state["inputs"]["tab3"].split("Microservice Name: ")[1].split("\n")[0].lower(),
-        ServiceName=state["inputs"]["tab3"].split("Microservice Name: ")[1].split("\n")[0]
-    ) + (f"\nTab 2 Output:\n{state['outputs']['tab2']}" if "tab2" in state["outputs"] else "")
-    response = llm.invoke(prompt).content
+    architecture = state["outputs"].get("tab2") or state["inputs"]["tab3"].partition("Tab 2 Architecture:")[2]
+
+    def generate_service(service: Dict[str, str]) -> str:
+        prompt = PromptTemplate.from_template(
+            "Generate the Spring Boot project of the {name} microservice based on: {inputs}. It is one module of a multi-module build; "
+            "the other services of the architecture are generated separately. Include:\n"
+            "- `pom.xml`: Maven configuration with Spring Boot dependencies and artifactId `{module}`.\n"
+            "- `src/main/java/com/example/{package}/controller/{class_name}Controller.java`: REST controller with 2 endpoints (GET, POST).\n"
+            "- `src/main/java/com/example/{package}/service/{class_name}Service.java`: Service layer.\n"
+            "- `src/main/java/com/example/{package}/entity/{class_name}Entity.java`: Entity class with JPA.\n"
+            "- `src/main/resources/application.yml`: Configuration file.\n"
+            "Output each file prefixed with its path relative to the module (e.g., `### pom.xml`)."
+        ).format(inputs=state["inputs"]["tab3"], **service) + (f"\nTab 2 Output:\n{state['outputs']['tab2']}" if "tab2" in state["outputs"] else "")
+        return invoke_memoized("generate", prompt, state, "tab3", service["name"])
+
+    response = generate_services(architecture, generate_service)
+    if response is None:
+        prompt = PromptTemplate.from_template(
+            "Generate a Spring Boot microservice project based on: {inputs}. Include:\n"
+            "- `pom.xml`: Maven configuration with Spring Boot dependencies.\n"
+            "- `src/main/java/com/example/{service_name}/controller/{ServiceName}Controller.java`: REST controller with 2 endpoints (GET, POST).\n"
+            "- `src/main/java/com/example/{service_name}/service/{ServiceName}Service.java`: Service layer.\n"
+            "- `src/main/java/com/example/{service_name}/entity/{ServiceName}Entity.java`: Entity class with JPA.\n"
+            "- `src/main/resources/application.yml`: Configuration file.\n"
+            "Output each file prefixed with its path (e.g., `### pom.xml`).\n"
+            "If Tab 2 output is available, use it to inform the design."
+        ).format(
+            inputs=state["inputs"]["tab3"],
+            service_name=state["inputs"]["tab3"].split("Microservice Name: ")[1].split("\n")[0].lower(),
+            ServiceName=state["inputs"]["tab3"].split("Microservice Name: ")[1].split("\n")[0]
+        ) + (f"\nTab 2 Output:\n{state['outputs']['tab2']}" if "tab2" in state["outputs"] else "")
+        response = invoke_memoized("generate", prompt, state, "tab3")
     state["outputs"]["tab3"] = response
     return state
 
@@ -105,7 +141,7 @@ def boomi_node(state: TransformationState) -> TransformationState:
         "Output each file prefixed with its path (e.g., `### openapi.yaml`).\n"
         "If Tab 3 output is available, use it to inform the design."
     ).format(inputs=state["inputs"]["tab4"] + (f"\nTab 3 Output:\n{state['outputs']['tab3']}" if "tab3" in state["outputs"] else ""))
-    response = llm.invoke(prompt).content
+    response = invoke_memoized("boomi", prompt, state, "tab4")
     state["outputs"]["tab4"] = response
     return state
 
@@ -124,7 +160,7 @@ def tests_node(state: TransformationState) -> TransformationState:
         service_name=state["inputs"]["tab5"].split("Service Name: ")[1].split("\n")[0].lower(),
         ServiceName=state["inputs"]["tab5"].split("Service Name: ")[1].split("\n")[0]
     ) + (f"\nTab 3 Output:\n{state['outputs']['tab3']}" if "tab3" in state["outputs"] else "")
-    response = llm.invoke(prompt).content
+    response = invoke_memoized("tests", prompt, state, "tab5")
     state["outputs"]["tab5"] = response
     return state
 
@@ -142,7 +178,7 @@ def migrate_node(state: TransformationState) -> TransformationState:
         service_name=state["inputs"]["tab6"].split("Microservice Name: ")[1].split("\n")[0].lower(),
         ServiceName=state["inputs"]["tab6"].split("Microservice Name: ")[1].split("\n")[0]
     ) + (f"\nTab 3 Output:\n{state['outputs']['tab3']}" if "tab3" in state["outputs"] else "")
-    response = llm.invoke(prompt).content
+    response = invoke_memoized("migrate", prompt, state, "tab6")
     state["outputs"]["tab6"] = response
     return state
 
@@ -161,7 +197,7 @@ def howto_node(state: TransformationState) -> TransformationState:
     for tab in ["tab1", "tab2", "tab3", "tab4", "tab5", "tab6"]:
         if tab in state["outputs"]:
             prompt += f"\n{tab.upper()} Output:\n{state['outputs'][tab]}"
-    response = llm.invoke(prompt).content
+    response = invoke_memoized("howto", prompt, state, "tab7")
     state["outputs"]["tab7"] = response
     return state
 
@@ -177,22 +213,32 @@ workflow.add_node("tests", tests_node)
 workflow.add_node("migrate", migrate_node)
 workflow.add_node("howto", howto_node)
 
+# Each tab runs exactly one node: the graph enters at the tab's node and ends after it
+TAB_NODES = {"tab1": "analyze", "tab2": "design", "tab3": "generate", "tab4": "boomi", "tab5": "tests", "tab6": "migrate", "tab7": "howto"}
+
+def route_to_tab(state: TransformationState) -> str:
+    return TAB_NODES.get(state["current_tab"], END)
+
 # Define edges
-workflow.add_edge("analyze", "design")
-workflow.add_edge("design", "generate")
-workflow.add_edge("generate", "boomi")
-workflow.add_edge("boomi", "tests")
-workflow.add_edge("tests", "migrate")
-workflow.add_edge("migrate", "howto")
-workflow.add_edge("howto", END)
+for node in TAB_NODES.values():
+    workflow.add_edge(node, END)
 
 # Set entry point
-workflow.set_entry_point("analyze")
+workflow.set_conditional_entry_point(route_to_tab, {**{node: node for node in TAB_NODES.values()}, END: END})
 
-# Compile graph
-graph = workflow.compile()
+# Compile graph; every run is checkpointed in SQLite under its run id (thread_id)
+GRAPH_NAME = "agentic"
+graph = workflow.compile(checkpointer=get_checkpointer())
 
-def run_agentic_workflow(inputs: Dict[str, Any], current_tab: str) -> Dict[str, str]:
+def run_agentic_workflow(inputs: Dict[str, Any], current_tab: str, run_id: str = None) -> Dict[str, str]:
+    run_id = run_id or new_run_id()
     initial_state = {"inputs": inputs, "outputs": {}, "current_tab": current_tab}
-    result = graph.invoke(initial_state)
-    return result["outputs"]
\ No newline at end of file
+    for _ in run_graph(graph, GRAPH_NAME, initial_state, run_id):
+        pass
+    return graph.get_state(run_config(run_id)).values["outputs"]
+
+def resume_agentic_workflow(run_id: str) -> Dict[str, str]:
+    """Finish an interrupted run from its last checkpoint."""
+    for _ in run_graph(graph, GRAPH_NAME, None, run_id):
+        pass
+    return graph.get_state(run_config(run_id)).values["outputs"]
\ No newline at end of file
@@ -0,0 +1,83 @@
+import os
+import re
+import json
+import time
+import uuid
+import zlib
+import hashlib
+import argparse
+import functools
+from typing import Any, Dict
+
+# Content-addressed store for large strings passed between agents (flow inputs,
+# agent outputs, RAG context). Graph state, checkpoints, job results and the
+# Streamlit session keep a small reference instead of the text:
+#   {"artifact": <sha256>, "bytes": <utf-8 size>, "summary": <first characters>}
+ARTIFACT_ROOT = os.getenv("ARTIFACT_ROOT", os.path.join("outputs", "artifacts"))
+ARTIFACT_SUMMARY_CHARS = 160
+# Artifacts not written (or re-written) for this long are removed by gc_artifacts
+ARTIFACT_MAX_AGE_HOURS = float(os.getenv("ARTIFACT_MAX_AGE_HOURS", "168"))
+
+def artifact_path(digest: str) -> str:
+    return os.path.join(ARTIFACT_ROOT, digest[:2], digest[2:])
+
+def is_artifact(value: Any) -> bool:
+    return isinstance(value, dict) and "artifact" in value
+
+def summarize(text: str) -> str:
+    text = re.sub(r"\s+", " ", text).strip()
+    return text if len(text) <= ARTIFACT_SUMMARY_CHARS else text[:ARTIFACT_SUMMARY_CHARS - 3] + "..."
+
+def store_artifact(text: str) -> Dict[str, Any]:
+    """Store text once under its SHA-256 and return its reference."""
+    data = (text or "").encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()
+    path = artifact_path(digest)
+    if os.path.exists(path):
+        os.utime(path)  # Keep artifacts in use out of garbage collection
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Unique per writer: parallel agents and batch threads may store the same text at once
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(zlib.compress(data, 6))
+        os.replace(tmp_path, path)
+    return {"artifact": digest, "bytes": len(data), "summary": summarize(text or "")}
+
+@functools.lru_cache(maxsize=256)
+def _read(digest: str) -> str:
+    with open(artifact_path(digest), "rb") as f:
+        return zlib.decompress(f.read()).decode("utf-8")
+
+def load_artifact(value: Any) -> str:
+    """Text of a reference; plain strings (state from before the store) pass through."""
+    if is_artifact(value):
+        return _read(value["artifact"])
+    return value if value is not None else ""
+
+def load_artifacts(values: Dict[str, Any]) -> Dict[str, str]:
+    return {key: load_artifact(value) for key, value in (values or {}).items()}
+
+def gc_artifacts(max_age_hours: float = ARTIFACT_MAX_AGE_HOURS) -> int:
+    """Delete artifacts not stored again within max_age_hours; returns the count."""
+    cutoff = time.time() - max_age_hours * 3600
+    removed = 0
+    for root, _, names in os.walk(ARTIFACT_ROOT):
+        for name in names:
+            path = os.path.join(root, name)
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+    _read.cache_clear()
+    return removed
+
+if __name__ == "__main__":
+    # python -m utils.artifact_store --gc
+    parser = argparse.ArgumentParser(description="Inspect or garbage-collect the artifact store.")
+    parser.add_argument("--gc", action="store_true")
+    parser.add_argument("--max-age-hours", type=float, default=ARTIFACT_MAX_AGE_HOURS)
+    args = parser.parse_args()
+    if args.gc:
+        print(f"Removed {gc_artifacts(args.max_age_hours)} artifacts")
+    sizes = [os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(ARTIFACT_ROOT) for name in names]
+    print(json.dumps({"artifacts": len(sizes), "bytes": sum(sizes)}, indent=2))
@@ -0,0 +1,144 @@
+import os
+import re
+import logging
+import numpy as np
+from collections import Counter
+from typing import Dict, List, Tuple
+from utils.index_helper import dense_search, docs_at
+
+logger = logging.getLogger(__name__)
+
+BM25_FILE = "bm25.npz"
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60  # standard reciprocal rank fusion constant
+HYBRID_CANDIDATES = int(os.getenv("RETRIEVAL_HYBRID_CANDIDATES", "30"))
+MAX_TOKEN_LENGTH = 64
+
+# Keeps dotted/colon identifiers such as pub.db:query or pub.flow:throwException whole
+TOKEN_PATTERN = re.compile(r"[a-z0-9_]+(?:[.:][a-z0-9_]+)*")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; compound identifiers also emit their parts."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        token = token[:MAX_TOKEN_LENGTH]
+        tokens.append(token)
+        if "." in token or ":" in token:
+            tokens.extend(part for part in re.split(r"[.:]", token) if part)
+    return tokens
+
+class BM25Index:
+    """Inverted index with precomputed BM25 impact scores per posting.
+
+    Postings are stored CSR-style: the documents and impacts of term t live in
+    docs[offsets[t]:offsets[t + 1]], so a query is a few array slices and adds.
+    Document ids are FAISS index positions, which keeps the two indexes aligned.
+    """
+
+    def __init__(self, terms: List[str], offsets: np.ndarray, docs: np.ndarray, impacts: np.ndarray, ntotal: int):
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.docs = docs
+        self.impacts = impacts
+        self.ntotal = ntotal
+
+    @classmethod
+    def build(cls, texts: List[str]) -> "BM25Index":
+        vocab: Dict[str, int] = {}
+        term_ids, doc_ids, tfs = [], [], []
+        doc_lengths = np.zeros(len(texts), dtype=np.float32)
+        for doc_id, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_lengths[doc_id] = sum(counts.values())
+            for term, tf in counts.items():
+                term_ids.append(vocab.setdefault(term, len(vocab)))
+                doc_ids.append(doc_id)
+                tfs.append(tf)
+
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        order = np.argsort(term_ids, kind="stable")
+        docs = np.asarray(doc_ids, dtype=np.int32)[order]
+        tfs = np.asarray(tfs, dtype=np.float32)[order]
+        df = np.bincount(term_ids, minlength=len(vocab))
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(df, out=offsets[1:])
+
+        ntotal = len(texts)
+        idf = np.log(1 + (ntotal - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avg_length = max(float(doc_lengths.mean()) if ntotal else 0.0, 1.0)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths[docs] / avg_length)
+        impacts = np.repeat(idf, df) * tfs * (BM25_K1 + 1) / (tfs + norm)
+
+        terms = [None] * len(vocab)
+        for term, i in vocab.items():
+            terms[i] = term
+        return cls(terms, offsets, docs, impacts.astype(np.float32), ntotal)
+
+    def save(self, path: str) -> None:
+        terms = sorted(self.term_ids, key=self.term_ids.get)
+        np.savez(
+            os.path.join(path, BM25_FILE),
+            terms=np.array(terms, dtype=str),
+            offsets=self.offsets,
+            docs=self.docs,
+            impacts=self.impacts,
+            ntotal=np.array(self.ntotal)
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        data = np.load(os.path.join(path, BM25_FILE))
+        return cls(data["terms"].tolist(), data["offsets"], data["docs"], data["impacts"], int(data["ntotal"]))
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, BM25_FILE))
+
+    def search(self, query: str, k: int, allowed: np.ndarray = None) -> List[Tuple[int, float]]:
+        """Return (document position, BM25 score) pairs for the top k matches.
+
+        `allowed` restricts the matches to those document positions.
+        """
+        scores = np.zeros(self.ntotal, dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            scores[self.docs[start:end]] += self.impacts[start:end]
+        if allowed is not None:
+            kept = np.zeros_like(scores)
+            kept[allowed] = scores[allowed]
+            scores = kept
+
+        k = min(k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top]
+
+def build_sparse_index(vectorstore) -> BM25Index:
+    """Build a BM25 index over the chunks of a vector store, in FAISS position order."""
+    docs = docs_at(vectorstore, range(vectorstore.index.ntotal))
+    return BM25Index.build([doc.page_content for doc in docs])
+
+def rrf_fuse(rankings: List[List[int]], k: int = RRF_K) -> List[Tuple[int, float]]:
+    """Reciprocal rank fusion of several ranked id lists."""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+def hybrid_search(query: str, vectorstore, sparse_index: BM25Index, k: int, candidates: int = HYBRID_CANDIDATES, dense: List[int] = None, allowed: np.ndarray = None) -> List[int]:
+    """Fuse dense and BM25 rankings with RRF; returns the top k index positions.
+
+    `dense` may carry an already computed dense ranking (e.g. from a batched search).
+    `allowed` restricts both rankings to those index positions.
+    """
+    if dense is None:
+        dense = [position for position, _ in dense_search(vectorstore, query, max(k, candidates), allowed)]
+    sparse = [position for position, _ in sparse_index.search(query, max(k, candidates), allowed)]
+    return [position for position, _ in rrf_fuse([dense, sparse])[:k]]
@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import argparse
+import threading
+from typing import Any, Dict, List, Optional
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+logger = logging.getLogger(__name__)
+
+# LangGraph checkpoints of agent runs, one thread per run id, in a local SQLite file.
+# A run that fails part way can be resumed from its last completed node.
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", os.path.join("outputs", "checkpoints.sqlite"))
+# Runs (and their checkpoints) not updated for this long are deleted
+CHECKPOINT_MAX_AGE_HOURS = float(os.getenv("CHECKPOINT_MAX_AGE_HOURS", "168"))
+
+RUN_RUNNING = "running"
+RUN_FAILED = "failed"
+RUN_COMPLETED = "completed"
+
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+
+def get_checkpointer() -> SqliteSaver:
+    """Process-wide SqliteSaver; old runs are cleaned up when it is first opened."""
+    global _checkpointer
+    if _checkpointer is None:
+        with _checkpointer_lock:
+            if _checkpointer is None:
+                directory = os.path.dirname(CHECKPOINT_DB_PATH)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                # Graph nodes run on worker threads; SqliteSaver serializes access with its own lock.
+                # Job workers and the UI share the file: WAL lets readers run during a write
+                conn = sqlite3.connect(CHECKPOINT_DB_PATH, check_same_thread=False, timeout=30)
+                conn.execute("PRAGMA journal_mode=WAL")
+                saver = SqliteSaver(conn)
+                saver.setup()
+                with saver.cursor() as cur:
+                    cur.execute(
+                        "CREATE TABLE IF NOT EXISTS runs ("
+                        "run_id TEXT PRIMARY KEY, graph TEXT, status TEXT, error TEXT, created_at REAL, updated_at REAL)"
+                    )
+                _checkpointer = saver
+                cleanup_checkpoints()
+    return _checkpointer
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex
+
+def run_config(run_id: str) -> Dict[str, Any]:
+    return {"configurable": {"thread_id": run_id}}
+
+def mark_run(run_id: str, graph_name: str, status: str, error: str = "") -> None:
+    """Record a run's status; the first call registers it."""
+    now = time.time()
+    with get_checkpointer().cursor() as cur:
+        cur.execute(
+            "INSERT INTO runs (run_id, graph, status, error, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(run_id) DO UPDATE SET status = excluded.status, error = excluded.error, updated_at = excluded.updated_at",
+            (run_id, graph_name, status, error, now, now)
+        )
+
+def resumable_runs(graph_name: str) -> List[Dict[str, Any]]:
+    """Runs of a graph that did not complete, most recent first."""
+    with get_checkpointer().cursor(transaction=False) as cur:
+        cur.execute(
+            "SELECT run_id, status, error, created_at, updated_at FROM runs WHERE graph = ? AND status != ? ORDER BY updated_at DESC",
+            (graph_name, RUN_COMPLETED)
+        )
+        return [dict(zip(["run_id", "status", "error", "created_at", "updated_at"], row)) for row in cur.fetchall()]
+
+def pending_nodes(graph, run_id: str) -> List[str]:
+    """Nodes a resumed run would execute next; empty if the run finished or never started."""
+    return list(graph.get_state(run_config(run_id)).next)
+
+def run_graph(graph, graph_name: str, graph_input: Optional[Dict[str, Any]], run_id: str, stream_mode: str = "updates"):
+    """Stream a checkpointed run, recording its status.
+
+    graph_input None resumes run_id from its last checkpoint: completed nodes are not
+    executed again.
+    """
+    mark_run(run_id, graph_name, RUN_RUNNING)
+    try:
+        for update in graph.stream(graph_input, run_config(run_id), stream_mode=stream_mode):
+            yield update
+    except BaseException as e:
+        mark_run(run_id, graph_name, RUN_FAILED, f"{e.__class__.__name__}: {e}")
+        raise
+    mark_run(run_id, graph_name, RUN_COMPLETED)
+
+def cleanup_checkpoints(max_age_hours: float = CHECKPOINT_MAX_AGE_HOURS) -> int:
+    """Delete runs not updated within max_age_hours and their checkpoints; returns the count."""
+    cutoff = time.time() - max_age_hours * 3600
+    saver = get_checkpointer()
+    with saver.cursor() as cur:
+        cur.execute("SELECT run_id FROM runs WHERE updated_at < ?", (cutoff,))
+        run_ids = [row[0] for row in cur.fetchall()]
+        for run_id in run_ids:
+            cur.execute("DELETE FROM checkpoints WHERE thread_id = ?", (run_id,))
+            cur.execute("DELETE FROM writes WHERE thread_id = ?", (run_id,))
+            cur.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+    if run_ids:
+        logger.info(f"Deleted checkpoints of {len(run_ids)} runs older than {max_age_hours}h")
+    return len(run_ids)
+
+if __name__ == "__main__":
+    # python -m utils.checkpoint_helper --cleanup --max-age-hours 24
+    parser = argparse.ArgumentParser(description="List or clean up agent run checkpoints.")
+    parser.add_argument("--graph", default="ma_agentic")
+    parser.add_argument("--cleanup", action="store_true")
+    parser.add_argument("--max-age-hours", type=float, default=CHECKPOINT_MAX_AGE_HOURS)
+    args = parser.parse_args()
+    if args.cleanup:
+        print(f"Deleted {cleanup_checkpoints(args.max_age_hours)} runs")
+    print(json.dumps(resumable_runs(args.graph), indent=2))
@@ -0,0 +1,253 @@
+import re
+import json
+import time
+import bisect
+import zlib
+import logging
+import argparse
+import numpy as np
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+from pypdf import PdfReader
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+# A line is a running header/footer if, after masking digits, it opens or closes at
+# least RUNNING_LINE_MIN_PAGES pages, e.g. "Web Services Developer's Guide 11.1 21" or a
+# chapter title repeated on every page of the chapter. Very short lines ("Note:") are kept.
+RUNNING_LINE_MIN_PAGES = 4
+RUNNING_LINE_MIN_WORDS = 3
+RUNNING_LINE_WINDOW = 3  # lines inspected at the top and bottom of each page
+
+# Table-of-contents leader lines ("Working with Binders........56") carry no content
+TOC_LINE = re.compile(r"\.{5,}\s*\d+\s*$")
+# Fallback heading pattern when a PDF has no outline: "3 Working with Binders", "3.2 Headers"
+NUMBERED_HEADING = re.compile(r"^\d+(\.\d+)*\s+[A-Z][^.]{2,80}$")
+
+# MinHash/LSH near-duplicate detection over word 5-gram shingles.
+# 64 permutations in 8 bands of 8 rows put the LSH candidate threshold near 0.77 Jaccard;
+# candidates are then confirmed against NEAR_DUPLICATE_THRESHOLD.
+SHINGLE_SIZE = 5
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 8
+NEAR_DUPLICATE_THRESHOLD = 0.85
+_MERSENNE_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(1)
+_HASH_A = _rng.integers(1, _MERSENNE_PRIME, MINHASH_PERMUTATIONS, dtype=np.int64)
+_HASH_B = _rng.integers(0, _MERSENNE_PRIME, MINHASH_PERMUTATIONS, dtype=np.int64)
+
+def _normalize_line(line: str) -> str:
+    # Mask arabic and leading/trailing roman page numbers ("Guide 11.1 iii", "iv Guide")
+    line = re.sub(r"\d+", "#", line.strip().lower())
+    line = re.sub(r"^[ivxlc]+\b|\b[ivxlc]+$", "#", line)
+    return re.sub(r"\s+", " ", line)
+
+def _heading_key(text: str) -> str:
+    # Outline titles contain zero-width spaces and extracted text may lose spaces
+    return re.sub(r"[\s\u200b]+", "", text).lower()
+
+def find_running_lines(pages: List[List[str]]) -> set:
+    """Normalized lines repeated at the top or bottom of many pages."""
+    counts = Counter()
+    for lines in pages:
+        edge = set(_normalize_line(line) for line in lines[:RUNNING_LINE_WINDOW] + lines[-RUNNING_LINE_WINDOW:])
+        counts.update(line for line in edge if line)
+    return {
+        line for line, count in counts.items()
+        if count >= RUNNING_LINE_MIN_PAGES and len(line.split()) >= RUNNING_LINE_MIN_WORDS
+    }
+
+def read_outline(reader: PdfReader) -> Dict[int, List[Tuple[int, str]]]:
+    """Map page number -> [(level, title)] from the PDF bookmarks, if any."""
+    headings: Dict[int, List[Tuple[int, str]]] = {}
+
+    def walk(items, level):
+        for item in items:
+            if isinstance(item, list):
+                walk(item, level + 1)
+                continue
+            try:
+                page = reader.get_destination_page_number(item)
+            except Exception:
+                continue
+            title = re.sub(r"\s+", " ", item.title.replace("\u200b", "")).strip()
+            headings.setdefault(page, []).append((level, title))
+
+    try:
+        walk(reader.outline, 0)
+    except Exception as e:
+        logger.debug(f"Could not read PDF outline: {e}")
+    return headings
+
+def _clean_pages(reader: PdfReader) -> Tuple[List[List[str]], int]:
+    pages = [[line for line in (page.extract_text() or "").splitlines() if line.strip()] for page in reader.pages]
+    running = find_running_lines(pages)
+    stripped = 0
+    cleaned = []
+    for lines in pages:
+        kept = []
+        for i, line in enumerate(lines):
+            at_edge = i < RUNNING_LINE_WINDOW or i >= len(lines) - RUNNING_LINE_WINDOW
+            if (at_edge and _normalize_line(line) in running) or TOC_LINE.search(line):
+                stripped += 1
+                continue
+            kept.append(line)
+        cleaned.append(kept)
+    return cleaned, stripped
+
+def load_sections(pdf_path: str) -> Tuple[List[Dict[str, Any]], int]:
+    """Split a PDF into sections along its outline (or numbered headings).
+
+    Returns sections as {"section_path", "text", "page_offsets"} where page_offsets
+    lists (character offset, page number) pairs, and the number of lines stripped
+    as running headers/footers or table-of-contents leaders.
+    """
+    reader = PdfReader(pdf_path)
+    pages, stripped = _clean_pages(reader)
+    outline = read_outline(reader)
+
+    sections = []
+    path: List[str] = []
+    current = {"section_path": "", "parts": [], "page_offsets": [], "length": 0}
+
+    def start_section(level: int, title: str):
+        nonlocal current
+        if current["parts"]:
+            sections.append(current)
+        del path[level:]
+        path.append(title)
+        current = {"section_path": " > ".join(path), "parts": [], "page_offsets": [], "length": 0}
+
+    def add_lines(page_number: int, lines: List[str]):
+        if not lines:
+            return
+        text = "\n".join(lines) + "\n"
+        current["page_offsets"].append((current["length"], page_number))
+        current["parts"].append(text)
+        current["length"] += len(text)
+
+    for page_number, lines in enumerate(pages):
+        page_headings = list(outline.get(page_number, []))
+        if not outline:
+            page_headings = [(line.count(".", 0, line.find(" ")), line) for line in lines if NUMBERED_HEADING.match(line)]
+        # Bookmarks whose title is not in the text (e.g. stripped as a running header)
+        # start their section at the top of the page
+        line_keys = {_heading_key(line) for line in lines}
+        for heading in [h for h in page_headings if _heading_key(h[1]) not in line_keys]:
+            page_headings.remove(heading)
+            start_section(*heading)
+
+        buffer = []
+        for line in lines:
+            key = _heading_key(line)
+            match = next((h for h in page_headings if _heading_key(h[1]) == key), None)
+            if match:
+                add_lines(page_number, buffer)
+                buffer = []
+                page_headings.remove(match)
+                start_section(*match)
+            buffer.append(line)
+        add_lines(page_number, buffer)
+    if current["parts"]:
+        sections.append(current)
+
+    return [
+        {"section_path": s["section_path"], "text": "".join(s["parts"]), "page_offsets": s["page_offsets"]}
+        for s in sections
+    ], stripped
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_SIZE:
+        words = words + [""] * (SHINGLE_SIZE - len(words))
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) & _MERSENNE_PRIME for s in shingles), dtype=np.int64)
+
+def minhash_signature(text: str) -> np.ndarray:
+    hashes = _shingle_hashes(text)
+    return ((np.outer(_HASH_A, hashes) + _HASH_B[:, None]) % _MERSENNE_PRIME).min(axis=1)
+
+def drop_near_duplicates(chunks: List[Document]) -> Tuple[List[Document], int]:
+    """Drop chunks whose MinHash Jaccard estimate to an earlier kept chunk is high."""
+    rows = MINHASH_PERMUTATIONS // LSH_BANDS
+    buckets: Dict[Tuple[int, bytes], List[int]] = {}
+    signatures = []
+    kept = []
+    for chunk in chunks:
+        signature = minhash_signature(chunk.page_content)
+        bands = [(b, signature[b * rows:(b + 1) * rows].tobytes()) for b in range(LSH_BANDS)]
+        candidates = {i for band in bands for i in buckets.get(band, [])}
+        if any(np.mean(signatures[i] == signature) >= NEAR_DUPLICATE_THRESHOLD for i in candidates):
+            continue
+        index = len(signatures)
+        signatures.append(signature)
+        for band in bands:
+            buckets.setdefault(band, []).append(index)
+        kept.append(chunk)
+    return kept, len(chunks) - len(kept)
+
+def load_structured_chunks(pdf_dir: str) -> Tuple[List[Document], Dict[str, int]]:
+    """Structure-aware, deduplicated chunks for every PDF in a directory."""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, add_start_index=True)
+    chunks = []
+    stats = {"sections": 0, "running_lines_stripped": 0}
+    for pdf_file in sorted(Path(pdf_dir).glob("*.pdf")):
+        sections, stripped = load_sections(str(pdf_file))
+        stats["sections"] += len(sections)
+        stats["running_lines_stripped"] += stripped
+        for section in sections:
+            offsets = [offset for offset, _ in section["page_offsets"]]
+            for doc in splitter.create_documents([section["text"]]):
+                start = doc.metadata.pop("start_index", 0)
+                page = section["page_offsets"][max(0, bisect.bisect_right(offsets, start) - 1)][1]
+                doc.metadata.update({"source": str(pdf_file), "page": page, "section_path": section["section_path"]})
+                chunks.append(doc)
+    chunks, stats["near_duplicates_dropped"] = drop_near_duplicates(chunks)
+    return chunks, stats
+
+def load_recursive_chunks(pdf_dir: str) -> List[Document]:
+    """The original page-by-page RecursiveCharacterTextSplitter chunking."""
+    from langchain_community.document_loaders import PyPDFLoader
+    docs = []
+    for pdf_file in sorted(Path(pdf_dir).glob("*.pdf")):
+        docs.extend(PyPDFLoader(str(pdf_file)).load())
+    return RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP).split_documents(docs)
+
+def chunking_report(pdf_dir: str, embeddings) -> Dict[str, Any]:
+    """Chunk count, index size and build time for recursive vs structured chunking."""
+    from utils.index_helper import build_vectorstore
+    import faiss
+
+    report = {}
+    for strategy in ["recursive", "structured"]:
+        start = time.perf_counter()
+        if strategy == "structured":
+            chunks, stats = load_structured_chunks(pdf_dir)
+        else:
+            chunks, stats = load_recursive_chunks(pdf_dir), {}
+        chunk_seconds = time.perf_counter() - start
+        vectorstore, meta = build_vectorstore(chunks, embeddings)
+        report[strategy] = {
+            "chunks": len(chunks),
+            "characters": sum(len(chunk.page_content) for chunk in chunks),
+            "index_bytes": int(faiss.serialize_index(vectorstore.index).nbytes),
+            "chunk_seconds": round(chunk_seconds, 3),
+            "embed_seconds": meta["embed_seconds"],
+            "build_seconds": meta["build_seconds"],
+            **stats
+        }
+    return report
+
+if __name__ == "__main__":
+    # python -m utils.chunking_helper --corpus docs
+    parser = argparse.ArgumentParser(description="Compare recursive and structure-aware chunking of a PDF corpus.")
+    parser.add_argument("--corpus", default="docs")
+    args = parser.parse_args()
+    from utils.retrieval_service import RetrievalService
+    print(json.dumps(chunking_report(args.corpus, RetrievalService().embeddings), indent=2))
@@ -0,0 +1,110 @@
+import os
+import numpy as np
+import faiss
+from typing import Optional, Tuple
+
+# Compact vector store: float16 vectors for exact rescoring plus 1 bit per dimension
+# sign codes (384 dims -> 48 bytes) for a Hamming-distance prefilter. Memory per vector
+# is 2*d + d/8 bytes instead of 4*d for a flat float32 index.
+COMPACT_VECTORS_FILE = "compact_vectors.npy"
+COMPACT_CODES_FILE = "compact_codes.npy"
+COMPACT_MEAN_FILE = "compact_mean.npy"
+
+# The prefilter keeps max(k * RESCORE_FACTOR, RESCORE_MIN) nearest codes for rescoring
+RESCORE_FACTOR = int(os.getenv("COMPACT_RESCORE_FACTOR", "10"))
+RESCORE_MIN = int(os.getenv("COMPACT_RESCORE_MIN", "64"))
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+class CompactIndex:
+    """Float16 + binary code index with the parts of the FAISS index API this repo uses.
+
+    Sign codes are taken after subtracting the corpus mean, since sentence embeddings
+    share a common offset that would otherwise set most bits alike.
+    """
+
+    def __init__(self, d: int, vectors: np.ndarray = None, codes: np.ndarray = None, mean: np.ndarray = None):
+        self.d = d
+        self.vectors = vectors if vectors is not None else np.zeros((0, d), dtype=np.float16)
+        self.codes = codes if codes is not None else np.zeros((0, (d + 7) // 8), dtype=np.uint8)
+        self.mean = mean
+        self._binary_index = None
+
+    @property
+    def ntotal(self) -> int:
+        return len(self.vectors)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.vectors.nbytes + self.codes.nbytes + (self.mean.nbytes if self.mean is not None else 0))
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.packbits(vectors > self.mean, axis=1)
+
+    def add(self, vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.mean is None:
+            self.mean = vectors.mean(axis=0)
+        self.vectors = np.vstack([self.vectors, vectors.astype(np.float16)])
+        self.codes = np.vstack([self.codes, self._encode(vectors)])
+        self._binary_index = None
+
+    def _prefilter(self, query_codes: np.ndarray, n: int, allowed: Optional[np.ndarray]) -> np.ndarray:
+        """Positions of the n nearest codes by Hamming distance, one row per query."""
+        if allowed is None:
+            if self._binary_index is None:
+                self._binary_index = faiss.IndexBinaryFlat(self.codes.shape[1] * 8)
+                self._binary_index.add(np.ascontiguousarray(self.codes))
+            _, positions = self._binary_index.search(query_codes, n)
+            return positions
+        # Filtered search: Hamming distances over the allowed subset only
+        subset = self.codes[allowed]
+        positions = np.empty((len(query_codes), n), dtype=np.int64)
+        for i, code in enumerate(query_codes):
+            distances = _POPCOUNT[np.bitwise_xor(subset, code)].sum(axis=1, dtype=np.int32)
+            nearest = np.argpartition(distances, n - 1)[:n] if n < len(subset) else np.arange(len(subset))
+            positions[i] = allowed[nearest]
+        return positions
+
+    def search(self, queries: np.ndarray, k: int, allowed: Optional[np.ndarray] = None, params=None) -> Tuple[np.ndarray, np.ndarray]:
+        """Squared L2 distances and positions of the k nearest vectors (FAISS layout, -1 padded)."""
+        queries = np.asarray(queries, dtype=np.float32)
+        pool = self.ntotal if allowed is None else len(allowed)
+        n = min(pool, max(k * RESCORE_FACTOR, RESCORE_MIN))
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        positions = np.full((len(queries), k), -1, dtype=np.int64)
+        if n == 0:
+            return distances, positions
+
+        candidates = self._prefilter(self._encode(queries), n, allowed)
+        for i, (query, row) in enumerate(zip(queries, candidates)):
+            row = row[row >= 0]
+            rescored = ((self.vectors[row].astype(np.float32) - query) ** 2).sum(axis=1)
+            order = np.argsort(rescored)[:k]
+            distances[i, :len(order)] = rescored[order]
+            positions[i, :len(order)] = row[order]
+        return distances, positions
+
+    def reconstruct_batch(self, ids: np.ndarray) -> np.ndarray:
+        return self.vectors[np.asarray(ids, dtype=np.int64)].astype(np.float32)
+
+    def reconstruct_n(self, start: int, count: int) -> np.ndarray:
+        return self.vectors[start:start + count].astype(np.float32)
+
+    def save(self, path: str) -> None:
+        np.save(os.path.join(path, COMPACT_VECTORS_FILE), self.vectors)
+        np.save(os.path.join(path, COMPACT_CODES_FILE), self.codes)
+        np.save(os.path.join(path, COMPACT_MEAN_FILE), self.mean)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "CompactIndex":
+        """Load a saved store; with mmap the arrays stay in the OS page cache, shared across processes."""
+        mode = "r" if mmap else None
+        vectors = np.load(os.path.join(path, COMPACT_VECTORS_FILE), mmap_mode=mode)
+        codes = np.load(os.path.join(path, COMPACT_CODES_FILE), mmap_mode=mode)
+        mean = np.load(os.path.join(path, COMPACT_MEAN_FILE))
+        return cls(vectors.shape[1], vectors, codes, mean)
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, COMPACT_VECTORS_FILE)) and os.path.exists(os.path.join(path, COMPACT_CODES_FILE))
@@ -0,0 +1,89 @@
+import os
+import json
+import hashlib
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+# Prompt-token budget for the documentation context of one agent, and how many
+# candidates are fetched to fill it
+AGENT_CONTEXT_TOKENS = int(os.getenv("AGENT_CONTEXT_TOKENS", "600"))
+RUN_CANDIDATES = int(os.getenv("RUN_CONTEXT_CANDIDATES", "8"))
+CHARS_PER_TOKEN = 4  # rough estimate for English documentation text
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+def chunk_id(doc) -> str:
+    return hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+
+class RetrievalRun:
+    """Chunks already sent to agents during one multi-agent run.
+
+    Each agent gets the most relevant chunks nobody else in the run received yet,
+    packed into its token budget; repeating a query (e.g. the supervisor planning
+    twice) returns the context built the first time without counting it again.
+    """
+
+    def __init__(self, token_budget: int = AGENT_CONTEXT_TOKENS):
+        self.token_budget = token_budget
+        self.sent_ids = set()
+        self.contexts: Dict[str, str] = {}
+        self.stats = {"retrievals": 0, "cached_queries": 0, "chunks_sent": 0, "duplicates_skipped": 0, "tokens_sent": 0}
+        self._lock = threading.Lock()
+
+    def retrieve(self, query: str, search: Callable[[str, int], List], token_budget: Optional[int] = None,
+                 metadata_filter: Optional[Dict[str, Any]] = None, diversify: Optional[bool] = None) -> str:
+        """Packed context for a query; pass the filter and diversify setting search applies,
+        so the same query searched differently is not served from the cache."""
+        key = json.dumps([query, metadata_filter, diversify], sort_keys=True)
+        with self._lock:
+            if key in self.contexts:
+                self.stats["cached_queries"] += 1
+                return self.contexts[key]
+        candidates = search(query, RUN_CANDIDATES)
+        with self._lock:
+            if key in self.contexts:
+                return self.contexts[key]
+            context = self._pack(candidates, token_budget or self.token_budget)
+            self.contexts[key] = context
+            self.stats["retrievals"] += 1
+            return context
+
+    def _pack(self, candidates: List, budget: int) -> str:
+        packed, used = [], 0
+        for doc in candidates:
+            doc_id = chunk_id(doc)
+            if doc_id in self.sent_ids:
+                self.stats["duplicates_skipped"] += 1
+                continue
+            tokens = estimate_tokens(doc.page_content)
+            if used + tokens > budget:
+                continue
+            packed.append(doc)
+            used += tokens
+        if not packed and candidates:
+            # Everything relevant was already sent or is too large: keep the best chunk
+            packed = [candidates[0]]
+            used = estimate_tokens(candidates[0].page_content)
+        for doc in packed:
+            self.sent_ids.add(chunk_id(doc))
+        self.stats["chunks_sent"] += len(packed)
+        self.stats["tokens_sent"] += used
+        return "\n".join(doc.page_content for doc in packed)
+
+_current_run: contextvars.ContextVar = contextvars.ContextVar("retrieval_run", default=None)
+
+def current_run() -> Optional[RetrievalRun]:
+    return _current_run.get()
+
+@contextmanager
+def retrieval_run(token_budget: int = AGENT_CONTEXT_TOKENS):
+    """Scope within which retrieve_context calls share one RetrievalRun."""
+    run = RetrievalRun(token_budget)
+    token = _current_run.set(run)
+    try:
+        yield run
+    finally:
+        _current_run.reset(token)
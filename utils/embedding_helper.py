@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import logging
+import argparse
+import numpy as np
+from typing import Any, Dict, List
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# "torch" runs the sentence-transformers model as before; "onnx" runs an exported,
+# int8 dynamically quantized copy of the same model through onnxruntime on CPU.
+EMBEDDING_BACKENDS = ["torch", "onnx"]
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+ONNX_MODEL_ROOT = os.getenv("ONNX_MODEL_ROOT", os.path.join("models", "onnx"))
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))  # 0 lets onnxruntime pick
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+
+ONNX_FILE = "model.onnx"
+ONNX_INT8_FILE = "model.int8.onnx"
+ONNX_CONFIG_FILE = "embedding_config.json"
+ONNX_OPSET = 17  # LayerNormalization is a single op from opset 17
+
+# Sample passages for the parity check, in the register of the webMethods guide
+PARITY_TEXTS = [
+    "Use pub.client:soapHTTP to invoke a SOAP web service over HTTP.",
+    "A web service descriptor (WSD) exposes Integration Server services as operations.",
+    "Configure WS-Security policies on the provider web service endpoint alias.",
+    "The flow service maps the request document to the JDBC adapter input.",
+    "MTOM attachments are streamed when the response exceeds the configured threshold.",
+    "Handlers run before and after the SOAP message is processed by the service.",
+    "Retry transient errors returned by the back-end before failing the request.",
+    "JMS transport lets consumer web service descriptors send SOAP over JMS."
+]
+
+def onnx_model_dir(model_name: str) -> str:
+    return os.path.join(ONNX_MODEL_ROOT, model_name.replace("/", "__"))
+
+def export_onnx(model_name: str, out_dir: str = None) -> str:
+    """Export a sentence-transformers model to ONNX and write an int8 quantized copy.
+
+    Needs torch and sentence-transformers once; afterwards the onnx backend only
+    needs onnxruntime and the saved tokenizer.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    out_dir = out_dir or onnx_model_dir(model_name)
+    os.makedirs(out_dir, exist_ok=True)
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0]
+    transformer.auto_model.eval()
+    transformer.tokenizer.save_pretrained(out_dir)
+
+    sample = transformer.tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ["input_ids", "attention_mask", "token_type_ids"] if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer.auto_model,
+            tuple(sample[name] for name in input_names),
+            os.path.join(out_dir, ONNX_FILE),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=ONNX_OPSET
+        )
+    quantize_dynamic(os.path.join(out_dir, ONNX_FILE), os.path.join(out_dir, ONNX_INT8_FILE), weight_type=QuantType.QInt8)
+
+    # The pooling/normalize modules after the transformer are reproduced in NumPy
+    module_types = [type(module).__name__ for module in model]
+    config = {
+        "model_name": model_name,
+        "max_seq_length": model.max_seq_length,
+        "input_names": input_names,
+        "normalize": "Normalize" in module_types
+    }
+    with open(os.path.join(out_dir, ONNX_CONFIG_FILE), "w") as f:
+        json.dump(config, f, indent=2)
+    logger.info(f"Exported {model_name} to {out_dir}")
+    return out_dir
+
+class OnnxEmbeddings(Embeddings):
+    """Mean-pooled sentence embeddings from an exported ONNX model via onnxruntime."""
+
+    def __init__(self, model_name: str, quantized: bool = True, batch_size: int = EMBEDDING_BATCH_SIZE):
+        try:
+            import onnxruntime
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise ImportError("EMBEDDING_BACKEND=onnx needs 'onnxruntime' and 'transformers' installed.") from e
+
+        model_dir = onnx_model_dir(model_name)
+        model_file = os.path.join(model_dir, ONNX_INT8_FILE if quantized else ONNX_FILE)
+        if not os.path.exists(model_file):
+            export_onnx(model_name, model_dir)
+        with open(os.path.join(model_dir, ONNX_CONFIG_FILE), "r") as f:
+            self.config = json.load(f)
+
+        options = onnxruntime.SessionOptions()
+        if ONNX_THREADS:
+            options.intra_op_num_threads = ONNX_THREADS
+        self.session = onnxruntime.InferenceSession(model_file, options, providers=["CPUExecutionProvider"])
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.model_file = model_file
+        self.batch_size = batch_size
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        outputs = []
+        for start in range(0, len(texts), self.batch_size):
+            encoded = self.tokenizer(
+                texts[start:start + self.batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.config["max_seq_length"],
+                return_tensors="np"
+            )
+            feed = {name: encoded[name].astype(np.int64) for name in self.config["input_names"]}
+            hidden = self.session.run(None, feed)[0]
+            mask = feed["attention_mask"][:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.config["normalize"]:
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            outputs.append(pooled.astype(np.float32))
+        return np.vstack(outputs) if outputs else np.zeros((0, 0), dtype=np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0].tolist()
+
+def get_embeddings(model_name: str, backend: str = None) -> Embeddings:
+    """Embedding model for the configured backend (EMBEDDING_BACKEND)."""
+    backend = backend or EMBEDDING_BACKEND
+    if backend == "onnx":
+        return OnnxEmbeddings(model_name)
+    if backend == "torch":
+        from langchain_community.embeddings import SentenceTransformerEmbeddings
+        return SentenceTransformerEmbeddings(model_name=model_name)
+    raise ValueError(f"Unknown embedding backend '{backend}'. Expected one of {EMBEDDING_BACKENDS}.")
+
+def embedding_backend_name(embeddings: Embeddings) -> str:
+    """Backend tag recorded in index metadata; vectors from different backends differ slightly."""
+    if isinstance(embeddings, OnnxEmbeddings):
+        return "onnx-int8" if embeddings.model_file.endswith(ONNX_INT8_FILE) else "onnx"
+    return "torch"
+
+def parity_check(model_name: str, texts: List[str] = PARITY_TEXTS, repeats: int = 3) -> Dict[str, Any]:
+    """Compare the ONNX (fp32 and int8) embeddings with PyTorch on cosine and speed."""
+    reference = get_embeddings(model_name, "torch")
+    candidates = {"torch": reference, "onnx": OnnxEmbeddings(model_name, quantized=False), "onnx-int8": OnnxEmbeddings(model_name)}
+
+    report = {"model_name": model_name, "texts": len(texts)}
+    vectors = {}
+    for name, embeddings in candidates.items():
+        embeddings.embed_documents(texts[:1])  # warm up
+        start = time.perf_counter()
+        for _ in range(repeats):
+            vectors[name] = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+        ms_per_text = (time.perf_counter() - start) * 1000 / (repeats * len(texts))
+        report[name] = {"ms_per_text": round(ms_per_text, 3)}
+        if name != "torch":
+            # Large fp32 exports keep their weights in an external .data file
+            data_file = embeddings.model_file + ".data"
+            report[name]["model_bytes"] = os.path.getsize(embeddings.model_file) + (os.path.getsize(data_file) if os.path.exists(data_file) else 0)
+
+    base = vectors["torch"]
+    for name in ["onnx", "onnx-int8"]:
+        other = vectors[name]
+        cosine = (base * other).sum(axis=1) / (np.linalg.norm(base, axis=1) * np.linalg.norm(other, axis=1))
+        # Ranking parity: does each text's nearest neighbour stay the same?
+        same_neighbour = np.mean(np.argsort(-(base @ base.T), axis=1)[:, 1] == np.argsort(-(other @ other.T), axis=1)[:, 1])
+        report[name].update({
+            "min_cosine": round(float(cosine.min()), 5),
+            "mean_cosine": round(float(cosine.mean()), 5),
+            "max_abs_diff": round(float(np.abs(base - other).max()), 5),
+            "same_nearest_neighbour": round(float(same_neighbour), 4),
+            "speedup": round(report["torch"]["ms_per_text"] / report[name]["ms_per_text"], 2)
+        })
+    return report
+
+if __name__ == "__main__":
+    # python -m utils.embedding_helper --export
+    # python -m utils.embedding_helper --parity
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX/int8 and check parity with PyTorch.")
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"))
+    parser.add_argument("--export", action="store_true")
+    parser.add_argument("--parity", action="store_true")
+    args = parser.parse_args()
+    if args.export:
+        print(export_onnx(args.model))
+    if args.parity:
+        print(json.dumps(parity_check(args.model), indent=2))
@@ -0,0 +1,225 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import argparse
+import threading
+import numpy as np
+import faiss
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+from bs4 import BeautifulSoup
+from utils.retrieval_service import EMBEDDING_MODEL, VECTORSTORE_ROOT, get_retrieval_service
+from utils.embedding_helper import get_embeddings
+
+logger = logging.getLogger(__name__)
+
+# Index of the customer's own migrated flows: one vector per flow signature plus the
+# accepted agent outputs for it, so a new flow can start from its nearest neighbour.
+FLOW_INDEX_PATH = os.getenv("FLOW_INDEX_PATH", os.path.join(VECTORSTORE_ROOT, "flow_index"))
+FLOW_VECTORS_FILE = "flows.faiss"
+FLOW_RECORDS_FILE = "flows.jsonl"
+FLOW_LOCK_FILE = "flows.lock"
+# A lock file older than this was left by a writer that died and is removed
+FLOW_LOCK_STALE_SECONDS = 60
+
+# Cosine similarity below which a previous migration is not offered as a starting point
+FLOW_MATCH_MIN_SCORE = float(os.getenv("FLOW_MATCH_MIN_SCORE", "0.8"))
+# The embedding model reads ~256 word pieces, so the signature leads with the most
+# distinctive parts of a flow: invoked services, step types, then field names
+FLOW_SIGNATURE_MAX_CHARS = 2000
+
+SERVICE_ATTRIBUTE = re.compile(r'\bSERVICE="([^"]+)"', re.IGNORECASE)
+NAME_ATTRIBUTE = re.compile(r'\b(?:NAME|FIELD_NAME)="([^"]+)"', re.IGNORECASE)
+TAG = re.compile(r"<([A-Za-z][\w:.-]*)")
+
+def flow_id(content: str) -> str:
+    """Stable id of a flow, ignoring whitespace differences."""
+    return hashlib.sha1(re.sub(r"\s+", " ", content).strip().encode("utf-8")).hexdigest()[:16]
+
+def flow_signature(content: str) -> str:
+    """Compact text describing a flow's structure, used for embedding."""
+    services = list(dict.fromkeys(SERVICE_ATTRIBUTE.findall(content)))
+    steps = Counter(tag.upper() for tag in TAG.findall(content))
+    names = list(dict.fromkeys(NAME_ATTRIBUTE.findall(content)))
+    text = re.sub(r"\s+", " ", BeautifulSoup(content, "html.parser").get_text(" ")).strip()
+    signature = "\n".join([
+        f"services: {', '.join(services)}",
+        f"steps: {', '.join(f'{tag} x{count}' for tag, count in steps.most_common())}",
+        f"fields: {', '.join(names)}",
+        f"text: {text}"
+    ])
+    return signature[:FLOW_SIGNATURE_MAX_CHARS]
+
+@contextmanager
+def flow_index_lock(path: str, timeout: float = 30):
+    """Exclusive lock across processes on the flow index files at path (a lock file
+    created with O_EXCL, so it also works where fcntl is unavailable)."""
+    os.makedirs(path, exist_ok=True)
+    lock_path = os.path.join(path, FLOW_LOCK_FILE)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > FLOW_LOCK_STALE_SECONDS:
+                    os.remove(lock_path)
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Flow index at {path} is locked by another process")
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        os.remove(lock_path)
+
+class FlowIndex:
+    """Flat inner-product index over normalized flow signature embeddings.
+
+    Records are kept in index position order in flows.jsonl; recording a flow that is
+    already indexed replaces its outputs without adding a vector. Several processes
+    share the files (the Streamlit app records flows, job workers search them): writes
+    happen under flow_index_lock on the latest files, and a process reloads the index
+    when flows.jsonl changed since it last read it.
+    """
+
+    def __init__(self, path: str = FLOW_INDEX_PATH, embeddings=None):
+        self.path = path
+        self.embeddings = embeddings
+        self.records: List[Dict[str, Any]] = []
+        self.index = None
+        self._loaded = None
+        self._lock = threading.Lock()
+        with flow_index_lock(self.path):
+            self._load()
+
+    def _stamp(self) -> Optional[tuple]:
+        """Identity of the records file on disk; flows.jsonl is replaced last on every save."""
+        try:
+            stat = os.stat(os.path.join(self.path, FLOW_RECORDS_FILE))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load(self) -> None:
+        vectors_path = os.path.join(self.path, FLOW_VECTORS_FILE)
+        records_path = os.path.join(self.path, FLOW_RECORDS_FILE)
+        if os.path.exists(vectors_path) and os.path.exists(records_path):
+            self.index = faiss.read_index(vectors_path)
+            with open(records_path, "r", encoding="utf-8") as f:
+                self.records = [json.loads(line) for line in f if line.strip()]
+        self._loaded = self._stamp()
+
+    def _refresh(self) -> None:
+        """Reload flows recorded by other processes since this one last read the files."""
+        if self._stamp() != self._loaded:
+            with flow_index_lock(self.path):
+                self._load()
+
+    def _save(self) -> None:
+        """Write both files atomically; call under flow_index_lock."""
+        records_path = os.path.join(self.path, FLOW_RECORDS_FILE)
+        vectors_path = os.path.join(self.path, FLOW_VECTORS_FILE)
+        faiss.write_index(self.index, vectors_path + ".tmp")
+        with open(records_path + ".tmp", "w", encoding="utf-8") as f:
+            for record in self.records:
+                f.write(json.dumps(record) + "\n")
+        os.replace(vectors_path + ".tmp", vectors_path)
+        os.replace(records_path + ".tmp", records_path)
+        self._loaded = self._stamp()
+
+    def _embed(self, signatures: List[str]) -> np.ndarray:
+        vectors = np.asarray(self.embeddings.embed_documents(signatures), dtype="float32")
+        faiss.normalize_L2(vectors)
+        return vectors
+
+    def add(self, content: str, outputs: Dict[str, str], name: str = "") -> str:
+        """Record a migrated flow and its accepted outputs; returns the flow id."""
+        record_id = flow_id(content)
+        with self._lock, flow_index_lock(self.path):
+            # Start from the files as they are now, so flows other processes recorded are kept
+            if self._stamp() != self._loaded:
+                self._load()
+            for record in self.records:
+                if record["flow_id"] == record_id:
+                    record.update({"outputs": outputs, "name": name or record["name"], "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S")})
+                    self._save()
+                    return record_id
+            signature = flow_signature(content)
+            vector = self._embed([signature])
+            if self.index is None:
+                self.index = faiss.IndexFlatIP(vector.shape[1])
+            self.index.add(vector)
+            self.records.append({
+                "flow_id": record_id,
+                "name": name,
+                "signature": signature,
+                "outputs": outputs,
+                "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+            })
+            self._save()
+        return record_id
+
+    def search(self, content: str, k: int = 3, min_score: float = FLOW_MATCH_MIN_SCORE) -> List[Dict[str, Any]]:
+        """Nearest previously migrated flows: {flow_id, name, score, outputs}, best first."""
+        if not content.strip():
+            return []
+        with self._lock:
+            self._refresh()
+            if self.index is None:
+                return []
+        vector = self._embed([flow_signature(content)])
+        with self._lock:
+            scores, positions = self.index.search(vector, min(k, self.index.ntotal))
+            return [
+                {
+                    "flow_id": self.records[p]["flow_id"],
+                    "name": self.records[p]["name"],
+                    "score": round(float(score), 4),
+                    "outputs": self.records[p]["outputs"]
+                }
+                for p, score in zip(positions[0], scores[0])
+                if p != -1 and score >= min_score
+            ]
+
+_flow_index = None
+_flow_index_lock = threading.Lock()
+
+def get_flow_index() -> FlowIndex:
+    """Process-wide FlowIndex sharing the retrieval service's embedding model."""
+    global _flow_index
+    if _flow_index is None:
+        with _flow_index_lock:
+            if _flow_index is None:
+                # The daemon client has no local model; flow lookups then load their own
+                embeddings = get_retrieval_service().embeddings or get_embeddings(EMBEDDING_MODEL)
+                _flow_index = FlowIndex(FLOW_INDEX_PATH, embeddings)
+    return _flow_index
+
+def record_migration(content: str, outputs: Dict[str, str], name: str = "") -> Optional[str]:
+    """Add an accepted migration to the flow index; None if there is no flow content."""
+    if not content or not content.strip() or not outputs:
+        return None
+    return get_flow_index().add(content, outputs, name)
+
+def find_similar_flows(content: str, k: int = 1, min_score: float = FLOW_MATCH_MIN_SCORE) -> List[Dict[str, Any]]:
+    return get_flow_index().search(content, k=k, min_score=min_score)
+
+if __name__ == "__main__":
+    # python -m utils.flow_index_helper --search path/to/flow.xml
+    parser = argparse.ArgumentParser(description="Look up previously migrated flows similar to a flow file.")
+    parser.add_argument("--search", required=True, help="Flow XML/HTML file")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--min-score", type=float, default=0.0)
+    args = parser.parse_args()
+    with open(args.search, "r", encoding="utf-8") as f:
+        matches = find_similar_flows(f.read(), k=args.k, min_score=args.min_score)
+    print(json.dumps([{key: m[key] for key in ["flow_id", "name", "score"]} | {"tabs": sorted(m["outputs"])} for m in matches], indent=2))
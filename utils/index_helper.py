@@ -0,0 +1,389 @@
+import os
+import json
+import time
+import uuid
+import pickle
+import shutil
+import logging
+import argparse
+import numpy as np
+import faiss
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from utils.compact_index import CompactIndex
+
+logger = logging.getLogger(__name__)
+
+# On-disk layout of a persisted index directory. index.faiss and index.pkl are the
+# same files FAISS.save_local writes, so a directory stays readable by FAISS.load_local.
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "index.pkl"
+META_FILE = "meta.json"
+
+# Versioned layout: every build is written to versions/<version>.building/ under the corpus
+# directory, renamed to versions/<version>/ once complete and published by atomically
+# replacing the CURRENT pointer file, so readers never open a half-written index. A corpus
+# directory with index files at its root (built before versioning) is read as-is until
+# its first versioned build.
+VERSIONS_DIR = "versions"
+CURRENT_FILE = "CURRENT"
+BUILDING_SUFFIX = ".building"
+KEEP_VERSIONS = int(os.getenv("VECTORSTORE_KEEP_VERSIONS", "2"))
+STALE_BUILD_SECONDS = 6 * 3600  # unfinished builds older than this are from crashed processes
+
+# Read flags tried in order: mmap everything (flat codes and inverted lists), mmap flat
+# codes only, then a plain heap read for index types FAISS cannot map.
+MMAP_READ_FLAGS = [
+    faiss.IO_FLAG_READ_ONLY | faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0),
+    faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP),
+]
+
+# Index types offered by build_index. Flat is exact; HNSW trades memory for fast graph
+# search; IVF-PQ compresses vectors to PQ codes and only scans nprobe inverted lists;
+# compact keeps float16 vectors plus binary sign codes (see utils/compact_index.py).
+INDEX_TYPES = ["flat", "hnsw", "ivfpq", "compact"]
+HNSW_M = int(os.getenv("VECTORSTORE_HNSW_M", "32"))
+HNSW_EF_SEARCH = int(os.getenv("VECTORSTORE_HNSW_EF_SEARCH", "64"))
+IVF_NPROBE = int(os.getenv("VECTORSTORE_IVF_NPROBE", "16"))
+PQ_SUBVECTOR_DIM = 8  # dimensions per PQ sub-quantizer (384 -> 48 bytes per vector)
+PQ_MIN_TRAIN = 256 * 39  # 8-bit PQ codebooks need ~39 points per centroid
+TRAIN_SAMPLE_SIZE = int(os.getenv("VECTORSTORE_TRAIN_SAMPLE", "50000"))
+
+def index_factory_string(index_type: str, dim: int, ntotal: int) -> str:
+    """Map an index type to a FAISS factory string sized for the corpus."""
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "hnsw":
+        return f"HNSW{HNSW_M}"
+    if index_type == "ivfpq":
+        nlist = max(1, min(int(4 * np.sqrt(ntotal)), ntotal // 39))
+        pq_m = dim // PQ_SUBVECTOR_DIM if dim % PQ_SUBVECTOR_DIM == 0 else dim
+        return f"IVF{nlist},PQ{pq_m}"
+    raise ValueError(f"Unknown index type '{index_type}'. Expected one of {INDEX_TYPES}.")
+
+def apply_search_params(index) -> None:
+    """Set query-time knobs (efSearch / nprobe) that are not reliably persisted."""
+    if isinstance(index, CompactIndex):
+        return
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    try:
+        faiss.extract_index_ivf(index).nprobe = IVF_NPROBE
+    except RuntimeError:
+        pass
+
+def build_index(vectors: np.ndarray, index_type: str = "flat", seed: int = 0):
+    """Build a FAISS index over float32 vectors, training on a random sample if needed."""
+    ntotal, dim = vectors.shape
+    if index_type == "compact":
+        index = CompactIndex(dim)
+        index.add(vectors)
+        return index, index_type
+    if index_type == "ivfpq" and ntotal < PQ_MIN_TRAIN:
+        logger.info(f"{ntotal} vectors are too few to train IVF-PQ; building a flat index instead.")
+        index_type = "flat"
+    index = faiss.index_factory(dim, index_factory_string(index_type, dim, ntotal))
+    if not index.is_trained:
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(ntotal, min(ntotal, TRAIN_SAMPLE_SIZE), replace=False)]
+        index.train(sample)
+    index.add(vectors)
+    apply_search_params(index)
+    return index, index_type
+
+def build_vectorstore(docs: List[Any], embeddings, index_type: str = "flat"):
+    """Embed documents and wrap a factory-built index in a LangChain FAISS store.
+
+    Returns the vector store and a metadata dict for save_index.
+    """
+    start = time.perf_counter()
+    vectors = np.asarray(embeddings.embed_documents([doc.page_content for doc in docs]), dtype="float32")
+    embed_seconds = time.perf_counter() - start
+    index, index_type = build_index(vectors, index_type)
+    ids = [str(uuid.uuid4()) for _ in docs]
+    vectorstore = FAISS(
+        embeddings,
+        index,
+        InMemoryDocstore(dict(zip(ids, docs))),
+        dict(enumerate(ids))
+    )
+    meta = {
+        "index_type": index_type,
+        "embed_seconds": round(embed_seconds, 3),
+        "build_seconds": round(time.perf_counter() - start - embed_seconds, 3)
+    }
+    return vectorstore, meta
+
+def build_report(vectors: np.ndarray, index_types: List[str] = INDEX_TYPES, k: int = 10, n_queries: int = 200) -> List[Dict[str, Any]]:
+    """Compare index types on memory, build time, query latency and recall@k vs flat."""
+    rng = np.random.default_rng(0)
+    queries = vectors[rng.choice(len(vectors), min(len(vectors), n_queries), replace=False)]
+    baseline = faiss.IndexFlatL2(vectors.shape[1])
+    baseline.add(vectors)
+    _, truth = baseline.search(queries, k)
+
+    report = []
+    for index_type in index_types:
+        start = time.perf_counter()
+        index, built_type = build_index(vectors, index_type)
+        build_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        _, found = index.search(queries, k)
+        query_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        recall = np.mean([len(set(found[i]) & set(truth[i])) / k for i in range(len(queries))])
+        report.append({
+            "index_type": index_type,
+            "built_as": built_type,
+            "ntotal": index.ntotal,
+            "memory_bytes": index.nbytes if isinstance(index, CompactIndex) else int(faiss.serialize_index(index).nbytes),
+            "build_seconds": round(build_seconds, 3),
+            "query_ms": round(query_ms, 4),
+            f"recall@{k}": round(float(recall), 4)
+        })
+    return report
+
+def index_exists(path: str) -> bool:
+    vectors_exist = os.path.exists(os.path.join(path, INDEX_FILE)) or CompactIndex.exists(path)
+    return vectors_exist and os.path.exists(os.path.join(path, DOCSTORE_FILE))
+
+def save_index(vectorstore: FAISS, path: str, **meta) -> dict:
+    """Persist a FAISS vector store as index.faiss (or compact arrays) + index.pkl + meta.json."""
+    os.makedirs(path, exist_ok=True)
+    if isinstance(vectorstore.index, CompactIndex):
+        vectorstore.index.save(path)
+    else:
+        faiss.write_index(vectorstore.index, os.path.join(path, INDEX_FILE))
+    with open(os.path.join(path, DOCSTORE_FILE), "wb") as f:
+        pickle.dump((vectorstore.docstore, vectorstore.index_to_docstore_id), f)
+
+    meta = {
+        "version": meta.pop("version", None) or time.strftime("%Y%m%d%H%M%S"),
+        "ntotal": vectorstore.index.ntotal,
+        "dim": vectorstore.index.d,
+        **meta
+    }
+    with open(os.path.join(path, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+def read_current_version(path: str) -> Optional[str]:
+    try:
+        with open(os.path.join(path, CURRENT_FILE), "r") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def current_index_path(path: str) -> Optional[str]:
+    """Directory holding the published index of a corpus, or None if none exists yet."""
+    version = read_current_version(path)
+    if version and index_exists(os.path.join(path, VERSIONS_DIR, version)):
+        return os.path.join(path, VERSIONS_DIR, version)
+    return path if index_exists(path) else None
+
+def begin_version(path: str) -> Tuple[str, str]:
+    """Reserve a new version; returns (version, directory to build it in)."""
+    version = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    building_path = os.path.join(path, VERSIONS_DIR, version + BUILDING_SUFFIX)
+    os.makedirs(building_path)
+    return version, building_path
+
+def publish_version(path: str, version: str, building_path: str) -> str:
+    """Make a completely written version the current one; returns its directory."""
+    version_path = os.path.join(path, VERSIONS_DIR, version)
+    os.rename(building_path, version_path)
+    pointer_tmp = os.path.join(path, f"{CURRENT_FILE}.{uuid.uuid4().hex[:6]}.tmp")
+    with open(pointer_tmp, "w") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, os.path.join(path, CURRENT_FILE))
+    return version_path
+
+def gc_versions(path: str, keep: int = KEEP_VERSIONS) -> List[str]:
+    """Delete all but the current and `keep` newest versions, plus stale unfinished builds.
+
+    Processes still reading a deleted version are unaffected on POSIX: mapped index
+    files stay valid until unmapped and the docstore is already in memory.
+    """
+    versions_root = os.path.join(path, VERSIONS_DIR)
+    if not os.path.isdir(versions_root):
+        return []
+    names = os.listdir(versions_root)
+    complete = sorted(name for name in names if not name.endswith(BUILDING_SUFFIX))
+    kept = set(complete[-keep:] if keep > 0 else []) | {read_current_version(path)}
+    removed = []
+    for name in names:
+        version_path = os.path.join(versions_root, name)
+        if name.endswith(BUILDING_SUFFIX):
+            if time.time() - os.path.getmtime(version_path) < STALE_BUILD_SECONDS:
+                continue  # possibly still being built by another process
+        elif name in kept:
+            continue
+        try:
+            shutil.rmtree(version_path)
+            removed.append(name)
+        except OSError as e:
+            logger.warning(f"Could not remove old index version {version_path}: {e}")
+    return removed
+
+def load_meta(path: str) -> dict:
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        return {}
+    with open(meta_path, "r") as f:
+        return json.load(f)
+
+def read_faiss_index(index_path: str, mmap: bool = True):
+    """Read a FAISS index, memory-mapping the vectors when the index type allows it.
+
+    A mapped index is backed by the OS page cache, so every process that opens the
+    same file shares one copy of the vectors and loading no longer scales with size.
+    """
+    if mmap:
+        for flags in MMAP_READ_FLAGS:
+            try:
+                return faiss.read_index(index_path, flags)
+            except RuntimeError as e:
+                logger.debug(f"mmap read of {index_path} with flags {flags} failed: {e}")
+        logger.info(f"Index type of {index_path} cannot be memory-mapped; reading into memory.")
+    return faiss.read_index(index_path)
+
+def load_index(path: str, embeddings, mmap: bool = True) -> FAISS:
+    """Load a persisted index directory into a LangChain FAISS vector store."""
+    if CompactIndex.exists(path):
+        index = CompactIndex.load(path, mmap=mmap)
+    else:
+        index = read_faiss_index(os.path.join(path, INDEX_FILE), mmap=mmap)
+    with open(os.path.join(path, DOCSTORE_FILE), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    apply_search_params(index)
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+def embed_queries(vectorstore: FAISS, queries: List[str]) -> np.ndarray:
+    """Embed several queries in one model call (MiniLM uses no query-specific prefix)."""
+    if len(queries) == 1:
+        return np.asarray([vectorstore.embeddings.embed_query(queries[0])], dtype="float32")
+    return np.asarray(vectorstore.embeddings.embed_documents(queries), dtype="float32")
+
+def matches_filter(metadata: Dict[str, Any], metadata_filter: Dict[str, Any]) -> bool:
+    """True if chunk metadata satisfies every key of a metadata filter.
+
+    A string or list of strings matches case-insensitive substrings of the value (any
+    of the list), e.g. {"section_path": ["Handlers", "WS-Security"]}; a dict with "min"
+    and/or "max" matches an inclusive numeric range, e.g. {"page": {"min": 100}}.
+    """
+    for key, expected in metadata_filter.items():
+        value = metadata.get(key)
+        if value is None:
+            return False
+        if isinstance(expected, dict):
+            if value < expected.get("min", value) or value > expected.get("max", value):
+                return False
+            continue
+        terms = [expected] if isinstance(expected, str) else expected
+        if not any(str(term).lower() in str(value).lower() for term in terms):
+            return False
+    return True
+
+def filter_positions(vectorstore: FAISS, metadata_filter: Dict[str, Any]) -> np.ndarray:
+    """Index positions of the chunks whose metadata matches a filter."""
+    docs = docs_at(vectorstore, range(vectorstore.index.ntotal))
+    return np.array([p for p, doc in enumerate(docs) if matches_filter(doc.metadata, metadata_filter)], dtype="int64")
+
+def selector_search_params(index, selector, k: int, allowed: int):
+    """FAISS search parameters restricting a search to an IDSelector, per index type."""
+    if isinstance(index, faiss.IndexHNSW):
+        # Most graph neighbours are filtered out, so widen the beam with the filter's selectivity
+        ef_search = min(max(index.hnsw.efSearch, k * index.ntotal // max(allowed, 1)), 1024)
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search)
+    try:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=faiss.extract_index_ivf(index).nprobe)
+    except RuntimeError:
+        return faiss.SearchParameters(sel=selector)
+
+def dense_search_batch(vectorstore: FAISS, vectors: np.ndarray, k: int, allowed: np.ndarray = None) -> List[List[tuple]]:
+    """Batched FAISS search; one list of (index position, L2 distance) pairs per query vector.
+
+    `allowed` restricts the search to those index positions (see filter_positions);
+    FAISS skips every other vector instead of scoring and discarding it.
+    """
+    if isinstance(vectorstore.index, CompactIndex):
+        distances, positions = vectorstore.index.search(vectors, k, allowed=allowed)
+    elif allowed is None:
+        distances, positions = vectorstore.index.search(vectors, k)
+    else:
+        selector = faiss.IDSelectorBatch(allowed)
+        params = selector_search_params(vectorstore.index, selector, k, len(allowed))
+        distances, positions = vectorstore.index.search(vectors, k, params=params)
+    return [
+        [(int(p), float(d)) for p, d in zip(row_positions, row_distances) if p != -1]
+        for row_positions, row_distances in zip(positions, distances)
+    ]
+
+def dense_search(vectorstore: FAISS, query: str, k: int, allowed: np.ndarray = None) -> List[tuple]:
+    """Return (index position, L2 distance) pairs for the k nearest chunks."""
+    return dense_search_batch(vectorstore, embed_queries(vectorstore, [query]), k, allowed)[0]
+
+def reconstruct_vectors(vectorstore: FAISS, positions: List[int]) -> np.ndarray:
+    """Stored vectors at the given positions; re-embeds the chunks if the index cannot
+    reconstruct them (e.g. IVF without a direct map)."""
+    ids = np.asarray(positions, dtype="int64")
+    try:
+        return vectorstore.index.reconstruct_batch(ids)
+    except RuntimeError:
+        pass
+    try:
+        faiss.extract_index_ivf(vectorstore.index).make_direct_map()
+        return vectorstore.index.reconstruct_batch(ids)
+    except RuntimeError:
+        texts = [doc.page_content for doc in docs_at(vectorstore, positions)]
+        return np.asarray(vectorstore.embeddings.embed_documents(texts), dtype="float32")
+
+def mmr_select(query_vector: np.ndarray, candidate_vectors: np.ndarray, k: int, lambda_mult: float = 0.5) -> List[int]:
+    """Maximal marginal relevance over candidates; returns indices into candidate_vectors.
+
+    Relevance to the query and all pairwise candidate similarities are computed as two
+    matrix products up front; each greedy step is then a vector update of the running
+    max similarity to the selected set instead of a Python loop over pairs.
+    """
+    if len(candidate_vectors) == 0:
+        return []
+    candidates = candidate_vectors / np.clip(np.linalg.norm(candidate_vectors, axis=1, keepdims=True), 1e-12, None)
+    query = query_vector / max(float(np.linalg.norm(query_vector)), 1e-12)
+    relevance = candidates @ query
+    similarity = candidates @ candidates.T
+
+    selected = [int(np.argmax(relevance))]
+    max_similarity = similarity[selected[0]].copy()
+    for _ in range(min(k, len(candidates)) - 1):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[selected] = -np.inf
+        chosen = int(np.argmax(scores))
+        selected.append(chosen)
+        np.maximum(max_similarity, similarity[chosen], out=max_similarity)
+    return selected
+
+def docs_at(vectorstore: FAISS, positions: List[int]) -> List[Any]:
+    """Look up the documents stored at the given index positions."""
+    return [vectorstore.docstore.search(vectorstore.index_to_docstore_id[p]) for p in positions]
+
+if __name__ == "__main__":
+    # Build report over the vectors of an existing flat index, e.g.
+    #   python -m utils.index_helper --path vectorstore/faiss_index --types flat,hnsw,ivfpq
+    parser = argparse.ArgumentParser(description="Compare FAISS index types on a persisted corpus.")
+    parser.add_argument("--path", default="vectorstore/faiss_index")
+    parser.add_argument("--types", default=",".join(INDEX_TYPES))
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    # Corpus directory or a directory holding an index; versioned corpora resolve to the published version
+    index_path = current_index_path(args.path)
+    if index_path is None:
+        parser.error(f"No index found at {args.path}")
+    if CompactIndex.exists(index_path):
+        source = CompactIndex.load(index_path, mmap=False)
+    else:
+        source = read_faiss_index(os.path.join(index_path, INDEX_FILE), mmap=False)
+    vectors = source.reconstruct_n(0, source.ntotal)
+    print(json.dumps(build_report(vectors, args.types.split(","), k=args.k), indent=2))
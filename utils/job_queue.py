@@ -0,0 +1,251 @@
+import os
+import sys
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import argparse
+import importlib
+import threading
+import subprocess
+import multiprocessing
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Background jobs for the Streamlit apps: a SQLite queue shared by every server
+# process and a pool of worker processes. The UI submits a job and polls it by id,
+# so a rerun, refresh or second click does not abort or repeat the LLM calls.
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join("outputs", "jobs.sqlite"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Start a worker pool from the UI process when none is running
+JOB_AUTOSTART_WORKERS = os.getenv("JOB_AUTOSTART_WORKERS", "true").lower() == "true"
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+JOB_HEARTBEAT_SECONDS = 5
+# A running job whose worker missed heartbeats this long is queued again
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_MAX_AGE_HOURS = float(os.getenv("JOB_MAX_AGE_HOURS", "168"))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+# Job kind -> "module:function"; the function gets the payload as keyword arguments
+# and returns a JSON-serializable result
+JOB_HANDLERS = {
+    "agentic_tab": "utils.agentic_helper:run_agentic_workflow",
+    "ma_agentic": "utils.ma_agentic_helper:run_workflow_job"
+}
+
+@contextmanager
+def job_db():
+    """Autocommit connection to the job database, closed on exit."""
+    directory = os.path.dirname(JOB_DB_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(JOB_DB_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS jobs ("
+        "id TEXT PRIMARY KEY, kind TEXT, payload TEXT, status TEXT, result TEXT, error TEXT, attempts INTEGER DEFAULT 0, "
+        "worker_pid INTEGER, created_at REAL, started_at REAL, finished_at REAL)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+    conn.execute("CREATE TABLE IF NOT EXISTS workers (pid INTEGER PRIMARY KEY, heartbeat REAL)")
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+def submit_job(kind: str, payload: Dict[str, Any]) -> str:
+    """Queue a job and return its id."""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind '{kind}'. Expected one of {list(JOB_HANDLERS)}.")
+    job_id = uuid.uuid4().hex
+    with job_db() as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, kind, payload, status, created_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(payload), JOB_QUEUED, time.time())
+        )
+    if JOB_AUTOSTART_WORKERS:
+        ensure_workers()
+    return job_id
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Job status, result and error by id; None if unknown."""
+    with job_db() as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    if row is None:
+        return None
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+def list_jobs(status: str = None, limit: int = 50) -> List[Dict[str, Any]]:
+    with job_db() as conn:
+        if status:
+            rows = conn.execute("SELECT id, kind, status, error, created_at, finished_at FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?", (status, limit))
+        else:
+            rows = conn.execute("SELECT id, kind, status, error, created_at, finished_at FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))
+        return [dict(row) for row in rows.fetchall()]
+
+def live_workers() -> int:
+    with job_db() as conn:
+        return conn.execute("SELECT COUNT(*) FROM workers WHERE heartbeat > ?", (time.time() - JOB_STALE_SECONDS,)).fetchone()[0]
+
+_workers_started_at = 0.0
+_workers_lock = threading.Lock()
+
+def ensure_workers(workers: int = JOB_WORKERS) -> None:
+    """Start a detached worker pool (python -m utils.job_queue) unless one is alive."""
+    global _workers_started_at
+    with _workers_lock:
+        # A pool started moments ago may not have sent its first heartbeat yet
+        if live_workers() or time.time() - _workers_started_at < JOB_STALE_SECONDS:
+            return
+        subprocess.Popen(
+            [sys.executable, "-m", "utils.job_queue", "--workers", str(workers)],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+        _workers_started_at = time.time()
+        logger.info(f"Started job worker pool with {workers} workers")
+
+def requeue_stale_jobs(conn: sqlite3.Connection) -> None:
+    """Queue again the running jobs of workers that stopped sending heartbeats."""
+    now = time.time()
+    conn.execute(
+        "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+        "error = CASE WHEN attempts >= ? THEN 'worker stopped' ELSE error END, "
+        "finished_at = CASE WHEN attempts >= ? THEN ? ELSE finished_at END, worker_pid = NULL "
+        "WHERE status = ? AND worker_pid NOT IN (SELECT pid FROM workers WHERE heartbeat > ?)",
+        (JOB_MAX_ATTEMPTS, JOB_FAILED, JOB_QUEUED, JOB_MAX_ATTEMPTS, JOB_MAX_ATTEMPTS, now, JOB_RUNNING, now - JOB_STALE_SECONDS)
+    )
+
+def claim_next_job(pid: int) -> Optional[Dict[str, Any]]:
+    """Atomically mark the oldest queued job as running by this worker.
+
+    The worker's heartbeat is written in the same transaction, so no other worker can
+    take the job for stale before the heartbeat thread first runs.
+    """
+    with job_db() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            requeue_stale_jobs(conn)
+            row = conn.execute("SELECT id, kind, payload FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (JOB_QUEUED,)).fetchone()
+            if row is not None:
+                now = time.time()
+                conn.execute("INSERT OR REPLACE INTO workers (pid, heartbeat) VALUES (?, ?)", (pid, now))
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker_pid = ?, started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                    (JOB_RUNNING, pid, now, row["id"])
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return {"id": row["id"], "kind": row["kind"], "payload": json.loads(row["payload"])} if row else None
+
+def finish_job(job_id: str, result: Any = None, error: str = None) -> None:
+    with job_db() as conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+            (JOB_FAILED if error else JOB_COMPLETED, None if error else json.dumps(result), error, time.time(), job_id)
+        )
+
+def heartbeat(pid: int) -> None:
+    with job_db() as conn:
+        conn.execute("INSERT OR REPLACE INTO workers (pid, heartbeat) VALUES (?, ?)", (pid, time.time()))
+
+def run_job(job: Dict[str, Any]) -> None:
+    module_name, function_name = JOB_HANDLERS[job["kind"]].split(":")
+    try:
+        handler = getattr(importlib.import_module(module_name), function_name)
+        finish_job(job["id"], result=handler(**job["payload"]))
+    except Exception as e:
+        logger.exception(f"Job {job['id']} ({job['kind']}) failed")
+        finish_job(job["id"], error=f"{e.__class__.__name__}: {e}")
+
+def worker_loop(poll_seconds: float = JOB_POLL_SECONDS) -> None:
+    """Claim and run jobs until the process is stopped, sending heartbeats meanwhile."""
+    pid = os.getpid()
+
+    def beat():
+        while True:
+            time.sleep(JOB_HEARTBEAT_SECONDS)
+            heartbeat(pid)
+
+    heartbeat(pid)
+    threading.Thread(target=beat, daemon=True).start()
+    while True:
+        job = claim_next_job(pid)
+        if job is None:
+            time.sleep(poll_seconds)
+            continue
+        logger.info(f"Worker {pid} running job {job['id']} ({job['kind']})")
+        run_job(job)
+
+def cleanup_jobs(max_age_hours: float = JOB_MAX_AGE_HOURS) -> int:
+    """Delete finished jobs older than max_age_hours and workers long gone."""
+    cutoff = time.time() - max_age_hours * 3600
+    with job_db() as conn:
+        deleted = conn.execute("DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?", (JOB_COMPLETED, JOB_FAILED, cutoff)).rowcount
+        conn.execute("DELETE FROM workers WHERE heartbeat < ?", (cutoff,))
+    return deleted
+
+def job_result_ui(job_id: Optional[str], progress: Callable[[], None] = None) -> Optional[Any]:
+    """Streamlit view of a job: its result once completed, else a self-refreshing status.
+
+    Only the status fragment (and the optional progress view rendered inside it) reruns
+    while the job is pending; when the job finishes the whole app reruns once so the
+    caller can render the result.
+    """
+    import streamlit as st
+
+    job = get_job(job_id) if job_id else None
+    if job is None:
+        return None
+    if job["status"] == JOB_COMPLETED:
+        return job["result"]
+    if job["status"] == JOB_FAILED:
+        st.error(f"Job {job_id[:8]} failed: {job['error']}")
+        return None
+
+    @st.fragment(run_every=JOB_POLL_SECONDS)
+    def job_status():
+        current = get_job(job_id)
+        if current["status"] not in (JOB_QUEUED, JOB_RUNNING):
+            st.rerun()
+        waiting = time.time() - (current["started_at"] or current["created_at"])
+        st.info(f"Job {job_id[:8]} {current['status']} ({waiting:.0f}s). You can keep working; the result appears here when ready.")
+        if progress:
+            progress()
+
+    job_status()
+    return None
+
+if __name__ == "__main__":
+    # python -m utils.job_queue --workers 4
+    parser = argparse.ArgumentParser(description="Run background job workers or list jobs.")
+    parser.add_argument("--workers", type=int, default=JOB_WORKERS)
+    parser.add_argument("--list", action="store_true", help="Print recent jobs and exit")
+    args = parser.parse_args()
+    if args.list:
+        print(json.dumps(list_jobs(), indent=2))
+        sys.exit(0)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(process)d - %(message)s")
+    cleanup_jobs()
+    processes = [multiprocessing.Process(target=worker_loop, daemon=True) for _ in range(args.workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
@@ -2,32 +2,49 @@ from langgraph.graph import StateGraph, END
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.tools import Tool
 from langchain.prompts import PromptTemplate
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import FAISS
-#from langchain.embeddings import SentenceTransformerEmbeddings
-from langchain_community.embeddings import SentenceTransformerEmbeddings
-from langchain_community.document_loaders import PyPDFLoader
 import os
+import json
+import time
+import logging
+from collections import Counter
 from bs4 import BeautifulSoup
-from typing import TypedDict, Dict, Any, List
+from typing import TypedDict, Dict, Any, List, Annotated
 from dotenv import load_dotenv
 import xml.etree.ElementTree as ET
 from graphviz import Source
+from utils.retrieval_service import AGENT_RETRIEVAL_FILTERS, NO_CONTEXT, get_retrieval_service
+from utils.context_helper import current_run, retrieval_run
+from utils.flow_index_helper import find_similar_flows
+from utils.memo_helper import MEMO_ENABLED, digest, get_node_memo, memo_key, memoized, model_id
+from utils.checkpoint_helper import get_checkpointer, new_run_id, pending_nodes, run_config, run_graph
+from utils.artifact_store import is_artifact, load_artifact, load_artifacts, store_artifact
+from utils.service_fanout import generate_services
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Initialize LLM with Gemini
 G_API_KEY = "abcd"  # Replace with your actual Google API key
 llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", api_key=G_API_KEY, temperature=0.3)
 
-# Define state structure
+# State reducers: agents on parallel branches return partial updates in the same step
+def merge_outputs(current: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+    return {**(current or {}), **(update or {})}
+
+def latest(current: Any, update: Any) -> Any:
+    return update
+
+# Define state structure. Flow inputs, agent outputs and RAG context are kept in the
+# artifact store (utils/artifact_store.py); the state holds their references (hash,
+# size, summary), so checkpoints, job results and the UI copy a few hundred bytes per
+# tab instead of the full text. Agents load the text they read with load_artifact.
 class TransformationState(TypedDict):
-    inputs: Dict[str, Any]  # User inputs per tab
-    outputs: Dict[str, str]  # Generated outputs per tab
-    current_agent: str      # Current agent being executed
-    context: str            # Retrieved documentation context
+    inputs: Dict[str, Any]  # User input references per tab
+    outputs: Annotated[Dict[str, Any], merge_outputs]  # Generated output references per tab
+    context: Annotated[Any, latest]  # Reference to the most recently retrieved documentation context
     plan: Dict[str, str]    # Plan from supervisor agent
-    task_queue: List[str]   # Queue of agents to execute
+    similar_flows: List[Dict[str, Any]]  # Previously migrated flows similar to the input
 
 # Tool for parsing files
 def parse_file(content: str, file_type: str) -> str:
@@ -44,49 +61,95 @@ def parse_file(content: str, file_type: str) -> str:
 
 tools = [Tool(name="parse_file", func=parse_file, description="Parse XML or HTML content.")]
 
-# RAG Setup
+# RAG Setup (shared per-process retrieval service, see utils/retrieval_service.py)
+WEBMETHODS_DOCS_CORPUS = "webmethods_docs"
 vector_store = None
 
-def setup_vector_store(directory: str = "webmethods_docs"):
-    """Load and chunk webMethods documentation PDFs, returning a FAISS vector store or None if empty."""
+def setup_vector_store(directory: str = WEBMETHODS_DOCS_CORPUS):
+    """Return the shared FAISS vector store for a documentation directory, or None if empty."""
     global vector_store
     if vector_store is not None:
         return vector_store
-    
-    docs = []
-    if os.path.exists(directory):
-        for filename in os.listdir(directory):
-            if filename.endswith(".pdf"):
-                loader = PyPDFLoader(os.path.join(directory, filename))
-                docs.extend(loader.load())
-    
-    if not docs:
-        return None
-    
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    chunks = text_splitter.split_documents(docs)
-    if not chunks:
-        return None
-    
-    embeddings = SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2")
-    vector_store = FAISS.from_documents(chunks, embeddings)
+    vector_store = get_retrieval_service().get_vectorstore(directory)
     return vector_store
 
-def retrieve_context(query: str) -> str:
-    vector_store = setup_vector_store()
-    if vector_store:
-        docs = vector_store.similarity_search(query, k=3)
-        return "\n".join([doc.page_content for doc in docs])
-    return "No documentation available."
+def retrieve_context(query: str, agent: str = None) -> str:
+    """Documentation context for an agent.
 
-# Supervisor Agent
-def supervisor_agent(state: TransformationState) -> TransformationState:
-    """Supervisor agent plans the transformation and assigns tasks."""
-    if state["plan"]:
-        return state  # Plan already generated
-    
-    prompt = state["inputs"]["tab1"]  # Assuming tab1 holds the initial prompt
+    The search is restricted to the agent's sections (AGENT_RETRIEVAL_FILTERS). Inside
+    a retrieval_run() scope, chunks already sent to another agent in the same run are
+    skipped and the rest are packed into the agent's token budget.
+    """
+    service = get_retrieval_service()
+    metadata_filter = AGENT_RETRIEVAL_FILTERS.get(agent)
+    run = current_run()
+    if run is None:
+        return service.retrieve_context(query, corpus=WEBMETHODS_DOCS_CORPUS, k=3, metadata_filter=metadata_filter)
+    context = run.retrieve(query, lambda q, k: service.search(q, corpus=WEBMETHODS_DOCS_CORPUS, k=k, metadata_filter=metadata_filter), metadata_filter=metadata_filter)
+    return context or NO_CONTEXT
+
+def similar_flow_reference(state: TransformationState, tab: str) -> str:
+    """Accepted output for a tab from the most similar previously migrated flow, if any."""
+    for match in state.get("similar_flows") or []:
+        if match["outputs"].get(tab):
+            return (
+                f"An accepted result for a similar, previously migrated flow (similarity {match['score']:.2f}) follows. "
+                f"Adapt it to the inputs below instead of starting from scratch:\n{load_artifact(match['outputs'][tab])}\n"
+            )
+    return ""
+
+def store_similar_flows(matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Similar-flow matches with their accepted outputs replaced by artifact references."""
+    return [{**match, "outputs": {tab: store_artifact(output) for tab, output in match["outputs"].items()}} for match in matches]
+
+# Upstream outputs each agent reads; only these (with the agent's own inputs, template
+# and model) decide whether a memoized output can be reused
+AGENT_UPSTREAM = {
+    "analyzer": [],
+    "designer": ["tab1"],
+    "generator": ["tab2"],
+    "boomi_integrator": ["tab3"],
+    "tester": ["tab3"],
+    "migrator": ["tab3"],
+    "howto_writer": ["tab1", "tab2", "tab3", "tab4", "tab5", "tab6"]
+}
+# Bump an agent's version when its prompt template changes
+TEMPLATE_VERSIONS = {agent: "1" for agent in AGENT_UPSTREAM}
+
+def invoke_memoized(agent: str, prompt: str, state: TransformationState, inputs: Any) -> str:
+    """LLM response for an agent, reused while its inputs and upstream outputs are unchanged.
+
+    The retrieved context is left out of the key: it is looked up from the agent's
+    fixed query and varies only with what other agents of the run already received.
+    """
+    upstream = {tab: load_artifact(state["outputs"][tab]) for tab in AGENT_UPSTREAM[agent] if tab in state["outputs"]}
+    return memoized(agent, TEMPLATE_VERSIONS[agent], model_id(llm), inputs, upstream, lambda: llm.invoke(prompt).content)
+
+# Supervisor planning; bump when the planning prompt changes
+PLAN_TEMPLATE_VERSION = "1"
+
+def parse_plan(response: str) -> Dict[str, str]:
+    """Plan JSON from the supervisor's response, tolerating text around the object."""
+    try:
+        return json.loads(response)
+    except Exception as e:
+        logger.error(f"Failed to parse JSON: {e}. Raw response: {response}")
+        start, end = response.find("{"), response.rfind("}") + 1
+        if start != -1 and end > start:
+            try:
+                return json.loads(response[start:end])
+            except Exception:
+                pass
+        return {}
+
+def generate_plan(prompt: str) -> Dict[str, str]:
+    """Supervisor plan for a user prompt, cached across runs by prompt and RAG context hash."""
     context = retrieve_context("webMethods transformation to microservices")
+    key = memo_key("supervisor", PLAN_TEMPLATE_VERSION, model_id(llm), {"prompt": prompt, "context": digest(context)}, {})
+    cached = get_node_memo().get(key) if MEMO_ENABLED else None
+    if cached is not None:
+        return json.loads(cached)
+
     plan_prompt = PromptTemplate.from_template(
         "Using the following webMethods documentation context:\n{context}\n"
         "Given the user prompt: '{prompt}', generate a plan to transform webMethods integration services into cloud-native microservices using Spring Boot. "
@@ -103,153 +166,166 @@ def supervisor_agent(state: TransformationState) -> TransformationState:
         "}}"
     ).format(prompt=prompt, context=context)
     response = llm.invoke(plan_prompt).content
-    
-    try:
-        import json
-        plan = json.loads(response)
-    except:
-        plan = {}
-    
-    state["plan"] = plan
-    state["task_queue"] = ["analyzer", "designer", "generator", "boomi_integrator", "tester", "migrator", "howto_writer"]
-    state["current_agent"] = "analyzer"
-    return state
+    logger.debug(f"LLM response for plan: {response}")
+    plan = parse_plan(response)
+    # Unparseable plans are not cached, so the next run asks again
+    if plan and MEMO_ENABLED:
+        get_node_memo().put(key, "supervisor", json.dumps(plan))
+    return plan
+
+# Supervisor Agent
+def supervisor_agent(state: TransformationState) -> Dict[str, Any]:
+    """Supervisor agent plans the transformation; the graph edges assign the tasks.
+
+    A plan already in the state (e.g. shown to the user before the run) is kept, so
+    each run makes at most one planning call.
+    """
+    if state["plan"]:
+        return {"plan": state["plan"]}  # Plan already generated; a node must write some key
+    return {"plan": generate_plan(load_artifact(state["inputs"]["tab1"]))}  # Assuming tab1 holds the initial prompt
 
 # Specialized Agents
-def analyzer_agent(state: TransformationState) -> TransformationState:
-    if state["current_agent"] != "analyzer":
-        return state
-    context = retrieve_context("webMethods integration services analysis")
+def analyzer_agent(state: TransformationState) -> Dict[str, Any]:
+    context = retrieve_context("webMethods integration services analysis", agent="analyzer")
+    inputs = load_artifact(state["inputs"]["tab1"])
+    similar_flows = store_similar_flows(find_similar_flows(inputs))
+    reference = similar_flow_reference({"similar_flows": similar_flows}, "tab1")
     prompt = PromptTemplate.from_template(
         "Using the following webMethods documentation context:\n{context}\n"
+        "{reference}"
         "Analyze webMethods flow files: {inputs}. Suggest a microservices architecture with:\n"
         "- Summary\n- Suggested Microservices (Name, Responsibilities, Endpoints, Data Entities)\n- Dependencies\n- Insights\n- Diagram (Mermaid)\n"
         "Output as `### microservices_suggestion.md`."
-    ).format(inputs=state["inputs"]["tab1"], context=context)
-    response = llm.invoke(prompt).content
-    state["outputs"]["tab1"] = response
-    state["context"] = context
-    state["task_queue"].pop(0)
-    state["current_agent"] = state["task_queue"][0] if state["task_queue"] else "end"
-    return state
-
-def designer_agent(state: TransformationState) -> TransformationState:
-    if state["current_agent"] != "designer":
-        return state
-    context = retrieve_context("Spring Boot microservices design")
+    ).format(reference=reference, inputs=inputs, context=context)
+    response = invoke_memoized("analyzer", prompt, state, [inputs, reference])
+    return {"outputs": {"tab1": store_artifact(response)}, "context": store_artifact(context), "similar_flows": similar_flows}
+
+def designer_agent(state: TransformationState) -> Dict[str, Any]:
+    context = retrieve_context("Spring Boot microservices design", agent="designer")
+    reference = similar_flow_reference(state, "tab2")
+    inputs = load_artifact(state["inputs"]["tab2"])
     prompt = PromptTemplate.from_template(
         "Using the following webMethods documentation context:\n{context}\n"
+        "{reference}"
         "Design a microservices architecture for Spring Boot and Boomi APIM based on: {inputs}. Include:\n"
         "- Overview\n- Microservices Breakdown\n- Communication Patterns\n- Deployment Considerations\n- Boomi APIM Integration\n- Diagram (Mermaid)\n"
         "Output as `### architecture.md`.\n"
         "Use Tab 1 output: {tab1_output}"
-    ).format(inputs=state["inputs"]["tab2"], context=context, tab1_output=state["outputs"]["tab1"])
-    response = llm.invoke(prompt).content
-    state["outputs"]["tab2"] = response
-    state["context"] = context
-    state["task_queue"].pop(0)
-    state["current_agent"] = state["task_queue"][0] if state["task_queue"] else "end"
-    return state
-
-def generator_agent(state: TransformationState) -> TransformationState:
-    if state["current_agent"] != "generator":
-        return state
-    context = retrieve_context("Spring Boot code generation")
-    prompt = PromptTemplate.from_template(
-        "Using the following webMethods documentation context:\n{context}\n"
-        "Generate a Spring Boot microservice project based on: {inputs}. Include:\n"
-        "- `pom.xml`: Maven config with Spring Boot dependencies.\n"
-        "- `src/main/java/com/example/default/controller/DefaultController.java`: REST controller with 2 endpoints (GET, POST).\n"
-        "- `src/main/java/com/example/default/service/DefaultService.java`: Service layer.\n"
-        "- `src/main/java/com/example/default/entity/DefaultEntity.java`: Entity class with JPA.\n"
-        "- `src/main/resources/application.yml`: Config file.\n"
-        "Output each file prefixed with its path (e.g., `### pom.xml`).\n"
-        "Use Tab 2 output: {tab2_output}"
-    ).format(inputs=state["inputs"]["tab3"], context=context, tab2_output=state["outputs"]["tab2"])
-    response = llm.invoke(prompt).content
-    state["outputs"]["tab3"] = response
-    state["context"] = context
-    state["task_queue"].pop(0)
-    state["current_agent"] = state["task_queue"][0] if state["task_queue"] else "end"
-    return state
-
-def boomi_integrator_agent(state: TransformationState) -> TransformationState:
-    if state["current_agent"] != "boomi_integrator":
-        return state
-    context = retrieve_context("Boomi APIM integration")
+    ).format(reference=reference, inputs=inputs, context=context, tab1_output=load_artifact(state["outputs"]["tab1"]))
+    response = invoke_memoized("designer", prompt, state, [inputs, reference])
+    return {"outputs": {"tab2": store_artifact(response)}, "context": store_artifact(context)}
+
+def generator_agent(state: TransformationState) -> Dict[str, Any]:
+    """Generate one project per service of the design, concurrently, as one multi-module output.
+
+    Falls back to a single project when the architecture names no services.
+    """
+    context = retrieve_context("Spring Boot code generation", agent="generator")
+    reference = similar_flow_reference(state, "tab3")
+    inputs = load_artifact(state["inputs"]["tab3"])
+    architecture = load_artifact(state["outputs"]["tab2"])
+
+    def generate_service(service: Dict[str, str]) -> str:
+        prompt = PromptTemplate.from_template(
+            "Using the following webMethods documentation context:\n{context}\n"
+            "{reference}"
+            "Generate the Spring Boot project of the {name} microservice based on: {inputs}. It is one module of a multi-module build; "
+            "the other services of the architecture are generated separately. Include:\n"
+            "- `pom.xml`: Maven config with Spring Boot dependencies and artifactId `{module}`.\n"
+            "- `src/main/java/com/example/{package}/controller/{class_name}Controller.java`: REST controller with 2 endpoints (GET, POST).\n"
+            "- `src/main/java/com/example/{package}/service/{class_name}Service.java`: Service layer.\n"
+            "- `src/main/java/com/example/{package}/entity/{class_name}Entity.java`: Entity class with JPA.\n"
+            "- `src/main/resources/application.yml`: Config file.\n"
+            "Output each file prefixed with its path relative to the module (e.g., `### pom.xml`).\n"
+            "Use Tab 2 output: {tab2_output}"
+        ).format(reference=reference, inputs=inputs, context=context, tab2_output=architecture, **service)
+        return invoke_memoized("generator", prompt, state, [inputs, reference, service["name"]])
+
+    response = generate_services(architecture, generate_service)
+    if response is None:
+        prompt = PromptTemplate.from_template(
+            "Using the following webMethods documentation context:\n{context}\n"
+            "{reference}"
+            "Generate a Spring Boot microservice project based on: {inputs}. Include:\n"
+            "- `pom.xml`: Maven config with Spring Boot dependencies.\n"
+            "- `src/main/java/com/example/default/controller/DefaultController.java`: REST controller with 2 endpoints (GET, POST).\n"
+            "- `src/main/java/com/example/default/service/DefaultService.java`: Service layer.\n"
+            "- `src/main/java/com/example/default/entity/DefaultEntity.java`: Entity class with JPA.\n"
+            "- `src/main/resources/application.yml`: Config file.\n"
+            "Output each file prefixed with its path (e.g., `### pom.xml`).\n"
+            "Use Tab 2 output: {tab2_output}"
+        ).format(reference=reference, inputs=inputs, context=context, tab2_output=architecture)
+        response = invoke_memoized("generator", prompt, state, [inputs, reference])
+    return {"outputs": {"tab3": store_artifact(response)}, "context": store_artifact(context)}
+
+def boomi_integrator_agent(state: TransformationState) -> Dict[str, Any]:
+    context = retrieve_context("Boomi APIM integration", agent="boomi_integrator")
+    reference = similar_flow_reference(state, "tab4")
+    inputs = load_artifact(state["inputs"]["tab4"])
     prompt = PromptTemplate.from_template(
         "Using the following webMethods documentation context:\n{context}\n"
+        "{reference}"
         "Generate an OpenAPI 3.0 YAML file and Boomi APIM instructions based on: {inputs}. Include:\n"
         "- `openapi.yaml`: OpenAPI spec with 2 endpoints (GET, POST), schemas, and Boomi policies.\n"
         "- `README.md`: Instructions for importing into Boomi APIM.\n"
         "Output each file prefixed with its path (e.g., `### openapi.yaml`).\n"
         "Use Tab 3 output: {tab3_output}"
-    ).format(inputs=state["inputs"]["tab4"], context=context, tab3_output=state["outputs"]["tab3"])
-    response = llm.invoke(prompt).content
-    state["outputs"]["tab4"] = response
-    state["context"] = context
-    state["task_queue"].pop(0)
-    state["current_agent"] = state["task_queue"][0] if state["task_queue"] else "end"
-    return state
-
-def tester_agent(state: TransformationState) -> TransformationState:
-    if state["current_agent"] != "tester":
-        return state
-    context = retrieve_context("JUnit testing for Spring Boot")
+    ).format(reference=reference, inputs=inputs, context=context, tab3_output=load_artifact(state["outputs"]["tab3"]))
+    response = invoke_memoized("boomi_integrator", prompt, state, [inputs, reference])
+    return {"outputs": {"tab4": store_artifact(response)}, "context": store_artifact(context)}
+
+def tester_agent(state: TransformationState) -> Dict[str, Any]:
+    context = retrieve_context("JUnit testing for Spring Boot", agent="tester")
+    reference = similar_flow_reference(state, "tab5")
+    inputs = load_artifact(state["inputs"]["tab5"])
     prompt = PromptTemplate.from_template(
         "Using the following webMethods documentation context:\n{context}\n"
+        "{reference}"
         "Generate JUnit 5 test cases for a Spring Boot microservice based on: {inputs}. Include:\n"
         "- `pom.xml`: Maven config with test dependencies.\n"
         "- `src/test/java/com/example/default/controller/DefaultControllerTest.java`: Controller tests with @WebMvcTest.\n"
         "- `src/test/java/com/example/default/service/DefaultServiceTest.java`: Service tests with @SpringBootTest.\n"
         "Output each file prefixed with its path (e.g., `### pom.xml`).\n"
         "Use Tab 3 output: {tab3_output}"
-    ).format(inputs=state["inputs"]["tab5"], context=context, tab3_output=state["outputs"]["tab3"])
-    response = llm.invoke(prompt).content
-    state["outputs"]["tab5"] = response
-    state["context"] = context
-    state["task_queue"].pop(0)
-    state["current_agent"] = state["task_queue"][0] if state["task_queue"] else "end"
-    return state
-
-def migrator_agent(state: TransformationState) -> TransformationState:
-    if state["current_agent"] != "migrator":
-        return state
-    context = retrieve_context("webMethods to Spring Boot migration")
+    ).format(reference=reference, inputs=inputs, context=context, tab3_output=load_artifact(state["outputs"]["tab3"]))
+    response = invoke_memoized("tester", prompt, state, [inputs, reference])
+    return {"outputs": {"tab5": store_artifact(response)}, "context": store_artifact(context)}
+
+def migrator_agent(state: TransformationState) -> Dict[str, Any]:
+    context = retrieve_context("webMethods to Spring Boot migration", agent="migrator")
+    reference = similar_flow_reference(state, "tab6")
+    inputs = load_artifact(state["inputs"]["tab6"])
     prompt = PromptTemplate.from_template(
         "Using the following webMethods documentation context:\n{context}\n"
+        "{reference}"
         "Generate a migration plan and code to transform webMethods data and logic into a Spring Boot microservice based on: {inputs}. Include:\n"
         "- `migration.md`: Detailed step-by-step migration instructions.\n"
         "- `src/main/java/com/example/default/migration/DefaultMigration.java`: Java class with migration code.\n"
         "Output each file prefixed with its path (e.g., `### migration.md`).\n"
         "Use Tab 3 output: {tab3_output}"
-    ).format(inputs=state["inputs"]["tab6"], context=context, tab3_output=state["outputs"]["tab3"])
-    response = llm.invoke(prompt).content
-    state["outputs"]["tab6"] = response
-    state["context"] = context
-    state["task_queue"].pop(0)
-    state["current_agent"] = state["task_queue"][0] if state["task_queue"] else "end"
-    return state
-
-def howto_writer_agent(state: TransformationState) -> TransformationState:
-    if state["current_agent"] != "howto_writer":
-        return state
-    context = retrieve_context("webMethods to microservices transformation guide")
+    ).format(reference=reference, inputs=inputs, context=context, tab3_output=load_artifact(state["outputs"]["tab3"]))
+    response = invoke_memoized("migrator", prompt, state, [inputs, reference])
+    return {"outputs": {"tab6": store_artifact(response)}, "context": store_artifact(context)}
+
+def howto_writer_agent(state: TransformationState) -> Dict[str, Any]:
+    context = retrieve_context("webMethods to microservices transformation guide", agent="howto_writer")
+    reference = similar_flow_reference(state, "tab7")
+    inputs = load_artifact(state["inputs"]["tab7"])
     prompt = PromptTemplate.from_template(
         "Using the following webMethods documentation context:\n{context}\n"
+        "{reference}"
         "Generate a HowTo guide for transforming webMethods to microservices based on: {inputs}. Include:\n"
         "- Introduction: Overview of the process.\n"
         "- Step-by-Step Instructions: Detailed steps for analysis, design, code generation, API integration, testing, and migration.\n"
         "- Best Practices: Tips for success.\n"
         "Output as `### howto.md`.\n"
         "Consolidate outputs from Tabs 1-6: {all_outputs}"
-    ).format(inputs=state["inputs"]["tab7"], context=context, all_outputs="\n".join([f"{tab}: {state['outputs'][tab]}" for tab in state["outputs"]]))
-    response = llm.invoke(prompt).content
-    state["outputs"]["tab7"] = response
-    state["context"] = context
-    state["task_queue"].pop(0)
-    state["current_agent"] = "end"
-    return state
+    ).format(reference=reference, inputs=inputs, context=context, all_outputs="\n".join([f"{tab}: {load_artifact(state['outputs'][tab])}" for tab in sorted(state["outputs"])]))
+    response = invoke_memoized("howto_writer", prompt, state, [inputs, reference])
+    return {"outputs": {"tab7": store_artifact(response)}, "context": store_artifact(context)}
+
+# Agents that depend only on the generator's output
+PARALLEL_AGENTS = ["boomi_integrator", "tester", "migrator"]
 
 # Define graph
 workflow = StateGraph(TransformationState)
@@ -264,21 +340,23 @@ workflow.add_node("tester", tester_agent)
 workflow.add_node("migrator", migrator_agent)
 workflow.add_node("howto_writer", howto_writer_agent)
 
-# Define edges
+# Define edges as a dependency DAG: the Boomi integrator, tester and migrator only
+# read the generator's output (tab3), so they run concurrently in one step and the
+# HowTo writer waits for all three
 workflow.add_edge("supervisor", "analyzer")
 workflow.add_edge("analyzer", "designer")
 workflow.add_edge("designer", "generator")
-workflow.add_edge("generator", "boomi_integrator")
-workflow.add_edge("boomi_integrator", "tester")
-workflow.add_edge("tester", "migrator")
-workflow.add_edge("migrator", "howto_writer")
+for agent in PARALLEL_AGENTS:
+    workflow.add_edge("generator", agent)
+workflow.add_edge(PARALLEL_AGENTS, "howto_writer")
 workflow.add_edge("howto_writer", END)
 
 # Set entry point
 workflow.set_entry_point("supervisor")
 
-# Compile graph
-graph = workflow.compile()
+# Compile graph; every run is checkpointed in SQLite under its run id (thread_id)
+GRAPH_NAME = "ma_agentic"
+graph = workflow.compile(checkpointer=get_checkpointer())
 
 # Generate graph image
 def generate_graph_image(current_agent: str) -> str:
@@ -299,23 +377,85 @@ def generate_graph_image(current_agent: str) -> str:
         fillcolor = "green" if node == current_agent else "lightblue"
         dot += f'{node} [label="{tab_map[node]}", shape=box, style=filled, fillcolor={fillcolor}];\n'
     
-    for i in range(len(nodes) - 1):
-        dot += f"{nodes[i]} -> {nodes[i+1]};\n"
+    for edge in graph.get_graph().edges:
+        if edge.source in tab_map and edge.target in tab_map:
+            dot += f"{edge.source} -> {edge.target};\n"
     dot += "}"
 
     graph_file = Source(dot, filename="workflow", format="png")
     graph_file.render(cleanup=True)
     return "workflow.png"
 
-def run_agentic_workflow(inputs: Dict[str, Any], current_tab: str) -> Dict[str, str]:
+def stream_agentic_workflow(inputs: Dict[str, Any], run_id: str, plan: Dict[str, str] = None):
+    """Yield {node: update} as each agent of a new checkpointed run finishes.
+
+    With a plan the supervisor does not plan again. Inputs may be texts or artifact
+    references; texts are stored first.
+    """
     initial_state = {
-        "inputs": inputs,
+        "inputs": {tab: value if is_artifact(value) else store_artifact(value) for tab, value in inputs.items()},
         "outputs": {},
-        "current_agent": "supervisor",
-        "context": "",
-        "plan": {},
-        "task_queue": []
+        "context": store_artifact(""),
+        "plan": plan or {},
+        "similar_flows": []
+    }
+    return run_graph(graph, GRAPH_NAME, initial_state, run_id)
+
+def resume_agentic_workflow(run_id: str):
+    """Yield the remaining updates of an interrupted run, continuing after its last completed node."""
+    return run_graph(graph, GRAPH_NAME, None, run_id)
+
+def run_state(run_id: str) -> Dict[str, Any]:
+    """Latest checkpointed state of a run (empty if it never started)."""
+    return graph.get_state(run_config(run_id)).values
+
+def run_outputs(run_id: str) -> Dict[str, str]:
+    """Output texts per tab of a run, loaded from the artifact store."""
+    return load_artifacts(run_state(run_id).get("outputs", {}))
+
+def run_agentic_workflow(inputs: Dict[str, Any], current_tab: str, run_id: str = None) -> Dict[str, str]:
+    run_id = run_id or new_run_id()
+    for _ in stream_agentic_workflow(inputs, run_id):
+        pass
+    return run_outputs(run_id)
+
+def run_workflow_job(run_id: str, inputs: Dict[str, Any] = None, plan: Dict[str, str] = None) -> Dict[str, Any]:
+    """Background job (utils/job_queue.py): run a workflow, or resume it if inputs is None.
+
+    A run with pending checkpointed nodes is always resumed, so a job picked up again
+    after its worker stopped does not start over; a run that already finished returns
+    its checkpointed outputs without executing any agent. The result holds output
+    references; load their text with utils.artifact_store.load_artifact.
+    """
+    agent_calls = Counter()
+    memo_hits = get_node_memo().stats["hits"]
+    start = time.perf_counter()
+    pending = pending_nodes(graph, run_id)
+    state = run_state(run_id)
+    if state and not pending:
+        logger.info(f"Run {run_id} already finished; returning its checkpointed outputs")
+        return {
+            "outputs": state.get("outputs", {}),
+            "agent_calls": {},
+            "seconds": round(time.perf_counter() - start, 3),
+            "memo_hits": 0,
+            "rag_stats": {}
+        }
+    with retrieval_run() as run:
+        if inputs is None or pending:
+            updates = resume_agentic_workflow(run_id)
+        else:
+            updates = stream_agentic_workflow(inputs, run_id, plan)
+        for update in updates:
+            # Resumed runs flag nodes replayed from the checkpoint under "__metadata__"
+            agent_calls.update(node for node in update if node != "__metadata__")
+    repeated = {node: count for node, count in agent_calls.items() if count != 1}
+    if repeated:
+        logger.warning(f"Agents executed more than once in run {run_id}: {repeated}")
+    return {
+        "outputs": run_state(run_id).get("outputs", {}),
+        "agent_calls": dict(agent_calls),
+        "seconds": round(time.perf_counter() - start, 3),
+        "memo_hits": get_node_memo().stats["hits"] - memo_hits,
+        "rag_stats": run.stats
     }
-    result = graph.invoke(initial_state)
-    #generate_graph_image(result["current_agent"])
-    return result["outputs"]
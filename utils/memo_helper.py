@@ -0,0 +1,106 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import argparse
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Agent outputs memoized under a hash of everything that shapes the prompt: the node,
+# its template version, the model, the node's own inputs and the upstream outputs it
+# reads. A changed upstream output changes the key of every node reading it, and only
+# those nodes; the rest are served from the memo without an LLM call.
+MEMO_DB_PATH = os.getenv("MEMO_DB_PATH", os.path.join("outputs", "node_memo.sqlite"))
+MEMO_ENABLED = os.getenv("MEMO_ENABLED", "true").lower() == "true"
+
+def digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def model_id(llm) -> str:
+    """Model name and temperature of a LangChain chat model, as part of the memo key."""
+    name = getattr(llm, "model", None) or getattr(llm, "model_name", None) or getattr(llm, "deployment_name", None) or type(llm).__name__
+    return f"{name}@{getattr(llm, 'temperature', '')}"
+
+def memo_key(node: str, template_version: str, model: str, inputs: Any, upstream: Dict[str, str]) -> str:
+    payload = {
+        "node": node,
+        "template_version": template_version,
+        "model": model,
+        "inputs": inputs,
+        "upstream": {tab: digest(output) for tab, output in upstream.items()}
+    }
+    return digest(json.dumps(payload, sort_keys=True, default=str))
+
+class NodeMemo:
+    """SQLite table of node outputs by memo key, shared by threads of one process."""
+
+    def __init__(self, path: str = MEMO_DB_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Job workers and the UI share the file: WAL lets readers run during a write
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS memo (key TEXT PRIMARY KEY, node TEXT, output TEXT, created_at REAL)")
+        self.conn.commit()
+        self.stats = Counter()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self.conn.execute("SELECT output FROM memo WHERE key = ?", (key,)).fetchone()
+            self.stats["hits" if row else "misses"] += 1
+        return row[0] if row else None
+
+    def put(self, key: str, node: str, output: str) -> None:
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO memo (key, node, output, created_at) VALUES (?, ?, ?, ?)", (key, node, output, time.time()))
+            self.conn.commit()
+
+    def clear(self, node: str = None) -> int:
+        """Drop memoized outputs, of one node or of all; returns the number removed."""
+        with self._lock:
+            cur = self.conn.execute("DELETE FROM memo WHERE node = ?", (node,)) if node else self.conn.execute("DELETE FROM memo")
+            self.conn.commit()
+            return cur.rowcount
+
+_node_memo = None
+_node_memo_lock = threading.Lock()
+
+def get_node_memo() -> NodeMemo:
+    global _node_memo
+    if _node_memo is None:
+        with _node_memo_lock:
+            if _node_memo is None:
+                _node_memo = NodeMemo(MEMO_DB_PATH)
+    return _node_memo
+
+def memoized(node: str, template_version: str, model: str, inputs: Any, upstream: Dict[str, str], generate: Callable[[], str]) -> str:
+    """Output of generate() for these inputs, computed once and then read from the memo."""
+    if not MEMO_ENABLED:
+        return generate()
+    key = memo_key(node, template_version, model, inputs, upstream)
+    memo = get_node_memo()
+    output = memo.get(key)
+    if output is not None:
+        logger.info(f"Reused memoized output of {node} ({key[:12]})")
+        return output
+    output = generate()
+    memo.put(key, node, output)
+    return output
+
+if __name__ == "__main__":
+    # python -m utils.memo_helper --clear generator
+    parser = argparse.ArgumentParser(description="Inspect or clear memoized agent outputs.")
+    parser.add_argument("--clear", nargs="?", const="", help="Node to clear; all nodes if no name is given")
+    args = parser.parse_args()
+    memo = get_node_memo()
+    if args.clear is not None:
+        print(f"Removed {memo.clear(args.clear or None)} outputs")
+    rows = memo.conn.execute("SELECT node, COUNT(*) FROM memo GROUP BY node").fetchall()
+    print(json.dumps(dict(rows), indent=2))
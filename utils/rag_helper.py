@@ -1,48 +1,35 @@
-import os
-from langchain.document_loaders import PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.embeddings import SentenceTransformerEmbeddings
-from langchain.vectorstores import FAISS
-from pathlib import Path
+from utils.retrieval_service import DEFAULT_CORPUS, get_retrieval_service, vectorstore_path
 
-# Initialize embeddings
-embeddings = SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2")
+# Shared per-process retrieval service (one embedding model, one index per corpus)
+service = get_retrieval_service()  # Loads the embedding model only once a corpus is used
 
 # Persistent vector store path
-VECTORSTORE_PATH = "vectorstore/faiss_index"
+VECTORSTORE_PATH = vectorstore_path(DEFAULT_CORPUS)
 
 def initialize_vectorstore():
-    """Initialize or load the FAISS vector store from webMethods PDFs."""
-    if os.path.exists(VECTORSTORE_PATH):
-        # Load existing vector store
-        vectorstore = FAISS.load_local(VECTORSTORE_PATH, embeddings)
-    else:
-        # Load and process PDFs
-        docs = []
-        pdf_dir = "docs/"
-        os.makedirs(pdf_dir, exist_ok=True)
-        
-        for pdf_file in Path(pdf_dir).glob("*.pdf"):
-            loader = PyPDFLoader(str(pdf_file))
-            docs.extend(loader.load())
-        
-        if not docs:
-            raise ValueError("No PDF documents found in 'docs/' directory.")
-        
-        # Split documents into chunks
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        splits = text_splitter.split_documents(docs)
-        
-        # Create and save vector store
-        vectorstore = FAISS.from_documents(splits, embeddings)
-        vectorstore.save_local(VECTORSTORE_PATH)
-    
+    """Initialize or load the FAISS vector store from webMethods PDFs.
+
+    Returns None in retrieval daemon client mode, where the daemon owns the index.
+    """
+    if service.remote:
+        return None
+    vectorstore = service.get_vectorstore(DEFAULT_CORPUS)
+    if vectorstore is None:
+        raise ValueError("No PDF documents found in 'docs/' directory.")
     return vectorstore
 
-def retrieve_context(query, vectorstore, k=3):
-    """Retrieve relevant context from the vector store."""
-    docs = vectorstore.similarity_search(query, k=k)
-    return "\n".join([doc.page_content for doc in docs])
+def retrieve_context(query, vectorstore, k=3, metadata_filter=None, diversify=None):
+    """Retrieve relevant context from the vector store.
+
+    `vectorstore` is kept for existing callers; retrieval goes through the shared
+    service, which owns the same store plus its BM25 index and reranker.
+    `metadata_filter` restricts the search by chunk metadata, e.g.
+    {"section_path": ["MTOM"]} or {"page": {"min": 100, "max": 150}}; a filter that
+    matches no chunk returns no context rather than searching every chunk.
+    `diversify=True` picks the k chunks by maximal marginal relevance so they do not
+    repeat each other (default: RETRIEVAL_MMR).
+    """
+    return service.retrieve_context(query, corpus=DEFAULT_CORPUS, k=k, metadata_filter=metadata_filter, diversify=diversify)
 
 # Initialize vector store on module load
 vectorstore = initialize_vectorstore()
\ No newline at end of file
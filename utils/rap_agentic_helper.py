@@ -2,16 +2,13 @@ from langgraph.graph import StateGraph, END
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.tools import Tool
 from langchain.prompts import PromptTemplate
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import FAISS
-from langchain.embeddings import SentenceTransformerEmbeddings
-from langchain_community.document_loaders import PyPDFLoader
 import os
 from bs4 import BeautifulSoup
 from typing import TypedDict, Annotated, Dict, Any
 from dotenv import load_dotenv
 import xml.etree.ElementTree as ET
 from graphviz import Source
+from utils.retrieval_service import AGENT_RETRIEVAL_FILTERS, get_retrieval_service
 
 load_dotenv()
 
@@ -23,25 +20,12 @@ llm = ChatGoogleGenerativeAI(
     temperature=0.3
 )
 
-# Load and prepare RAG with webMethods documentation
-def load_webmethods_docs(directory: str = "webmethods_docs"):
-    """Load and chunk webMethods documentation PDFs."""
-    docs = []
-    if os.path.exists(directory):
-        for filename in os.listdir(directory):
-            if filename.endswith(".pdf"):
-                loader = PyPDFLoader(os.path.join(directory, filename))
-                docs.extend(loader.load())
-    
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    chunks = text_splitter.split_documents(docs)
-    
-    embeddings = SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2")  # Free embeddings
-    vector_store = FAISS.from_documents(chunks, embeddings)
-    return vector_store
+# RAG over webMethods documentation via the shared per-process retrieval service
+WEBMETHODS_DOCS_CORPUS = "webmethods_docs"
 
-# Initialize vector store (run once or on demand)
-vector_store = load_webmethods_docs()
+def load_webmethods_docs(directory: str = WEBMETHODS_DOCS_CORPUS):
+    """Return the shared (persisted, built once) vector store for the documentation PDFs."""
+    return get_retrieval_service().get_vectorstore(directory)
 
 # Define state structure
 class TransformationState(TypedDict):
@@ -68,17 +52,15 @@ tools = [
 ]
 
 # Retrieve context from documentation
-def retrieve_context(query: str) -> str:
-    if vector_store:
-        docs = vector_store.similarity_search(query, k=3)
-        return "\n".join([doc.page_content for doc in docs])
-    return "No documentation available."
+def retrieve_context(query: str, agent: str = None) -> str:
+    metadata_filter = AGENT_RETRIEVAL_FILTERS.get(agent)
+    return get_retrieval_service().retrieve_context(query, corpus=WEBMETHODS_DOCS_CORPUS, k=3, metadata_filter=metadata_filter)
 
 # Node functions with RAG
 def analyze_node(state: TransformationState) -> TransformationState:
     if state["current_tab"] != "tab1":
         return state
-    context = retrieve_context("webMethods integration services analysis")
+    context = retrieve_context("webMethods integration services analysis", agent="analyzer")
     prompt = PromptTemplate.from_template(
         "Using the following webMethods documentation context:\n{context}\n"
         "Analyze webMethods flow files: {inputs}. Suggest a microservices architecture with:\n"
@@ -93,7 +75,7 @@ def analyze_node(state: TransformationState) -> TransformationState:
 def design_node(state: TransformationState) -> TransformationState:
     if state["current_tab"] != "tab2":
         return state
-    context = retrieve_context("Spring Boot microservices design")
+    context = retrieve_context("Spring Boot microservices design", agent="designer")
     prompt = PromptTemplate.from_template(
         "Using the following webMethods documentation context:\n{context}\n"
         "Design a microservices architecture for Spring Boot and Boomi APIM based on: {inputs}. Include:\n"
@@ -109,7 +91,7 @@ def design_node(state: TransformationState) -> TransformationState:
 def generate_node(state: TransformationState) -> TransformationState:
     if state["current_tab"] != "tab3":
         return state
-    context = retrieve_context("Spring Boot code generation")
+    context = retrieve_context("Spring Boot code generation", agent="generator")
     prompt = PromptTemplate.from_template(
         "Using the following webMethods documentation context:\n{context}\n"
         "Generate a Spring Boot microservice project based on: {inputs}. Include:\n"
@@ -134,7 +116,7 @@ def generate_node(state: TransformationState) -> TransformationState:
 def boomi_node(state: TransformationState) -> TransformationState:
     if state["current_tab"] != "tab4":
         return state
-    context = retrieve_context("Boomi APIM integration")
+    context = retrieve_context("Boomi APIM integration", agent="boomi_integrator")
     prompt = PromptTemplate.from_template(
         "Using the following webMethods documentation context:\n{context}\n"
         "Generate an OpenAPI 3.0 YAML file and Boomi APIM instructions based on: {inputs}. Include:\n"
@@ -151,7 +133,7 @@ def boomi_node(state: TransformationState) -> TransformationState:
 def tests_node(state: TransformationState) -> TransformationState:
     if state["current_tab"] != "tab5":
         return state
-    context = retrieve_context("JUnit testing for Spring Boot")
+    context = retrieve_context("JUnit testing for Spring Boot", agent="tester")
     prompt = PromptTemplate.from_template(
         "Using the following webMethods documentation context:\n{context}\n"
         "Generate JUnit 5 test cases for a Spring Boot microservice based on: {inputs}. Include:\n"
@@ -174,7 +156,7 @@ def tests_node(state: TransformationState) -> TransformationState:
 def migrate_node(state: TransformationState) -> TransformationState:
     if state["current_tab"] != "tab6":
         return state
-    context = retrieve_context("webMethods to Spring Boot migration")
+    context = retrieve_context("webMethods to Spring Boot migration", agent="migrator")
     prompt = PromptTemplate.from_template(
         "Using the following webMethods documentation context:\n{context}\n"
         "Generate a migration plan and code to transform webMethods data and logic into a Spring Boot microservice based on: {inputs}. Include:\n"
@@ -196,7 +178,7 @@ def migrate_node(state: TransformationState) -> TransformationState:
 def howto_node(state: TransformationState) -> TransformationState:
     if state["current_tab"] != "tab7":
         return state
-    context = retrieve_context("webMethods to microservices transformation guide")
+    context = retrieve_context("webMethods to microservices transformation guide", agent="howto_writer")
     prompt = PromptTemplate.from_template(
         "Using the following webMethods documentation context:\n{context}\n"
         "Generate a HowTo guide for transforming webMethods to microservices based on: {inputs}. Include:\n"
@@ -226,28 +208,34 @@ workflow.add_node("tests", tests_node)
 workflow.add_node("migrate", migrate_node)
 workflow.add_node("howto", howto_node)
 
+# Each tab runs exactly one node: the graph enters at the tab's node and ends after it
+TAB_NODES = {"tab1": "analyze", "tab2": "design", "tab3": "generate", "tab4": "boomi", "tab5": "tests", "tab6": "migrate", "tab7": "howto"}
+
+def route_to_tab(state: TransformationState) -> str:
+    return TAB_NODES.get(state["current_tab"], END)
+
 # Define edges
-workflow.add_edge("analyze", "design")
-workflow.add_edge("design", "generate")
-workflow.add_edge("generate", "boomi")
-workflow.add_edge("boomi", "tests")
-workflow.add_edge("tests", "migrate")
-workflow.add_edge("migrate", "howto")
-workflow.add_edge("howto", END)
+for node in TAB_NODES.values():
+    workflow.add_edge(node, END)
 
 # Set entry point
-workflow.set_entry_point("analyze")
+workflow.set_conditional_entry_point(route_to_tab, {**{node: node for node in TAB_NODES.values()}, END: END})
 
 # Compile graph
 graph = workflow.compile()
 
 # Function to generate graph image (PNG only)
+GRAPH_IMAGE_DIR = "outputs"
+
 def generate_graph_image(current_tab: str) -> str:
-    dot = "digraph G {\nrankdir=LR;\n"
-    nodes = ["analyze", "design", "generate", "boomi", "tests", "migrate", "howto"]
-    tab_map = {"tab1": "analyze", "tab2": "design", "tab3": "generate", "tab4": "boomi", "tab5": "tests", "tab6": "migrate", "tab7": "howto"}
-    current_node = tab_map.get(current_tab, "analyze")
+    """Render the pipeline with the tab's node highlighted; each variant is rendered once."""
+    current_node = TAB_NODES.get(current_tab, "analyze")
+    image_path = os.path.join(GRAPH_IMAGE_DIR, f"workflow_{current_node}.png")
+    if os.path.exists(image_path):
+        return image_path
 
+    dot = "digraph G {\nrankdir=LR;\n"
+    nodes = list(TAB_NODES.values())
     for node in nodes:
         fillcolor = "green" if node == current_node else "lightblue"
         dot += f'{node} [label="{node.capitalize()} (Tab {nodes.index(node) + 1})", shape=box, style=filled, fillcolor={fillcolor}];\n'
@@ -257,14 +245,15 @@ def generate_graph_image(current_tab: str) -> str:
     dot += "}"
 
     # Generate image file
-    graph_file = Source(dot, filename="workflow", format="png")
+    os.makedirs(GRAPH_IMAGE_DIR, exist_ok=True)
+    graph_file = Source(dot, filename=f"workflow_{current_node}", directory=GRAPH_IMAGE_DIR, format="png")
     graph_file.render(cleanup=True)
-    return "workflow.png"
+    return image_path
 
 def run_agentic_workflow(inputs: Dict[str, Any], current_tab: str) -> Dict[str, str]:
     initial_state = {"inputs": inputs, "outputs": {}, "current_tab": current_tab, "context": ""}
     result = graph.invoke(initial_state)
     
-    # Generate the graph image (PNG saved to disk)
+    # Generate the graph image (PNG saved to disk, cached per highlighted node)
     generate_graph_image(current_tab)
     return result["outputs"] 
\ No newline at end of file
@@ -0,0 +1,55 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
+
+# Small CPU cross-encoder used to rescore over-fetched candidates
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "20000"))
+
+_cross_encoder = None
+_model_lock = threading.Lock()
+
+# LRU of cross-encoder scores keyed by (query, chunk id, index version)
+_score_cache: "OrderedDict[Tuple[str, str, str], float]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+def get_cross_encoder():
+    """Load the cross-encoder once per process."""
+    global _cross_encoder
+    with _model_lock:
+        if _cross_encoder is None:
+            from sentence_transformers import CrossEncoder
+            _cross_encoder = CrossEncoder(RERANK_MODEL, device="cpu")
+    return _cross_encoder
+
+def score_candidates(query: str, candidates: List[Tuple[str, str]], index_version: str) -> List[float]:
+    """Cross-encoder scores for (chunk id, text) candidates, computing only cache misses."""
+    keys = [(query, chunk_id, index_version) for chunk_id, _ in candidates]
+    with _cache_lock:
+        scores = [_score_cache.get(key) for key in keys]
+
+    missing = [i for i, score in enumerate(scores) if score is None]
+    if missing:
+        predicted = get_cross_encoder().predict(
+            [(query, candidates[i][1]) for i in missing],
+            batch_size=RERANK_BATCH_SIZE
+        )
+        with _cache_lock:
+            for i, score in zip(missing, predicted):
+                scores[i] = float(score)
+                _score_cache[keys[i]] = scores[i]
+            while len(_score_cache) > RERANK_CACHE_SIZE:
+                _score_cache.popitem(last=False)
+
+    with _cache_lock:
+        for key in keys:
+            if key in _score_cache:
+                _score_cache.move_to_end(key)
+    return scores
+
+def rerank(query: str, candidates: List[Tuple[str, str]], k: int, index_version: str) -> List[int]:
+    """Return the positions in `candidates` of the k best-scoring chunks, best first."""
+    scores = score_candidates(query, candidates, index_version)
+    return sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)[:k]
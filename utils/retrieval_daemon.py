@@ -0,0 +1,186 @@
+import json
+import time
+import queue
+import logging
+import argparse
+import threading
+import urllib.request
+import urllib.error
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from langchain_core.documents import Document
+from utils.retrieval_service import DEFAULT_CORPUS, NO_CONTEXT, RetrievalService
+
+logger = logging.getLogger(__name__)
+
+DAEMON_HOST = "127.0.0.1"
+DAEMON_PORT = 8765
+BATCH_MAX_SIZE = 32      # queries embedded together in one model call
+BATCH_MAX_WAIT_MS = 5    # how long the first query of a batch waits for company
+REQUEST_TIMEOUT = 30
+
+class MicroBatcher:
+    """Collects concurrent queries and runs them through RetrievalService.search_batch.
+
+    Queries arriving within BATCH_MAX_WAIT_MS of each other share one embedding call
+    and one FAISS search, so concurrent workers cost little more than a single one.
+    """
+
+    def __init__(self, service: RetrievalService, max_size: int = BATCH_MAX_SIZE, max_wait_ms: int = BATCH_MAX_WAIT_MS):
+        self.service = service
+        self.max_size = max_size
+        self.max_wait = max_wait_ms / 1000
+        self.pending = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, query: str, corpus: str, k: int, metadata_filter: Optional[Dict[str, Any]] = None, diversify: Optional[bool] = None) -> Future:
+        future = Future()
+        self.pending.put((query, corpus, k, metadata_filter, diversify, future))
+        return future
+
+    def _next_batch(self) -> list:
+        batch = [self.pending.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            groups = {}
+            for query, corpus, k, metadata_filter, diversify, future in self._next_batch():
+                key = (corpus, k, json.dumps(metadata_filter, sort_keys=True), diversify)
+                groups.setdefault(key, []).append((query, future))
+            for (corpus, k, metadata_filter, diversify), items in groups.items():
+                try:
+                    results = self.service.search_batch(
+                        [query for query, _ in items], corpus=corpus, k=k, metadata_filter=json.loads(metadata_filter), diversify=diversify
+                    )
+                    for (_, future), docs in zip(items, results):
+                        future.set_result(docs)
+                except Exception as e:
+                    logger.exception("Batched search failed")
+                    for _, future in items:
+                        future.set_exception(e)
+
+def _serialize(docs: List[Document]) -> List[dict]:
+    return [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in docs]
+
+def make_handler(batcher: MicroBatcher):
+    class RetrievalHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, payload: dict) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, {"status": "ok"})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/search":
+                self._send_json(404, {"error": "not found"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                queries = request.get("queries") or [request["query"]]
+                corpus = request.get("corpus", DEFAULT_CORPUS)
+                k = int(request.get("k", 3))
+                metadata_filter = request.get("filter")
+                diversify = request.get("diversify")
+            except (ValueError, KeyError) as e:
+                self._send_json(400, {"error": f"Invalid request: {e}"})
+                return
+            try:
+                futures = [batcher.submit(query, corpus, k, metadata_filter, diversify) for query in queries]
+                results = [_serialize(future.result(timeout=REQUEST_TIMEOUT)) for future in futures]
+            except Exception as e:
+                self._send_json(500, {"error": str(e)})
+                return
+            self._send_json(200, {"results": results})
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return RetrievalHandler
+
+def serve(host: str = DAEMON_HOST, port: int = DAEMON_PORT, warm_corpora: List[str] = None) -> None:
+    service = RetrievalService()
+    for corpus in warm_corpora or []:
+        service.get_corpus(corpus)
+    server = ThreadingHTTPServer((host, port), make_handler(MicroBatcher(service)))
+    logger.info(f"Retrieval daemon listening on http://{host}:{port}")
+    server.serve_forever()
+
+class RetrievalClient:
+    """RetrievalService stand-in that forwards searches to the local retrieval daemon.
+
+    Used by get_retrieval_service() when RETRIEVAL_DAEMON_URL is set. If the daemon
+    is unreachable, searches fall back to an in-process RetrievalService.
+    """
+
+    remote = True
+    embeddings = None
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self._local = None
+
+    def _fallback(self) -> RetrievalService:
+        if self._local is None:
+            self._local = RetrievalService()
+        return self._local
+
+    def get_corpus(self, corpus: str = DEFAULT_CORPUS):
+        return None
+
+    def get_vectorstore(self, corpus: str = DEFAULT_CORPUS):
+        return None
+
+    def search_batch(self, queries: List[str], corpus: str = DEFAULT_CORPUS, k: int = 3, metadata_filter: Optional[Dict[str, Any]] = None, diversify: Optional[bool] = None) -> List[List[Document]]:
+        request = urllib.request.Request(
+            f"{self.url}/search",
+            data=json.dumps({"queries": queries, "corpus": corpus, "k": k, "filter": metadata_filter, "diversify": diversify}).encode("utf-8"),
+            headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+                results = json.loads(response.read())["results"]
+        except urllib.error.HTTPError:
+            # The daemon is up but rejected the request; loading a local model would not help
+            raise
+        except (urllib.error.URLError, OSError) as e:
+            logger.warning(f"Retrieval daemon at {self.url} unavailable ({e}); searching in-process")
+            return self._fallback().search_batch(queries, corpus=corpus, k=k, metadata_filter=metadata_filter, diversify=diversify)
+        return [[Document(page_content=d["page_content"], metadata=d["metadata"]) for d in docs] for docs in results]
+
+    def search(self, query: str, corpus: str = DEFAULT_CORPUS, k: int = 3, metadata_filter: Optional[Dict[str, Any]] = None, diversify: Optional[bool] = None) -> List[Document]:
+        return self.search_batch([query], corpus=corpus, k=k, metadata_filter=metadata_filter, diversify=diversify)[0]
+
+    def retrieve_context(self, query: str, corpus: str = DEFAULT_CORPUS, k: int = 3, metadata_filter: Optional[Dict[str, Any]] = None, diversify: Optional[bool] = None) -> str:
+        docs = self.search(query, corpus=corpus, k=k, metadata_filter=metadata_filter, diversify=diversify)
+        if not docs:
+            return NO_CONTEXT
+        return "\n".join([doc.page_content for doc in docs])
+
+if __name__ == "__main__":
+    # python -m utils.retrieval_daemon --port 8765 --corpus docs --corpus webmethods_docs
+    parser = argparse.ArgumentParser(description="Serve batched similarity search for all local Streamlit workers.")
+    parser.add_argument("--host", default=DAEMON_HOST)
+    parser.add_argument("--port", type=int, default=DAEMON_PORT)
+    parser.add_argument("--corpus", action="append", default=[], help="Corpus to load before serving (repeatable).")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    serve(args.host, args.port, args.corpus)
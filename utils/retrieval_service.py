@@ -0,0 +1,324 @@
+import os
+import json
+import time
+import argparse
+import threading
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import numpy as np
+from utils.index_helper import begin_version, build_vectorstore, current_index_path, dense_search_batch, docs_at, embed_queries, filter_positions, gc_versions, load_index, load_meta, mmr_select, publish_version, reconstruct_vectors, save_index
+from utils.bm25_helper import HYBRID_CANDIDATES, BM25Index, build_sparse_index, hybrid_search
+from utils.rerank_helper import rerank
+from utils.chunking_helper import load_recursive_chunks, load_structured_chunks
+from utils.embedding_helper import embedding_backend_name, get_embeddings
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+# Set EMBEDDING_BACKEND=onnx for the int8 onnxruntime model (see utils/embedding_helper.py)
+
+# A corpus is a directory of PDFs; each gets one persisted index under VECTORSTORE_ROOT.
+# "docs" keeps the original vectorstore/faiss_index location used by the RAG tabs.
+DEFAULT_CORPUS = "docs"
+VECTORSTORE_ROOT = "vectorstore"
+VECTORSTORE_PATHS = {"docs": os.path.join(VECTORSTORE_ROOT, "faiss_index")}
+
+# "structured" follows PDF sections, strips running headers/footers and drops near-duplicate
+# chunks; "recursive" is the original fixed-size page splitting (see utils/chunking_helper.py)
+CHUNKING_STRATEGY = os.getenv("CHUNKING_STRATEGY", "structured")
+
+# Memory-map the persisted index so worker processes share one copy via the page cache
+VECTORSTORE_MMAP = os.getenv("VECTORSTORE_MMAP", "true").lower() == "true"
+
+# How often a loaded corpus checks whether a newer index version was published
+VECTORSTORE_REFRESH_SECONDS = float(os.getenv("VECTORSTORE_REFRESH_SECONDS", "10"))
+
+# Index type used when building: flat (exact), hnsw, ivfpq or compact (see utils/index_helper.py)
+VECTORSTORE_INDEX_TYPE = os.getenv("VECTORSTORE_INDEX_TYPE", "flat")
+
+# Fuse BM25 and dense rankings so exact identifiers like pub.db:query are found
+RETRIEVAL_HYBRID = os.getenv("RETRIEVAL_HYBRID", "true").lower() == "true"
+
+# Over-fetch candidates and rescore them with a cross-encoder before keeping the top k
+RETRIEVAL_RERANK = os.getenv("RETRIEVAL_RERANK", "false").lower() == "true"
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+
+# Diversify results with maximal marginal relevance over MMR_FETCH_K candidates, so the
+# k chunks are not near-copies from one page; lambda 1.0 is pure relevance
+RETRIEVAL_MMR = os.getenv("RETRIEVAL_MMR", "false").lower() == "true"
+MMR_FETCH_K = int(os.getenv("MMR_FETCH_K", "20"))
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.5"))
+
+# When set (e.g. http://127.0.0.1:8765), searches go to the retrieval daemon instead
+RETRIEVAL_DAEMON_URL = os.getenv("RETRIEVAL_DAEMON_URL", "")
+
+NO_CONTEXT = "No documentation available."
+
+def vectorstore_path(corpus: str) -> str:
+    return VECTORSTORE_PATHS.get(corpus, os.path.join(VECTORSTORE_ROOT, Path(corpus).name))
+
+# Sections of the webMethods Web Services Developer's Guide each agent searches,
+# matched against chunk section_path metadata (see index_helper.matches_filter).
+# Agents without an entry search the whole corpus. Unlike explicit filters, these
+# defaults fall back to the whole corpus when they match nothing (e.g. other PDFs,
+# or recursive chunking without sections).
+AGENT_RETRIEVAL_FILTERS = {
+    "analyzer": {"section_path": ["Working with Web Services", "Message Exchange Patterns", "Web Service Connectors", "Response Services", "Handlers", "SOAP over JMS"]},
+    "designer": {"section_path": ["Working with Web Services", "Endpoint URLs", "Operation to Invoke", "WS-Addressing", "Reliable Messaging", "Callback Services"]},
+    "generator": {"section_path": ["Web Service Connectors", "SOAP Headers", "Array Handling", "MTOM", "CDATA", "Namespace Declarations"]},
+    "boomi_integrator": {"section_path": ["Authentication and Authorization", "WS-Security", "WS-Policy", "Endpoint URLs"]},
+    "tester": {"section_path": ["Transient Error Handling", "Message Exchange Patterns", "Response Services", "Handlers", "Web Service Connectors"]},
+    "migrator": {"section_path": ["Working with Web Services", "SOAP over JMS", "Handlers", "Transient Error Handling", "WS-Security"]}
+}
+DEFAULT_FILTER_KEYS = {json.dumps(metadata_filter, sort_keys=True) for metadata_filter in AGENT_RETRIEVAL_FILTERS.values()}
+
+class CorpusIndex:
+    """The dense index, BM25 index and version of one persisted corpus."""
+
+    def __init__(self, name: str, path: str, vectorstore, sparse_index: Optional[BM25Index], version: str):
+        self.name = name
+        self.path = path
+        self.vectorstore = vectorstore
+        self.sparse_index = sparse_index
+        self.version = version
+        self._filter_cache: Dict[str, np.ndarray] = {}
+
+    def allowed_positions(self, metadata_filter: Dict[str, Any]) -> Optional[np.ndarray]:
+        """Positions matching a metadata filter (cached per filter), or None to search everything.
+
+        A filter that matches no chunk allows no position, except an agent default from
+        AGENT_RETRIEVAL_FILTERS (e.g. on a corpus without section metadata), which falls
+        back to an unfiltered search.
+        """
+        key = json.dumps(metadata_filter, sort_keys=True)
+        if key not in self._filter_cache:
+            self._filter_cache[key] = filter_positions(self.vectorstore, metadata_filter)
+        allowed = self._filter_cache[key]
+        if len(allowed) == 0 and key in DEFAULT_FILTER_KEYS:
+            logger.info(f"Agent filter {key} matches no chunk in corpus '{self.name}'; searching all chunks")
+            return None
+        return allowed if len(allowed) < self.vectorstore.index.ntotal else None
+
+class RetrievalService:
+    """Owns one embedding model and one index per corpus for the whole process.
+
+    The Streamlit apps, the agentic helpers and the RAG tabs all retrieve through
+    get_retrieval_service(), so the model is loaded and each corpus is embedded or
+    read from disk once per process instead of once per pipeline.
+    """
+
+    remote = False
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL):
+        self.model_name = model_name
+        self._embeddings = None
+        self._embeddings_lock = threading.Lock()
+        self._corpora: Dict[str, Optional[CorpusIndex]] = {}
+        self._checked: Dict[str, float] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    @property
+    def embeddings(self):
+        """The embedding model, loaded on first use: only loading or building a corpus and
+        searching need it, so processes without a corpus never load it."""
+        if self._embeddings is None:
+            with self._embeddings_lock:
+                if self._embeddings is None:
+                    self._embeddings = get_embeddings(self.model_name)
+        return self._embeddings
+
+    def _corpus_lock(self, corpus: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(corpus, threading.Lock())
+
+    def get_corpus(self, corpus: str = DEFAULT_CORPUS) -> Optional[CorpusIndex]:
+        """Load (or build and persist) a corpus index; None if it has no PDFs."""
+        if corpus in self._corpora:
+            self._refresh_if_published(corpus)
+            return self._corpora[corpus]
+        with self._corpus_lock(corpus):
+            if corpus not in self._corpora:
+                self._corpora[corpus] = self._load_or_build(corpus)
+                self._checked[corpus] = time.monotonic()
+        return self._corpora[corpus]
+
+    def get_vectorstore(self, corpus: str = DEFAULT_CORPUS):
+        index = self.get_corpus(corpus)
+        return index.vectorstore if index else None
+
+    def _refresh_if_published(self, corpus: str) -> None:
+        """Pick up a version published by another process (e.g. a rebuild job).
+
+        The pointer is checked at most every VECTORSTORE_REFRESH_SECONDS and the new
+        version is loaded in a background thread; searches keep using the loaded
+        version until the swap.
+        """
+        now = time.monotonic()
+        if now - self._checked.get(corpus, 0) < VECTORSTORE_REFRESH_SECONDS:
+            return
+        self._checked[corpus] = now
+        index = self._corpora[corpus]
+        index_path = current_index_path(vectorstore_path(corpus))
+        if index_path is None or (index is not None and index.path == index_path):
+            return
+        threading.Thread(target=self._swap_in, args=(corpus, index_path), daemon=True).start()
+
+    def _swap_in(self, corpus: str, index_path: str) -> None:
+        lock = self._corpus_lock(f"swap:{corpus}")
+        if not lock.acquire(blocking=False):
+            return
+        try:
+            self._corpora[corpus] = self._load(corpus, index_path)
+            logger.info(f"Corpus '{corpus}' now serves {index_path}")
+        except Exception:
+            logger.exception(f"Could not load {index_path}; still serving the previous version")
+        finally:
+            lock.release()
+
+    def rebuild(self, corpus: str = DEFAULT_CORPUS) -> Optional[CorpusIndex]:
+        """Build a new index version while searches keep using the current one, then swap.
+
+        Old versions beyond VECTORSTORE_KEEP_VERSIONS are garbage-collected.
+        """
+        with self._corpus_lock(f"build:{corpus}"):
+            index = self._build(corpus)
+        if index is not None:
+            self._corpora[corpus] = index
+            self._checked[corpus] = time.monotonic()
+        return index
+
+    def _load_or_build(self, corpus: str) -> Optional[CorpusIndex]:
+        index_path = current_index_path(vectorstore_path(corpus))
+        if index_path:
+            return self._load(corpus, index_path)
+        with self._corpus_lock(f"build:{corpus}"):
+            return self._build(corpus)
+
+    def _load(self, corpus: str, index_path: str) -> CorpusIndex:
+        vectorstore = load_index(index_path, self.embeddings, mmap=VECTORSTORE_MMAP)
+        meta = load_meta(index_path)
+        built_with = meta.get("embedding_backend", "torch")
+        if built_with != embedding_backend_name(self.embeddings):
+            logger.warning(f"Index '{index_path}' was built with the {built_with} embedding backend; "
+                           f"queries use {embedding_backend_name(self.embeddings)}. Rebuild it for best recall.")
+        if BM25Index.exists(index_path):
+            sparse_index = BM25Index.load(index_path)
+        else:
+            # Index persisted before hybrid retrieval; build the inverted index once
+            sparse_index = build_sparse_index(vectorstore)
+            sparse_index.save(index_path)
+        return CorpusIndex(corpus, index_path, vectorstore, sparse_index, meta.get("version", ""))
+
+    def _build(self, corpus: str) -> Optional[CorpusIndex]:
+        """Embed a corpus into a new version directory and publish it."""
+        chunks = self._load_chunks(corpus)
+        if not chunks:
+            return None
+        path = vectorstore_path(corpus)
+        logger.info(f"Building index for corpus '{corpus}' from {len(chunks)} chunks")
+        vectorstore, meta = build_vectorstore(chunks, self.embeddings, index_type=VECTORSTORE_INDEX_TYPE)
+        version, building_path = begin_version(path)
+        save_index(vectorstore, building_path, version=version, chunking=CHUNKING_STRATEGY, embedding_backend=embedding_backend_name(self.embeddings), **meta)
+        sparse_index = build_sparse_index(vectorstore)
+        sparse_index.save(building_path)
+        index_path = publish_version(path, version, building_path)
+        removed = gc_versions(path)
+        if removed:
+            logger.info(f"Removed old index versions of corpus '{corpus}': {removed}")
+        return CorpusIndex(corpus, index_path, vectorstore, sparse_index, version)
+
+    def _load_chunks(self, corpus: str) -> List:
+        if not os.path.isdir(corpus):
+            return []
+        if CHUNKING_STRATEGY == "recursive":
+            return load_recursive_chunks(corpus)
+        chunks, stats = load_structured_chunks(corpus)
+        logger.info(f"Chunked corpus '{corpus}': {stats}")
+        return chunks
+
+    def search(self, query: str, corpus: str = DEFAULT_CORPUS, k: int = 3, metadata_filter: Optional[Dict[str, Any]] = None, diversify: Optional[bool] = None) -> List:
+        """Top k chunks for a query: hybrid or dense candidates, optionally diversified and reranked.
+
+        `metadata_filter` (see index_helper.matches_filter) restricts the search to
+        matching chunks, e.g. {"section_path": ["Handlers"]}; a filter matching no chunk
+        finds nothing (see CorpusIndex.allowed_positions). `diversify` selects the k
+        chunks by MMR (default RETRIEVAL_MMR).
+        """
+        return self.search_batch([query], corpus=corpus, k=k, metadata_filter=metadata_filter, diversify=diversify)[0]
+
+    def search_batch(self, queries: List[str], corpus: str = DEFAULT_CORPUS, k: int = 3, metadata_filter: Optional[Dict[str, Any]] = None, diversify: Optional[bool] = None) -> List[List]:
+        """search() for several queries, sharing one embedding call and one FAISS search."""
+        index = self.get_corpus(corpus)
+        if index is None or not queries:
+            return [[] for _ in queries]
+        vectorstore = index.vectorstore
+        diversify = RETRIEVAL_MMR if diversify is None else diversify
+        allowed = index.allowed_positions(metadata_filter) if metadata_filter else None
+        if allowed is not None and len(allowed) == 0:
+            return [[] for _ in queries]
+        fetch_k = k
+        if RETRIEVAL_RERANK:
+            fetch_k = max(fetch_k, RERANK_CANDIDATES)
+        if diversify:
+            fetch_k = max(fetch_k, MMR_FETCH_K)
+        hybrid = RETRIEVAL_HYBRID and index.sparse_index is not None and index.sparse_index.ntotal == vectorstore.index.ntotal
+        dense_k = max(fetch_k, HYBRID_CANDIDATES) if hybrid else fetch_k
+        query_vectors = embed_queries(vectorstore, queries)
+        dense_results = dense_search_batch(vectorstore, query_vectors, dense_k, allowed)
+
+        results = []
+        for query, query_vector, dense in zip(queries, query_vectors, dense_results):
+            dense_positions = [position for position, _ in dense]
+            if hybrid:
+                positions = hybrid_search(query, vectorstore, index.sparse_index, fetch_k, dense=dense_positions, allowed=allowed)
+            else:
+                positions = dense_positions[:fetch_k]
+            if diversify and len(positions) > k:
+                # The reranker then only orders the diversified selection
+                selected = mmr_select(query_vector, reconstruct_vectors(vectorstore, positions), k, MMR_LAMBDA)
+                positions = [positions[i] for i in selected]
+            docs = docs_at(vectorstore, positions)
+
+            if RETRIEVAL_RERANK and len(docs) > 1:
+                candidates = [(vectorstore.index_to_docstore_id[p], doc.page_content) for p, doc in zip(positions, docs)]
+                docs = [docs[i] for i in rerank(query, candidates, k, index.version)]
+            results.append(docs[:k])
+        return results
+
+    def retrieve_context(self, query: str, corpus: str = DEFAULT_CORPUS, k: int = 3, metadata_filter: Optional[Dict[str, Any]] = None, diversify: Optional[bool] = None) -> str:
+        docs = self.search(query, corpus=corpus, k=k, metadata_filter=metadata_filter, diversify=diversify)
+        if not docs:
+            return NO_CONTEXT
+        return "\n".join([doc.page_content for doc in docs])
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_retrieval_service() -> RetrievalService:
+    """Process-wide RetrievalService, shared across Streamlit sessions and pipelines.
+
+    With RETRIEVAL_DAEMON_URL set this is a RetrievalClient for the per-host daemon.
+    """
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                if RETRIEVAL_DAEMON_URL:
+                    from utils.retrieval_daemon import RetrievalClient
+                    _service = RetrievalClient(RETRIEVAL_DAEMON_URL)
+                else:
+                    _service = RetrievalService()
+    return _service
+
+if __name__ == "__main__":
+    # Rebuild a corpus without downtime: running apps keep serving the old version and
+    # switch once the new one is published.
+    #   python -m utils.retrieval_service --rebuild docs
+    parser = argparse.ArgumentParser(description="Build and publish a new index version for a corpus.")
+    parser.add_argument("--rebuild", default=DEFAULT_CORPUS, help="Corpus directory to rebuild")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    index = RetrievalService().rebuild(args.rebuild)
+    print(json.dumps({"corpus": args.rebuild, "path": index.path if index else None, "version": index.version if index else None}))
@@ -0,0 +1,130 @@
+import os
+import re
+import time
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Code generation fans out over the services of the designer's architecture.md: each
+# service's project is generated by its own LLM call, at most GENERATOR_CONCURRENCY at
+# a time, and the projects are merged into one multi-module Maven output. With enough
+# concurrency the whole estate takes about as long as a single service.
+GENERATOR_CONCURRENCY = int(os.getenv("GENERATOR_CONCURRENCY", "4"))
+GENERATOR_MAX_SERVICES = int(os.getenv("GENERATOR_MAX_SERVICES", "8"))
+
+HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+BOLD_LINE = re.compile(r"^\s*(?:\d+[.)]\s*)?\*\*(.+?)\*\*\s*:?\s*$")
+LIST_ITEM = re.compile(r"^\s{0,3}(?:[-*+]|\d+[.)])\s+\*\*(.+?)\*\*")
+WORDS = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+# A `### ` heading naming a file: no spaces, and a directory or a file extension
+FILE_PATH = re.compile(r"[\w.\-/]*(?:/[\w.\-]+|\.[A-Za-z]\w*)")
+
+def clean_name(text: str) -> str:
+    """Service name from a heading or list item, without numbering, markup or description."""
+    text = re.sub(r"^\d+[.)]\s*", "", text.replace("*", "").replace("`", "").strip())
+    return re.split(r"\s+[-–—(]\s*|:", text)[0].strip()
+
+def is_service_name(name: str) -> bool:
+    return 0 < len(name.split()) <= 6 and re.search(r"service$|\bservice\b", name, re.I) is not None and name.lower() not in ("service", "microservice")
+
+def breakdown_section(lines: List[str]) -> List[str]:
+    """Lines of the 'Microservices Breakdown' section; none if there is no such section."""
+    for i, line in enumerate(lines):
+        heading, bold = HEADING.match(line), BOLD_LINE.match(line)
+        if not (heading or bold) or "breakdown" not in line.lower():
+            continue
+        level = len(heading.group(1)) if heading else None
+        for j in range(i + 1, len(lines)):
+            next_heading = HEADING.match(lines[j])
+            if level is not None and next_heading and len(next_heading.group(1)) <= level:
+                return lines[i + 1:j]
+            # A bold pseudo-heading ends at the next section that is not itself a service
+            if level is None and (next_heading or BOLD_LINE.match(lines[j])) and not is_service_name(clean_name(lines[j].lstrip("#"))):
+                return lines[i + 1:j]
+        return lines[i + 1:]
+    return []
+
+def service_names(name: str) -> Dict[str, str]:
+    """Module directory, Java package and class prefix of a service name."""
+    words = WORDS.findall(name) or ["service"]
+    base = words[:-1] if len(words) > 1 and words[-1].lower() in ("service", "microservice") else words
+    return {
+        "name": name,
+        "module": "-".join(word.lower() for word in words),
+        "package": "".join(word.lower() for word in base),
+        "class_name": "".join(word[0].upper() + word[1:] for word in base)
+    }
+
+def extract_services(architecture: str, limit: int = None) -> List[Dict[str, str]]:
+    """Services proposed by an architecture document, in order, at most `limit`.
+
+    Names are taken from the sub-headings and bold list items of its microservices
+    breakdown that look like service names. An empty list (no breakdown section, or
+    none of its entries is a service) means the caller generates a single project.
+    Only the breakdown is read, so e.g. "Service Mesh" elsewhere is not taken for one.
+    """
+    services, modules = [], set()
+    for line in breakdown_section((architecture or "").splitlines()):
+        heading, bold, item = HEADING.match(line), BOLD_LINE.match(line), LIST_ITEM.match(line)
+        candidate = heading.group(2) if heading else bold.group(1) if bold else item.group(1) if item else None
+        name = clean_name(candidate) if candidate else ""
+        if not is_service_name(name):
+            continue
+        service = service_names(name)
+        if service["module"] not in modules:
+            modules.add(service["module"])
+            services.append(service)
+    return services[:limit or GENERATOR_MAX_SERVICES]
+
+def prefix_paths(response: str, module: str) -> str:
+    """A generated project with its `### path` headings moved under the module directory.
+
+    Other `### ` headings (markdown subsections of e.g. a README) are left as they are.
+    """
+    lines = []
+    for line in response.splitlines():
+        path = line[4:].strip().strip("`").lstrip("/") if line.startswith("### ") else ""
+        if FILE_PATH.fullmatch(path):
+            line = f"### {path if path.startswith(module + '/') else f'{module}/{path}'}"
+        lines.append(line)
+    return "\n".join(lines)
+
+def parent_pom(services: List[Dict[str, str]]) -> str:
+    modules = "\n".join(f"    <module>{service['module']}</module>" for service in services)
+    return (
+        '<project xmlns="http://maven.apache.org/POM/4.0.0">\n'
+        "  <modelVersion>4.0.0</modelVersion>\n"
+        "  <groupId>com.example</groupId>\n"
+        "  <artifactId>microservices</artifactId>\n"
+        "  <version>0.0.1-SNAPSHOT</version>\n"
+        "  <packaging>pom</packaging>\n"
+        f"  <modules>\n{modules}\n  </modules>\n"
+        "</project>"
+    )
+
+def merge_modules(services: List[Dict[str, str]], responses: List[str]) -> str:
+    """One multi-module output: an aggregator pom.xml, then each service under its module."""
+    parts = [f"### pom.xml\n{parent_pom(services)}"]
+    parts.extend(prefix_paths(response, service["module"]) for service, response in zip(services, responses))
+    return "\n\n".join(parts)
+
+def fan_out(services: List[Dict[str, str]], generate: Callable[[Dict[str, str]], str], concurrency: int = None) -> List[str]:
+    """generate(service) for every service on a bounded thread pool, in service order."""
+    concurrency = concurrency or GENERATOR_CONCURRENCY
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(services)))) as pool:
+        # Each sub-run gets a copy of the caller's context (e.g. its retrieval_run)
+        futures = [pool.submit(contextvars.copy_context().run, generate, service) for service in services]
+        return [future.result() for future in futures]
+
+def generate_services(architecture: str, generate: Callable[[Dict[str, str]], str], concurrency: int = None) -> Optional[str]:
+    """Merged projects of the architecture's services; None if it names no services."""
+    services = extract_services(architecture)
+    if not services:
+        return None
+    start = time.perf_counter()
+    responses = fan_out(services, generate, concurrency)
+    logger.info(f"Generated {len(services)} services in {time.perf_counter() - start:.1f}s: {[service['name'] for service in services]}")
+    return merge_modules(services, responses)